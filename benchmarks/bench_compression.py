@@ -0,0 +1,121 @@
+"""Compare wire compression codecs for rtplot data frames.
+
+For a few representative signals this measures, per codec, the
+compression ratio and the encode + decode time of one batch, then works
+out the link bandwidth below which each codec gets a batch across faster
+than sending it raw:
+
+    raw_bytes / B  >  (encode + decode) + compressed_bytes / B
+    =>  B  <  (raw_bytes - compressed_bytes) / (encode + decode)
+
+It also prints which option wins across a sweep of link speeds, which
+is where the crossover between the codecs shows up. Codecs whose
+package isn't installed (lz4, zstandard) are skipped.
+
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --traces 64 --samples 200 --dtype int16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rtplot import protocol  # noqa: E402
+
+
+# Link speeds for the sweep, in bytes per second
+LINKS = [
+    ("100 kbit/s", 100e3 / 8),
+    ("1 Mbit/s", 1e6 / 8),
+    ("10 Mbit/s", 10e6 / 8),
+    ("100 Mbit/s", 100e6 / 8),
+    ("1 Gbit/s", 1e9 / 8),
+]
+
+
+def make_signals(traces, samples, dtype):
+    rng = np.random.default_rng(0)
+    t = np.arange(samples) / 1000.0
+    freqs = rng.uniform(0.1, 2.0, size=(traces, 1))
+    slow = np.sin(2 * np.pi * freqs * t)
+    signals = {
+        "slow sine": slow,
+        "slow sine + 1% noise": slow + 0.01 * rng.standard_normal((traces, samples)),
+        "white noise": rng.standard_normal((traces, samples)),
+        "step / hold": np.repeat(
+            rng.integers(0, 5, size=(traces, samples // 50 + 1)), 50, axis=1
+        )[:, :samples].astype(np.float64),
+    }
+    if np.dtype(dtype).kind == "i":
+        # Sensor-style ADC counts
+        return {
+            name: protocol.quantize(sig, dtype, (np.full(traces, 1e-3), np.zeros(traces)))
+            for name, sig in signals.items()
+        }
+    return {name: sig.astype(dtype) for name, sig in signals.items()}
+
+
+def time_codec(A, codec, repeats):
+    """Return (compressed_bytes, seconds to encode + decode one batch)."""
+    flags, payload = protocol.encode_payload(A, codec)
+    payload_bytes = payload if isinstance(payload, bytes) else payload.tobytes()
+    header = protocol.pack_data_header(A, 0, flags)
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        protocol.encode_payload(A, codec)
+        protocol.unpack_data_frame(header, payload_bytes)
+        best = min(best, time.perf_counter() - t0)
+    return len(payload_bytes), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--traces", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=100,
+                        help="samples per batch (the N in send_array's (traces, N))")
+    parser.add_argument("--dtype", default="float64",
+                        choices=["float64", "float32", "int16", "int32"])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    codecs = protocol.available_codecs()
+    print(f"batch: {args.traces} traces x {args.samples} samples, {args.dtype}")
+    print(f"codecs: {', '.join(codecs)}")
+
+    for name, sig in make_signals(args.traces, args.samples, args.dtype).items():
+        A = protocol.as_wire_array(sig)
+        raw = A.nbytes
+        print(f"\n== {name} ({raw} bytes raw)")
+        print(f"{'codec':<6} {'bytes':>8} {'ratio':>6} {'enc+dec us':>11} {'pays off below':>16}")
+        results = {}
+        for codec in codecs:
+            size, seconds = time_codec(A, codec, args.repeats)
+            results[codec] = (size, seconds)
+            if size < raw:
+                crossover = (raw - size) / seconds * 8
+                pays = f"{crossover / 1e6:,.1f} Mbit/s"
+            else:
+                pays = "never"
+            print(f"{codec:<6} {size:>8} {raw / size:>6.2f} {seconds * 1e6:>11.1f} {pays:>16}")
+
+        # Time to get one batch across each link; the winner per row
+        # shows where one codec overtakes another.
+        row = ["raw"] + codecs
+        print(f"{'ms/batch':<11}" + "".join(f"{c:>10}" for c in row) + "   best")
+        for label, bps in LINKS:
+            totals = {"raw": raw / bps}
+            for codec, (size, seconds) in results.items():
+                totals[codec] = seconds + size / bps
+            best = min(totals, key=totals.get)
+            cells = "".join(f"{totals[c] * 1e3:>10.3f}" for c in row)
+            print(f"{label:<11}{cells}   {best}")
+
+
+if __name__ == "__main__":
+    main()
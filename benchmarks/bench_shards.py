@@ -0,0 +1,173 @@
+"""Measure browser-server ingest throughput against --workers.
+
+For each worker count this starts a browser server (no browser) with
+``--tabs`` connect tabs, one sender process per tab streaming
+``--traces`` x ``--batch`` float32 batches as fast as it can, and
+reports what the server actually took in (from each tab's head via
+/api/tabs/{id}/range, so frames the PUB/SUB high-water mark dropped
+don't count), along with how long /api/latency took to answer meanwhile:
+the event loop's responsiveness to browsers under that load.
+
+    python benchmarks/bench_shards.py
+    python benchmarks/bench_shards.py --workers 0 2 4 8 --tabs 8 --seconds 5
+
+Throughput can only scale with workers while there are idle cores for
+them (and for the senders, which run on the same machine here).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from time import perf_counter
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+# Senders bind data ports from here on, two apart (data + control).
+FIRST_PORT = 6100
+# Byte offset of the head field in a range frame: the 16-byte common
+# header, then uint32 bin_size, uint32 num_bins, uint64 start.
+RANGE_HEAD_OFFSET = 32
+
+
+def send(port, traces, batch, seconds):
+    """Sender process: stream batches on ``port`` until time is up."""
+    from rtplot.client import RTPlotClient
+
+    client = RTPlotClient()
+    client.configure_port(port)
+    client.initialize_plots(
+        [{"names": [f"t{i}" for i in range(traces)], "xrange": 200}],
+        handshake_timeout=10.0,
+    )
+    data = np.random.default_rng(port).standard_normal((traces, batch)).astype(np.float32)
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        client.send_array(data)
+    client.close()
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=10) as r:
+        return r.read()
+
+
+def heads(http_port, tab_ids):
+    out = []
+    for tid in tab_ids:
+        try:
+            frame = fetch(f"http://127.0.0.1:{http_port}/api/tabs/{tid}/range?from=-1")
+        except OSError:
+            out.append(0)    # no config yet
+            continue
+        out.append(struct.unpack_from("<Q", frame, RANGE_HEAD_OFFSET)[0])
+    return out
+
+
+def run(workers, opts, http_port):
+    tmp = tempfile.mkdtemp(prefix="rtplot-bench-")
+    tab_ids = [f"tab_bench{i}" for i in range(opts.tabs)]
+    ports = [FIRST_PORT + 2 * i for i in range(opts.tabs)]
+    with open(os.path.join(tmp, "tabs.json"), "w") as fh:
+        json.dump([
+            {"id": tid, "name": tid, "endpoint": f"127.0.0.1:{port}"}
+            for tid, port in zip(tab_ids, ports)
+        ], fh)
+    env = dict(os.environ, RTPLOT_TABS_FILE=os.path.join(tmp, "tabs.json"),
+               RTPLOT_RECORD_DIR=tmp, PYTHONPATH=REPO_ROOT)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "rtplot.server_browser", "--no-browser",
+         "--port", str(http_port), "--workers", str(workers),
+         "--history", str(opts.history)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    senders = []
+    try:
+        if not wait_for_port(http_port):
+            raise RuntimeError("server did not come up")
+        senders = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--send", str(port),
+                 "--traces", str(opts.traces), "--batch", str(opts.batch),
+                 "--seconds", str(opts.warmup + opts.seconds + 2)],
+                env=env, stdout=subprocess.DEVNULL,
+            )
+            for port in ports
+        ]
+        time.sleep(opts.warmup)
+        before, started = heads(http_port, tab_ids), perf_counter()
+        stalls = []
+        while perf_counter() - started < opts.seconds:
+            t0 = perf_counter()
+            fetch(f"http://127.0.0.1:{http_port}/api/latency")
+            stalls.append(perf_counter() - t0)
+            time.sleep(0.05)
+        after, elapsed = heads(http_port, tab_ids), perf_counter() - started
+    finally:
+        for proc in senders:
+            proc.kill()
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+    samples = sum(b - a for a, b in zip(before, after)) / elapsed
+    stalls = np.array(stalls) * 1e3
+    return samples, np.median(stalls), stalls.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--tabs", type=int, default=4)
+    parser.add_argument("--traces", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=100,
+                        help="samples per send_array() call")
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--history", type=int, default=200_000)
+    parser.add_argument("--port", type=int, default=8093, help="HTTP port")
+    parser.add_argument("--send", type=int, help=argparse.SUPPRESS)
+    opts = parser.parse_args()
+
+    if opts.send is not None:
+        send(opts.send, opts.traces, opts.batch, opts.seconds)
+        return
+
+    print(f"{opts.tabs} tabs x {opts.traces} traces, batches of {opts.batch},"
+          f" {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'samples/s':>12} {'MB/s':>8} {'x':>6}"
+          f" {'api p50 ms':>11} {'api max ms':>11}")
+    base = None
+    for workers in opts.workers:
+        samples, p50, worst = run(workers, opts, opts.port)
+        base = base or samples or 1.0
+        mb = samples * opts.traces * 4 / 1e6
+        print(f"{workers:>7} {samples:>12,.0f} {mb:>8.1f} {samples / base:>6.2f}"
+              f" {p50:>11.1f} {worst:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,79 @@
 import zmq
+import zmq.utils.monitor
 import numpy as np
 import time
-from collections import OrderedDict, namedtuple
+import atexit
+import json
+import sys
+import threading
+import types
+import weakref
+from collections import OrderedDict, deque, namedtuple
 from dataclasses import dataclass, field
 from typing import List, Optional, Tuple, Union
 
+try:
+    from rtplot import protocol
+except ImportError:
+    # Fallback: running as a loose script from inside the rtplot/ directory
+    import protocol
+
 ###################
 # ZMQ Networking #
 ##################
+#
+# All networking state lives on RTPlotClient instances (defined below).
+# The module-level functions — initialize_plots(), send_array(), ... —
+# drive one default instance, so single-stream scripts never have to
+# know the class exists. Sockets are created lazily on first use, so
+# importing this module never grabs ports or sleeps.
 
-#Get the context for networking setup
-context = zmq.Context()
-
-#Socket to talk to server
-#Using the pub - sub paradigm to communicate
-socket = context.socket(zmq.PUB)
-
-#Return channel socket: the server PUSHes control events (button clicks and
-# slider values) to us over a second ZMQ socket whose endpoint tracks the
-# main data socket (default port = data port + 1).
-control_socket = context.socket(zmq.PULL)
-control_socket.setsockopt(zmq.RCVHWM, 1000)
-#Non-blocking local state for controls, drained on each poll_controls() call
-_control_values = {}
-_control_button_events = []
-
-# Cached payload of the most recent initialize_plots() call. The server
-# uses this to recover from its own crashes: when its tab loses the
-# config, it pushes a "resend_config" control event over the return
-# channel, and poll_controls() re-PUBs this dict so the plot reattaches
-# without the user restarting their script. None until first call.
-plot_desc_dict = None
-
-#Global variable to keep track of last connected address
-# default is fixed publisher mode, therefore you don't connect
-# to an address
-prev_address = None
-
-#This address will be used to bind any incoming subscriber on port 5555
-# to the publisher
-bind_address = "tcp://*:5555"
-#Matching bind address for the return (control) channel, default port+1.
-control_bind_address = "tcp://*:5556"
-#Current data port, so configure_port / configure_ip can derive the control port.
-current_data_port = 5555
-
-# The subscriber or the publisher must be fixed
-# set which is which here
-known_pi_address_prev = True
-# Add flag to indicate if we ever failed to bind
-failed_bind = False
-
-## Define the default behaviour of the pi
-
-# Assume that you know the ip address of the pi
-if known_pi_address_prev:
-
-    try:
-        #Attempt to bind to incoming addresses on the port
-        socket.bind(bind_address)
-        control_socket.bind(control_bind_address)
 
-        #Sleep so that the subscriber can join
-        time.sleep(0.2)
+def _connect_and_wait(sock, address, timeout):
+    """Connect ``sock`` to ``address`` and wait for the TCP handshake.
 
-    #If you cannot connect to the socket, alert user and continue
-    except zmq.error.ZMQError as e:
-        failed_bind = True
+    Uses a ZMQ socket monitor instead of a fixed sleep: returns as soon
+    as ``EVENT_CONNECTED`` fires, or after ``timeout`` seconds if the
+    server isn't up yet (ZMQ keeps retrying in the background, and the
+    initialize_plots() handshake resends until the config lands).
+    Returns True if the connection was confirmed.
+    """
+    if timeout is None or timeout <= 0:
+        sock.connect(address)
+        return False
+    monitor = sock.get_monitor_socket(zmq.EVENT_CONNECTED)
+    try:
+        sock.connect(address)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0 or not monitor.poll(remaining_ms):
+                return False
+            event = zmq.utils.monitor.recv_monitor_message(monitor)
+            if event["event"] == zmq.EVENT_CONNECTED:
+                return True
+    finally:
+        sock.disable_monitor()
+        monitor.close(0)
 
-        print("rtplot.client: Could not connect to default address '{}'".format(e))
-        print("               There might be another client running")
-        print("               This is fine if doing local plots")
 
-# Secondary default behavior is that you know the ip address
-# of the computer that will plot
-else:
-    #Connect to the computer that will plot information
-    socket.connect(prev_address)
+def _parse_host_port(address, default_port=5555):
+    """Split a 'tcp://host:port' or 'host[:port]' string into (host, port)."""
+    s = address
+    if s.startswith("tcp://"):
+        s = s[len("tcp://"):]
+    if s.startswith("*:"):
+        host = "*"
+        port_str = s[2:]
+    elif ":" in s:
+        host, port_str = s.rsplit(":", 1)
+    else:
+        host, port_str = s, str(default_port)
+    try:
+        port = int(port_str)
+    except ValueError:
+        port = default_port
+    return host, port
 
 
 ############################
@@ -91,6 +88,7 @@ SENDING_PLOT_UPDATE = "0"
 SENDING_DATA = "1"
 SENDING_DISPLAY = "4"
 SENDING_TEXT_INPUT = "5"
+SENDING_PACKED_DATA = protocol.SENDING_PACKED_DATA
 
 #Lightweight result type returned by poll_controls()
 ControlState = namedtuple("ControlState", ["values", "buttons"])
@@ -146,6 +144,9 @@ class Plot:
     yrange: Optional[Tuple[float, float]] = None
     xrange: Optional[int] = None
     height: Optional[float] = None
+    scale: Optional[Union[float, List[float]]] = None
+    offset: Optional[Union[float, List[float]]] = None
+    sample_rate: Optional[float] = None
 
     def to_dict(self):
         return _drop_none({
@@ -159,6 +160,9 @@ class Plot:
             "yrange": _range_to_list(self.yrange),
             "xrange": self.xrange,
             "height": self.height,
+            "scale": list(self.scale) if isinstance(self.scale, (list, tuple)) else self.scale,
+            "offset": list(self.offset) if isinstance(self.offset, (list, tuple)) else self.offset,
+            "sample_rate": self.sample_rate,
         })
 
 
@@ -277,382 +281,1205 @@ class ControlsRow:
         ]}
 
 
-def local_plot():
-    """Send data to a plot in the same computer"""
+def _json_frame(obj):
+    return json.dumps(obj).encode("utf8")
 
-    local_address = "tcp://127.0.0.1:5555"
-    configure_ip(ip = local_address)
 
-def configure_port(new_port:int):
-    """Rebind the local publisher on ``new_port`` (bind mode only).
-
-    This only affects the *bind* path — it re-opens the client's PUB
-    socket on a new local port and expects the server to connect
-    inbound. If you're in the usual "client connects to a remote
-    server" mode, use ``configure_ip(host_or_ip, ...)`` with the
-    ``host:port`` form instead; ``configure_port`` has no effect on
-    the connect target.
-
-    Keyword Arguments:
-    new_port -- int, the local port to bind the data PUB socket on.
-                The control return channel automatically uses the next
-                port (``new_port + 1``).
-    """
-    #Create the new bind address
-    new_bind_address = f"tcp://*:{new_port}"
+def _with_sample_rate(cfg, rate):
+    """Copy of the plot config ``cfg`` with ``sample_rate`` set on every plot."""
+    out = OrderedDict()
+    for key, desc in cfg.items():
+        desc = dict(desc)  # don't mutate the caller's dicts
+        if "names" in desc and "controls" not in desc:
+            desc["sample_rate"] = rate
+        out[key] = desc
+    return out
 
-    #Run the ip configuration
-    configure_ip(known_pi_address=True, new_bind_address=new_bind_address)
 
+def _num_plot_traces(cfg):
+    """Count the plotted traces declared in an initialize_plots() payload."""
+    if not cfg:
+        return 0
+    return sum(
+        len(desc.get("names", []))
+        for desc in cfg.values()
+        if "controls" not in desc and "non_plot_labels" not in desc
+    )
 
-def _parse_host_port(address, default_port=5555):
-    """Split a 'tcp://host:port' or 'host[:port]' string into (host, port)."""
-    s = address
-    if s.startswith("tcp://"):
-        s = s[len("tcp://"):]
-    if s.startswith("*:"):
-        host = "*"
-        port_str = s[2:]
-    elif ":" in s:
-        host, port_str = s.rsplit(":", 1)
-    else:
-        host, port_str = s, str(default_port)
-    try:
-        port = int(port_str)
-    except ValueError:
-        port = default_port
-    return host, port
 
+###########################
+# Background sender mode #
+###########################
 
-def configure_ip(ip = None, known_pi_address = False, new_bind_address = None):
-    """Connect to a subscriber at a specific IP address
+#Overflow policies understood by enable_background_sender()
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
 
-    Inputs
-    ------
-    ip: Ip address or string formated to protocol:address:port
-    known_pi_address: bool, if true, the plot server will connect to the client
+SenderStats = namedtuple(
+    "SenderStats", ["queued", "sent", "dropped", "queue_size", "overflow"]
+)
+
+
+class _BackgroundSender:
+    """Drain queued frames on a dedicated I/O thread.
+
+    Arrays are copied into one of ``queue_size`` preallocated byte slots
+    and queued, together with the frame header state (wire protocol,
+    codec, sequence number) they were sent under, in one FIFO that also
+    holds config/display messages, so frames go out in call order. Slots
+    grow only when a larger array shows up, so a steady-state send costs
+    one memcpy. Messages don't take a slot and the overflow policy never
+    drops them.
     """
 
-    ## Get the current address
-    global prev_address
-    global known_pi_address_prev
-    global bind_address
-    global control_bind_address
-    global current_data_port
-
-    ## Disconnect from the previous configuration
-    # if known_pi_address_prev and not failed_bind:
-    #     socket.unbind(bind_address)
-    # elif prev_address is not None:
-    #     socket.disconnect(prev_address)
-
-    ## Format the incomming string
-    #If you just get the ip address and no port, format correctly
-    connect_address = None
-    control_connect_address = None
-
-    if ip is not None:
-        num_colons = ip.count(':')
-
-        #You only got the ip address
-        if num_colons == 0:
-            connect_address = "tcp://{}:5555".format(ip)
-        #You got ip address and port
-        elif num_colons == 1:
-            connect_address = "tcp://{}".format(ip)
-        #You got everything
-        else:
-            connect_address = ip
+    def __init__(self, owner, queue_size, overflow):
+        self._owner = owner
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._slots = [np.empty(0, dtype=np.uint8) for _ in range(queue_size)]
+        self._free = deque(range(queue_size))
+        #(slot, array, frame_state) for data, (None, messages, None)
+        # otherwise; guarded by _cond like _free.
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self._thread = threading.Thread(
+            target=self._run, name="rtplot-sender", daemon=True
+        )
+        self._thread.start()
+
+    def _take_slot(self):
+        """Free slot index, or None if the overflow policy drops the frame.
+
+        Called with ``_cond`` held.
+        """
+        if self._free:
+            return self._free.popleft()
+        if self.overflow == "drop_newest":
+            return None
+        if self.overflow == "drop_oldest":
+            for i, (idx, _, _) in enumerate(self._queue):
+                if idx is not None:
+                    del self._queue[i]
+                    self.dropped += 1
+                    return idx
+            # The I/O thread holds the only queued frame right now
+            return None
+        # block: wait for the I/O thread to hand a slot back
+        while not self._free:
+            self._cond.wait()
+        return self._free.popleft()
+
+    def put_array(self, A):
+        A = self._owner._wire_array(A)
+        with self._cond:
+            idx = self._take_slot()
+        if idx is None:
+            self.dropped += 1
+            return
+        slot = self._slots[idx]
+        if slot.nbytes < A.nbytes:
+            slot = self._slots[idx] = np.empty(A.nbytes, dtype=np.uint8)
+        view = slot[:A.nbytes].view(A.dtype).reshape(A.shape)
+        np.copyto(view, A)
+        with self._cond:
+            self._queue.append((idx, view, self._owner._next_frame_state()))
+            self.queued += 1
+            self._cond.notify_all()
+
+    def put_messages(self, messages):
+        with self._cond:
+            self._queue.append((None, messages, None))
+            self._cond.notify_all()
+
+    def _run(self):
+        sock = self._owner.socket
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                idx, item, state = self._queue.popleft()
+            if idx is None:
+                for frames in item:
+                    try:
+                        sock.send_multipart(frames)
+                    except zmq.ZMQError as e:
+                        print(f"rtplot.client: background send failed: {e}")
+                continue
+            try:
+                self._owner._send_frame(sock, item, state)
+                self.sent += 1
+            except zmq.ZMQError as e:
+                self.dropped += 1
+                print(f"rtplot.client: background send failed: {e}")
+            with self._cond:
+                self._free.append(idx)
+                self._cond.notify_all()
+
+    def pending(self):
+        return len(self._queue)
+
+    def stop(self, timeout):
+        """Send what is queued (up to ``timeout`` s), then end the thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
 
-        host, data_port = _parse_host_port(connect_address)
-        control_connect_address = f"tcp://{host}:{data_port + 1}"
 
+##################
+# Client objects #
+##################
 
-    ## Connect to new configuration
-    if(known_pi_address):
+#Every live RTPlotClient, so interpreter exit can flush background senders
+_clients = weakref.WeakSet()
 
-        if(new_bind_address is not None):
-            print(f"rtplot.client: Connecting to address {new_bind_address}")
-            socket.bind(new_bind_address)
-            _, data_port = _parse_host_port(new_bind_address)
-            new_control_bind = f"tcp://*:{data_port + 1}"
-            control_socket.bind(new_control_bind)
-            bind_address = new_bind_address
-            control_bind_address = new_control_bind
-            current_data_port = data_port
-        else:
-            #Bind incomming computers to the pi
-            print(f"rtplot.client: Connecting to address {bind_address}")
-            socket.bind(bind_address)
-            control_socket.bind(control_bind_address)
 
-        prev_address = None
+class RTPlotClient:
+    """One plot stream: a data socket, its control return channel, the
+    cached plot config and the latest control values.
 
-    else:
-        #Connect to the computer that will do the plotting
-        print(f"rtplot.client: Connecting to address {connect_address}")
-        socket.connect(connect_address)
-        if control_connect_address is not None:
-            control_socket.connect(control_connect_address)
-        prev_address = connect_address
+    The module-level functions (``initialize_plots()``, ``send_array()``,
+    ``poll_controls()``, ...) drive a default instance. Create more when
+    one process feeds several server tabs::
 
-    #Remember the last configuration you had
-    known_pi_address_prev = known_pi_address
+        arm = client.RTPlotClient("127.0.0.1:5555")
+        leg = client.RTPlotClient("127.0.0.1:5557")
+        arm.initialize_plots(["torque"])
+        leg.initialize_plots(["angle"])
+        arm.send_array(tau)
+        leg.send_array(q)
 
-    #Sleep so that the connection can be established
-    time.sleep(1)
+    Instances share the process-wide ``zmq.Context.instance()`` — and
+    with it ZMQ's I/O threads — unless you pass ``context``. Each one is
+    meant to be driven from one thread (or from one thread plus its own
+    background sender).
 
-def send_array(A, flags=0, copy=True, track=False):
-    """send a numpy array with metadata
     Inputs
     ------
-    A: (subplots,dim) np array to transmit
-        subplots - the amount of subplots that are
-                   defined in the current plot
-        dim - the amount of data that you want to plot.
-              This is not fixed
+    address: server to connect to, in any form configure_ip() accepts.
+        None leaves the endpoint unset until configure_ip() /
+        configure_port(), or until the first send, which binds the
+        default ports 5555 / 5556.
+    context: zmq.Context to create the sockets on.
+    connect_timeout: passed to configure_ip() when ``address`` is given.
     """
-    #If you get a float value, convert it to a numpy array
-    if(isinstance(A,float) or isinstance(A,list)):
-        A = np.array(A).reshape(-1,1)
-    #If array is one dimensional, reshape to two dimensions
-    if(len(A.shape) ==1):
-        A = A.reshape(-1,1)
-    #Create dict to reconstruct array
-    md = dict(
-        dtype = str(A.dtype),
-        shape = A.shape,
-    )
 
-    #Send category
-    socket.send_string(SENDING_DATA)
-    #Send json description
-    socket.send_json(md, flags | zmq.SNDMORE)
-    #Send array
-    socket.send(A, flags, copy=copy, track=track)
+    def __init__(self, address=None, context=None, connect_timeout=1.0):
+        self.context = context
+
+        #Socket to talk to server
+        #Using the pub - sub paradigm to communicate
+        self.socket = None
+
+        #Return channel socket: the server PUSHes control events (button
+        # clicks and slider values) to us over a second ZMQ socket whose
+        # endpoint tracks the main data socket (default port = data port + 1).
+        self.control_socket = None
+
+        #Non-blocking local state for controls, drained on each
+        # poll_controls() call
+        self._control_values = {}
+        self._control_button_events = []
+
+        # Cached payload of the most recent initialize_plots() call. The
+        # server uses this to recover from its own crashes: when its tab
+        # loses the config, it pushes a "resend_config" control event over
+        # the return channel, and poll_controls() re-PUBs this dict so the
+        # plot reattaches without the user restarting their script. None
+        # until first call.
+        self.plot_desc_dict = None
+        #handshake_timeout of the last initialize_plots() call, reused
+        # when a Stream re-sends the config.
+        self._handshake_timeout = 2.0
+        #Rate declared by a Stream (see _declare_sample_rate), stamped on
+        # every later config. None until a Stream passes sample_rate.
+        self._declared_sample_rate = None
+
+        #Wire protocol negotiated with the server during initialize_plots().
+        # Starts on the legacy JSON-metadata framing and is upgraded to
+        # packed frames only once the server's config_ack advertises
+        # support for them.
+        self._wire_protocol = protocol.PROTOCOL_LEGACY
+        #Sequence number stamped on every packed data frame
+        self._data_seq = 0
+
+        #Compact dtype send_array() converts to (see initialize_plots'
+        # wire_dtype), and the per-trace (scale, offset) used to quantize
+        # into it. None means "send whatever the caller passed".
+        self.wire_dtype = None
+        self._scaling = None
+
+        #Requested payload compression (initialize_plots' compression)
+        # and the codec actually in use, which is only set once the
+        # server's config_ack lists it as decodable.
+        self.compression = None
+        self.compression_level = None
+        self._codec = None
+
+        #Last connected address. Default is fixed publisher mode,
+        # therefore you don't connect to an address
+        self.prev_address = None
+
+        #This address will be used to bind any incoming subscriber on
+        # port 5555 to the publisher
+        self.bind_address = "tcp://*:5555"
+        #Matching bind address for the return (control) channel, default port+1.
+        self.control_bind_address = "tcp://*:5556"
+        #Current data port, so configure_port / configure_ip can derive
+        # the control port.
+        self.current_data_port = 5555
+
+        # The subscriber or the publisher must be fixed; True means we
+        # bind and the server connects to us.
+        self.known_pi_address_prev = True
+        # Flag to indicate if we ever failed to bind
+        self.failed_bind = False
+
+        #Running _BackgroundSender, or None for synchronous sends
+        self._sender = None
+
+        _clients.add(self)
+        if address is not None:
+            self.configure_ip(address, connect_timeout=connect_timeout)
+
+    def _ensure_sockets(self, default_endpoint=True):
+        """Create the data and control sockets if they don't exist yet.
+
+        When ``default_endpoint`` is set (every path except configure_ip)
+        the fresh sockets also get the historical default endpoint: bind
+        ``bind_address`` / ``control_bind_address`` so a server started
+        with ``-p`` can connect in. No sleep here — initialize_plots()'
+        config_ack handshake is what confirms the server is listening.
+        """
+        if self.socket is not None:
+            return
+        if self.context is None:
+            self.context = zmq.Context.instance()
+        self.socket = self.context.socket(zmq.PUB)
+        self.control_socket = self.context.socket(zmq.PULL)
+        self.control_socket.setsockopt(zmq.RCVHWM, 1000)
+        if not default_endpoint:
+            return
+
+        # Assume that you know the ip address of the pi
+        if self.known_pi_address_prev:
+            try:
+                #Attempt to bind to incoming addresses on the port
+                self.socket.bind(self.bind_address)
+                self.control_socket.bind(self.control_bind_address)
+
+            #If you cannot connect to the socket, alert user and continue
+            except zmq.error.ZMQError as e:
+                self.failed_bind = True
+
+                print("rtplot.client: Could not connect to default address '{}'".format(e))
+                print("               There might be another client running")
+                print("               This is fine if doing local plots")
+
+        # Secondary default behavior is that you know the ip address
+        # of the computer that will plot
+        else:
+            #Connect to the computer that will plot information
+            self.socket.connect(self.prev_address)
+
+    def local_plot(self):
+        """Send data to a plot in the same computer"""
+
+        local_address = "tcp://127.0.0.1:5555"
+        self.configure_ip(ip = local_address)
+
+    def configure_port(self, new_port:int):
+        """Rebind the local publisher on ``new_port`` (bind mode only).
+
+        This only affects the *bind* path — it re-opens the client's PUB
+        socket on a new local port and expects the server to connect
+        inbound. If you're in the usual "client connects to a remote
+        server" mode, use ``configure_ip(host_or_ip, ...)`` with the
+        ``host:port`` form instead; ``configure_port`` has no effect on
+        the connect target.
+
+        Keyword Arguments:
+        new_port -- int, the local port to bind the data PUB socket on.
+                    The control return channel automatically uses the next
+                    port (``new_port + 1``).
+        """
+        #Create the new bind address
+        new_bind_address = f"tcp://*:{new_port}"
+
+        #Run the ip configuration
+        self.configure_ip(known_pi_address=True, new_bind_address=new_bind_address)
+
+    def configure_ip(self, ip = None, known_pi_address = False,
+                     new_bind_address = None, connect_timeout = 1.0):
+        """Connect to a subscriber at a specific IP address
+
+        Inputs
+        ------
+        ip: Ip address or string formated to protocol:address:port
+        known_pi_address: bool, if true, the plot server will connect to the client
+        connect_timeout: max seconds to wait for the TCP connection to the
+            server to come up (connect mode only). Returns as soon as it does.
+
+        Connect mode doesn't also bind the default ports; call
+        configure_port() as well if a server should connect in too.
+        """
+        self._ensure_sockets(default_endpoint=False)
+
+        ## Format the incomming string
+        #If you just get the ip address and no port, format correctly
+        connect_address = None
+        control_connect_address = None
+
+        if ip is not None:
+            num_colons = ip.count(':')
+
+            #You only got the ip address
+            if num_colons == 0:
+                connect_address = "tcp://{}:5555".format(ip)
+            #You got ip address and port
+            elif num_colons == 1:
+                connect_address = "tcp://{}".format(ip)
+            #You got everything
+            else:
+                connect_address = ip
+
+            host, data_port = _parse_host_port(connect_address)
+            control_connect_address = f"tcp://{host}:{data_port + 1}"
+
+
+        ## Connect to new configuration
+        if(known_pi_address):
+
+            if(new_bind_address is not None):
+                print(f"rtplot.client: Connecting to address {new_bind_address}")
+                self.socket.bind(new_bind_address)
+                _, data_port = _parse_host_port(new_bind_address)
+                new_control_bind = f"tcp://*:{data_port + 1}"
+                self.control_socket.bind(new_control_bind)
+                self.bind_address = new_bind_address
+                self.control_bind_address = new_control_bind
+                self.current_data_port = data_port
+            else:
+                #Bind incomming computers to the pi
+                print(f"rtplot.client: Connecting to address {self.bind_address}")
+                self.socket.bind(self.bind_address)
+                self.control_socket.bind(self.control_bind_address)
+
+            self.prev_address = None
 
+        else:
+            #Connect to the computer that will do the plotting
+            print(f"rtplot.client: Connecting to address {connect_address}")
+            if control_connect_address is not None:
+                self.control_socket.connect(control_connect_address)
+            _connect_and_wait(self.socket, connect_address, connect_timeout)
+            self.prev_address = connect_address
+
+        #Remember the last configuration you had
+        self.known_pi_address_prev = known_pi_address
+
+    def send_array(self, A, flags=0, copy=True, track=False):
+        """send a numpy array with metadata
+        Inputs
+        ------
+        A: (subplots,dim) np array to transmit
+            subplots - the amount of subplots that are
+                       defined in the current plot
+            dim - the amount of data that you want to plot.
+                  This is not fixed
+        """
+        #In background mode the foreground only copies A into a queue
+        # slot; the I/O thread sends it with _send_frame().
+        if self._sender is not None:
+            self._sender.put_array(A)
+            return
+        self._ensure_sockets()
+        if self.wire_dtype is not None:
+            A = protocol.quantize(A, self.wire_dtype, self._scaling)
+        self._send_frame(
+            self.socket, A, self._next_frame_state(), flags, copy=copy, track=track
+        )
+
+    def _wire_array(self, A):
+        """``A`` quantized to ``wire_dtype`` (if set) as a 2-D wire array."""
+        if self.wire_dtype is not None:
+            A = protocol.quantize(A, self.wire_dtype, self._scaling)
+        return protocol.as_wire_array(A)
+
+    def _next_frame_state(self):
+        """``(wire_protocol, codec, level, seq)`` for the next data frame.
+
+        Taken on the caller's thread, so frames queued for the background
+        sender keep the protocol they were sent under even if a later
+        initialize_plots() renegotiates it.
+        """
+        state = (self._wire_protocol, self._codec, self.compression_level, self._data_seq)
+        if self._wire_protocol >= protocol.PROTOCOL_PACKED:
+            self._data_seq += 1
+        return state
+
+    def _send_frame(self, socket, A, state, flags=0, copy=True, track=False):
+        """Send the (already quantized) array ``A`` framed per ``state``."""
+        wire_protocol, codec, level, seq = state
+        #Servers that acked protocol 2 get one atomic multipart message
+        # with a packed binary header instead of category + JSON + array.
+        if wire_protocol >= protocol.PROTOCOL_PACKED:
+            A = protocol.as_wire_array(A)
+            payload_flags, payload = 0, A
+            if codec is not None:
+                payload_flags, payload = protocol.encode_payload(A, codec, level)
+            send_time = None
+            if wire_protocol >= protocol.PROTOCOL_TIMESTAMPED:
+                send_time = time.time()
+            header = protocol.pack_data_header(A, seq, payload_flags, send_time)
+            socket.send_multipart(
+                [SENDING_PACKED_DATA.encode(), header, payload],
+                flags, copy=copy, track=track,
+            )
+            return
+
+        #If you get a float value, convert it to a numpy array
+        if(isinstance(A,float) or isinstance(A,list)):
+            A = np.array(A).reshape(-1,1)
+        #If array is one dimensional, reshape to two dimensions
+        if(len(A.shape) ==1):
+            A = A.reshape(-1,1)
+        #Create dict to reconstruct array
+        md = dict(
+            dtype = str(A.dtype),
+            shape = A.shape,
+        )
+
+        #Send category
+        socket.send_string(SENDING_DATA)
+        #Send json description
+        socket.send_json(md, flags | zmq.SNDMORE)
+        #Send array
+        socket.send(A, flags, copy=copy, track=track)
+
+    def _publish(self, *messages):
+        """Send one or more multipart messages on the data socket.
+
+        Each message is a list of frames. Routed through the background
+        sender when one is running, since ZMQ sockets must only ever be
+        used from one thread.
+        """
+        if self._sender is not None:
+            self._sender.put_messages(messages)
+            return
+        self._ensure_sockets()
+        for frames in messages:
+            self.socket.send_multipart(frames)
+
+    def enable_background_sender(self, queue_size=64, overflow="drop_oldest"):
+        """Move all data-socket sends onto a dedicated I/O thread.
+
+        After this call ``send_array()`` (and ``Stream`` flushes) only
+        copy the array into a preallocated queue slot and return; a
+        background thread does the actual ZMQ send, so network hiccups or
+        a full HWM can't add jitter to your control loop.
+        ``set_display()``, ``set_text_input()`` and config sends are
+        queued the same way, in call order with the data, so only one
+        thread ever touches the socket.
+
+        Inputs
+        ------
+        queue_size: number of data frames that may wait to be sent.
+        overflow: what ``send_array()`` does when all slots are in use —
+            "drop_oldest" (default) discards the oldest queued frame,
+            "drop_newest" discards the frame being sent, and "block"
+            waits for the I/O thread to free a slot.
+
+        Call ``configure_ip()`` / ``configure_port()`` before enabling
+        this, not while it is running. ``sender_stats()`` reports the
+        dropped-frame counters.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}"
+            )
+        if queue_size < 1:
+            raise ValueError("queue_size must be >= 1")
+        self.disable_background_sender()
+        self._ensure_sockets()
+        self._sender = _BackgroundSender(self, int(queue_size), overflow)
+
+    def disable_background_sender(self, timeout=1.0):
+        """Flush queued frames (up to ``timeout`` seconds) and stop the I/O thread.
+
+        Sends go back to running synchronously on the caller's thread.
+        Does nothing if the background sender isn't running.
+        """
+        sender = self._sender
+        if sender is None:
+            return
+        sender.stop(timeout)
+        self._sender = None
+
+    def sender_stats(self):
+        """Return counters for the background sender, or None if it's off.
+
+        ``queued`` and ``sent`` count data frames accepted and written to
+        the socket; ``dropped`` counts frames discarded by the overflow
+        policy (or failed sends).
+        """
+        sender = self._sender
+        if sender is None:
+            return None
+        return SenderStats(
+            queued=sender.queued,
+            sent=sender.sent,
+            dropped=sender.dropped,
+            queue_size=sender.queue_size,
+            overflow=sender.overflow,
+        )
+
+    def initialize_plots(self, plot_descriptions=1, handshake_timeout=2.0,
+                         wire_dtype=None, compression=None,
+                         compression_level=None):
+        """Send a json description of desired plot and block until the
+        server acknowledges it.
+
+        Without the handshake, a fast script that calls
+        ``initialize_plots()`` and immediately starts firing
+        ``send_array()`` can lose the config frame to ZMQ's PUB/SUB
+        slow-joiner window — the server then drops every subsequent data
+        frame because no plot is declared yet and the browser just stays
+        blank. We resend the config on a short schedule until the server
+        PUSHes back a ``config_ack``, guaranteeing the plot is live by the
+        time this call returns.
+
+        The ack also tells us which wire protocol the server speaks.
+        Servers that advertise protocol 2 get packed single-message data
+        frames from ``send_array()``; anything else (including a handshake
+        timeout) keeps the legacy framing, so older servers never see a
+        frame they can't parse.
+
+        Inputs
+        ------
+        plot_description:
+            - int N: one plot with N anonymous traces
+            - str: one plot with a single named trace
+            - dict: one plot with full styling
+            - list of str: one plot, one trace per name
+            - list of list of str: one plot per sublist
+            - list of dict: multiple plots, each with full styling
+        handshake_timeout:
+            Max seconds to wait for the config_ack. On timeout we print a
+            warning and return (so an old server without the handshake
+            feature, or a server on a flaky network, doesn't block the
+            caller forever). Set to 0 to skip the handshake entirely.
+        wire_dtype:
+            None (default) sends arrays in the dtype you pass. "float32"
+            downcasts before sending. "int16" / "int32" quantize each
+            trace as ``round((value - offset) / scale)`` using the
+            ``scale`` / ``offset`` keys of its plot (default 1 / 0); the
+            server applies the inverse on ingest, so plots show physical
+            units. Values outside the integer range are clipped.
+        compression:
+            None (default), "zlib", "lz4", "zstd" or "auto" (fastest codec
+            both sides have). Each batch is delta/XOR-filtered per trace
+            and compressed; batches that don't shrink go out raw. Only
+            used if the server's ack says it can decode the codec.
+            Worth it on slow links; see benchmarks/bench_compression.py.
+        compression_level:
+            Codec-specific level, None for a fast default.
+        """
+        if compression is not None and compression != "auto":
+            if compression not in protocol.CODEC_NAMES:
+                raise ValueError(
+                    f"compression must be None, 'auto' or one of "
+                    f"{sorted(protocol.CODEC_NAMES)}, got {compression!r}"
+                )
+            if compression not in protocol.available_codecs():
+                raise ValueError(
+                    f"compression={compression!r} needs the "
+                    f"{'lz4' if compression == 'lz4' else 'zstandard'} package"
+                )
+        if wire_dtype is not None:
+            wire_dtype = np.dtype(wire_dtype).name
+            if wire_dtype not in protocol.WIRE_DTYPES:
+                raise ValueError(
+                    f"wire_dtype must be one of {protocol.WIRE_DTYPES}, got {wire_dtype!r}"
+                )
+
+        #Process int inputs
+        if isinstance(plot_descriptions,int):
+            plot_desc_dict = OrderedDict()
+            plot_desc_dict["plot0"] = {"names":["Trace {}".format(i) for i in range (plot_descriptions)]}
 
-def initialize_plots(plot_descriptions=1, handshake_timeout=2.0):
-    """Send a json description of desired plot and block until the
-    server acknowledges it.
+        #Process string inputs
+        elif isinstance(plot_descriptions, str):
+            plot_desc_dict = OrderedDict()
+            plot_desc_dict["plot0"] = {"names":[plot_descriptions]}
 
-    Without the handshake, a fast script that calls ``initialize_plots()``
-    and immediately starts firing ``send_array()`` can lose the config
-    frame to ZMQ's PUB/SUB slow-joiner window — the server then drops
-    every subsequent data frame because no plot is declared yet and the
-    browser just stays blank. We resend the config on a short schedule
-    until the server PUSHes back a ``config_ack``, guaranteeing the
-    plot is live by the time this call returns.
+        #Process dictionary inputs
+        elif isinstance(plot_descriptions, dict):
+            plot_desc_dict = OrderedDict()
+            plot_desc_dict["plot0"] = plot_descriptions
+
+        #Process typed inputs (Plot / ControlsRow) passed alone
+        elif hasattr(plot_descriptions, "to_dict"):
+            plot_desc_dict = OrderedDict()
+            plot_desc_dict["plot0"] = plot_descriptions.to_dict()
+
+        #Process lists of things
+        elif isinstance(plot_descriptions, list):
+
+            #Process list of strings
+            if isinstance(plot_descriptions[0],str):
+                plot_desc_dict = OrderedDict()
+                plot_desc_dict["plot0"] = {"names":plot_descriptions}
+
+            # Prcoess list with lists
+            if isinstance(plot_descriptions[0],list):
+                plot_desc_dict = OrderedDict()
+                for i,plot_desc in enumerate(plot_descriptions):
+                    plot_desc_dict["plot{}".format(i)] = {"names":plot_desc}
+
+            #Process list of dicts or typed objects (Plot / ControlsRow),
+            # including mixed lists — anything exposing .to_dict() is
+            # normalized to the wire dict form.
+            elif isinstance(plot_descriptions[0],dict) or hasattr(plot_descriptions[0], "to_dict"):
+                plot_desc_dict = OrderedDict()
+                for i,plot_desc in enumerate(plot_descriptions):
+                    if hasattr(plot_desc, "to_dict"):
+                        plot_desc = plot_desc.to_dict()
+                    plot_desc_dict["plot{}".format(i)] = plot_desc
+
+        #Throw error
+        else:
+            raise TypeError("Incorrect usage of initialize_plots, verify github for usage")
+
+        if self._declared_sample_rate is not None:
+            plot_desc_dict = _with_sample_rate(plot_desc_dict, self._declared_sample_rate)
+        self._scaling = protocol.trace_scaling(plot_desc_dict)
+        self.wire_dtype = wire_dtype
+        self.compression = compression
+        self.compression_level = compression_level
+        self.plot_desc_dict = plot_desc_dict
+        self._handshake_timeout = handshake_timeout
+        self._send_initialize_with_handshake(plot_desc_dict, handshake_timeout)
+
+    def _send_initialize_with_handshake(self, cfg, timeout):
+        """Publish ``cfg`` and block until the server acks it.
+
+        Any control events (button presses, slider updates) that happen
+        to arrive during the handshake are stashed in the instance caches
+        so the next ``poll_controls()`` call still sees them — we don't
+        want the handshake to swallow real user interaction.
+        """
+        # Fall back to the framing every server understands until this
+        # server tells us otherwise.
+        self._wire_protocol = protocol.PROTOCOL_LEGACY
+        self._codec = None
+        self._ensure_sockets()
+        control_socket = self.control_socket
+
+        def _send_once():
+            self._publish([SENDING_PLOT_UPDATE.encode()], [_json_frame(cfg)])
+
+        _send_once()
+
+        if timeout is None or timeout <= 0:
+            return  # opt-out: fire-and-forget like the pre-handshake behavior
+
+        deadline = time.time() + timeout
+        resend_interval = 0.2
+        last_send = time.time()
+
+        poller = zmq.Poller()
+        poller.register(control_socket, zmq.POLLIN)
+
+        while time.time() < deadline:
+            remaining_ms = max(10, int((deadline - time.time()) * 1000))
+            next_resend_ms = max(1, int((last_send + resend_interval - time.time()) * 1000))
+            wait_ms = min(remaining_ms, next_resend_ms)
+            events = dict(poller.poll(wait_ms))
+            if control_socket in events:
+                try:
+                    event = control_socket.recv_json(flags=zmq.NOBLOCK)
+                except (zmq.Again, zmq.ZMQError):
+                    continue
+                evtype = event.get("type")
+                if evtype == "config_ack":
+                    try:
+                        server_protocol = int(event.get("protocol", protocol.PROTOCOL_LEGACY))
+                    except (TypeError, ValueError):
+                        server_protocol = protocol.PROTOCOL_LEGACY
+                    self._wire_protocol = min(protocol.PROTOCOL_VERSION, server_protocol)
+                    if self.compression is not None \
+                            and self._wire_protocol >= protocol.PROTOCOL_PACKED:
+                        self._codec = protocol.choose_codec(
+                            self.compression, event.get("codecs")
+                        )
+                        if self._codec is None:
+                            print(
+                                f"rtplot.client: server can't decode compression="
+                                f"{self.compression!r}, sending uncompressed"
+                            )
+                    return
+                elif evtype == "button":
+                    self._control_button_events.append(event.get("id"))
+                elif evtype == "slider":
+                    self._control_values[event.get("id")] = float(event.get("value", 0.0))
+                elif evtype == "text":
+                    self._control_values[event.get("id")] = str(event.get("value", ""))
+                # Unknown / resend_config: ignore during handshake.
+            # Resend if the window elapsed without an ack; PUB/SUB will
+            # drop the first send during slow-join but retries land.
+            if time.time() - last_send >= resend_interval:
+                _send_once()
+                last_send = time.time()
+
+        print(
+            "rtplot.client: initialize_plots() timed out waiting for server ack"
+            f" after {timeout:.1f}s — the plot config may have been dropped."
+            " If you're on an older server (rtplot < 0.4.9) this warning is"
+            " expected and harmless."
+        )
+
+    def _declare_sample_rate(self, rate):
+        """Set ``sample_rate`` on every plot of this and later configs.
+
+        Used by Stream so the server labels the x axis with the rate the
+        samples actually arrive at (after any decimation). Declared
+        before initialize_plots(), the rate simply goes out with that
+        config. Declared after it, the config is re-sent (with the last
+        call's handshake_timeout), which makes the server start the tab's
+        history over; no-op if every plot already declares ``rate``.
+        """
+        self._declared_sample_rate = rate
+        if self.plot_desc_dict is None:
+            return
+        cfg = _with_sample_rate(self.plot_desc_dict, rate)
+        if cfg == self.plot_desc_dict:
+            return
+        self.plot_desc_dict = cfg
+        self._send_initialize_with_handshake(cfg, self._handshake_timeout)
+
+    def set_display(self, display_id: str, value):
+        """Push a single display box value to the browser.
+
+        Display boxes are read-only UI elements declared via a 'controls'
+        row in initialize_plots(). Call this method from your loop to
+        update their displayed value; the server rebroadcasts dirty values
+        to all connected browsers at ~30 Hz.
+
+        Accepts either numeric values (for 'display' elements) or strings
+        (for 'text' elements). Everything else is coerced to str().
+        """
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            payload_value = float(value)
+        else:
+            payload_value = str(value)
+        self._publish([
+            SENDING_DISPLAY.encode(),
+            _json_frame({"id": str(display_id), "value": payload_value}),
+        ])
+
+    def set_text_input(self, input_id: str, value):
+        """Push a text_input control value to the browser and server state.
+
+        This is the editable-control companion to set_display(). It
+        updates declared 'text_input' controls without rebuilding the full
+        plot config, and the server keeps the value as the current control
+        state returned by poll_controls().
+        """
+        self._publish([
+            SENDING_TEXT_INPUT.encode(),
+            _json_frame({"id": str(input_id), "value": str(value)}),
+        ])
+
+    def poll_controls(self):
+        """Drain the return channel non-blocking and return current control state.
+
+        Returns a ControlState(values, buttons) where:
+          - values: dict of latest control values keyed by id. Sliders/dials
+            remain floats; text_input controls remain strings.
+          - buttons: list of button ids that fired since the previous poll
+            (cleared after this call).
+
+        Call this from your tight loop before computing the next sample.
+
+        Also transparently handles ``resend_config`` requests from the
+        server: if the server crashed and reconnected (or the user clicked
+        the Reconnect button on a tab), it asks us to re-publish the cached
+        initialize_plots() payload so the plot rewires without the user
+        restarting their script. The request is consumed silently — the
+        returned ControlState only ever contains control/button events.
+        """
+        self._ensure_sockets()
+        while True:
+            try:
+                event = self.control_socket.recv_json(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            except zmq.ZMQError:
+                break
+            evtype = event.get("type")
+            if evtype == "button":
+                self._control_button_events.append(event.get("id"))
+            elif evtype == "slider":
+                self._control_values[event.get("id")] = float(event.get("value", 0.0))
+            elif evtype == "text":
+                self._control_values[event.get("id")] = str(event.get("value", ""))
+            elif evtype == "resend_config":
+                if self.plot_desc_dict is not None:
+                    self._publish(
+                        [SENDING_PLOT_UPDATE.encode()],
+                        [_json_frame(self.plot_desc_dict)],
+                    )
+                    # Surface a one-line confirmation so the user can see
+                    # in their script log that the recovery handshake
+                    # worked. If they never see this after clicking
+                    # Reconnect, the PUSH/PULL channel back from the server
+                    # isn't wired — check that poll_controls() is actually
+                    # being called.
+                    print("rtplot.client: resent cached initialize_plots() config")
+
+        buttons = self._control_button_events
+        self._control_button_events = []
+        return ControlState(values=dict(self._control_values), buttons=buttons)
+
+    def close(self, timeout=1.0):
+        """Stop the background sender (flushing up to ``timeout`` s) and
+        close both sockets. A later send opens fresh ones, like a new
+        instance would."""
+        self.disable_background_sender(timeout)
+        for sock in (self.socket, self.control_socket):
+            if sock is not None:
+                sock.close(0)
+        self.socket = None
+        self.control_socket = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+@atexit.register
+def _stop_background_senders():
+    for c in list(_clients):
+        c.disable_background_sender()
+
+
+def _minmax_decimate(block, factor):
+    """Reduce ``(traces, n * factor)`` samples to ``(traces, 2 * n)``.
+
+    Every bucket of ``factor`` samples becomes its min and max, in the
+    order they occurred (the M4 idea without the redundant first/last
+    points), so spikes survive decimation and the line still zig-zags
+    the right way. A trailing partial bucket is reduced the same way,
+    so it too becomes two points although it covers fewer samples.
+    """
+    traces, total = block.shape
+    n_full = total // factor
+    parts = []
+    if n_full:
+        b = block[:, :n_full * factor].reshape(traces, n_full, factor)
+        parts.append(b)
+    if total > n_full * factor:
+        parts.append(block[:, n_full * factor:].reshape(traces, 1, -1))
+    out = []
+    for b in parts:
+        imin = b.argmin(axis=2)[..., None]
+        imax = b.argmax(axis=2)[..., None]
+        vmin = np.take_along_axis(b, imin, axis=2)
+        vmax = np.take_along_axis(b, imax, axis=2)
+        min_first = imin <= imax
+        pair = np.concatenate(
+            [np.where(min_first, vmin, vmax), np.where(min_first, vmax, vmin)],
+            axis=2,
+        )
+        out.append(pair.reshape(traces, -1))
+    return out[0] if len(out) == 1 else np.concatenate(out, axis=1)
+
+
+class Stream:
+    """Accumulate per-tick samples and send them as one batch.
+
+    Calling ``send_array()`` once per control-loop tick turns every sample
+    into its own ZMQ message and its own buffer write on the server. A
+    Stream collects samples into a preallocated ``(num_traces,
+    batch_size)`` array instead and flushes it as a single
+    ``send_array()`` batch when ``batch_size`` samples are collected or
+    ``max_latency`` seconds have passed since the first unsent sample,
+    whichever comes first.
+
+        stream = client.Stream(batch_size=20, max_latency=0.02)
+        while True:
+            stream.append([torque, velocity])
+
+    Larger batches trade latency for throughput. Deadlines are checked on
+    ``append()``; if your loop can stall, call ``poll()`` periodically so
+    a partial batch still goes out on time. Use ``flush()`` (or a
+    ``with`` block) to send whatever is pending before exiting.
+
+    With ``decimate=k`` each batch is reduced before sending: every k
+    samples become their min and max (in time order), cutting bandwidth
+    by k/2 while keeping peaks visible. Pass ``sample_rate`` (the rate
+    you append at) so the plot config declares the effective rate and
+    the server labels the x axis in seconds; note ``xrange`` then counts
+    decimated samples. Create the Stream before ``initialize_plots()``
+    so the rate goes out with the config; afterwards the config has to
+    be re-sent, which clears what the tab has plotted so far.
+
+    Size and deadline flushes only send whole buckets, so the declared
+    rate is exact for them. An explicit ``flush()`` (or leaving a
+    ``with`` block) also sends a trailing partial bucket as a min/max
+    pair, which slightly stretches the time axis at that point.
 
     Inputs
     ------
-    plot_description:
-        - int N: one plot with N anonymous traces
-        - str: one plot with a single named trace
-        - dict: one plot with full styling
-        - list of str: one plot, one trace per name
-        - list of list of str: one plot per sublist
-        - list of dict: multiple plots, each with full styling
-    handshake_timeout:
-        Max seconds to wait for the config_ack. On timeout we print a
-        warning and return (so an old server without the handshake
-        feature, or a server on a flaky network, doesn't block the
-        caller forever). Set to 0 to skip the handshake entirely.
+    num_traces: number of values per sample. Defaults to the number of
+        plotted traces in the client's last initialize_plots() call.
+    batch_size: samples per batch (the N in ``(num_traces, N)``).
+    max_latency: max seconds a sample may wait before it's sent, or
+        None for purely size-based flushing.
+    dtype: dtype of the preallocated batch array.
+    client: RTPlotClient to send through; defaults to the module's
+        default client.
+    decimate: bucket size k for min/max decimation, or None to send
+        every sample. batch_size is rounded up to a multiple of k.
+    sample_rate: samples per second you append at. Declared to the
+        server (divided by k/2 when decimating) in the plot config.
     """
-    global plot_desc_dict
 
-    #Process int inputs
-    if isinstance(plot_descriptions,int):
-        plot_desc_dict = OrderedDict()
-        plot_desc_dict["plot0"] = {"names":["Trace {}".format(i) for i in range (plot_descriptions)]}
+    def __init__(self, num_traces=None, batch_size=50, max_latency=0.05,
+                 dtype=np.float64, client=None, decimate=None,
+                 sample_rate=None):
+        self.client = client if client is not None else _default_client
+        if num_traces is None:
+            num_traces = _num_plot_traces(self.client.plot_desc_dict)
+            if num_traces == 0:
+                raise ValueError(
+                    "Stream needs num_traces, or call initialize_plots() first"
+                )
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        if decimate is not None:
+            decimate = int(decimate)
+            if decimate < 2:
+                raise ValueError("decimate must be >= 2")
+            batch_size = -(-int(batch_size) // decimate) * decimate
+        self.decimate = decimate
+        self.num_traces = int(num_traces)
+        self.batch_size = int(batch_size)
+        self.max_latency = max_latency
+        self._buffer = np.zeros((self.num_traces, self.batch_size), dtype=dtype)
+        self._count = 0
+        self._deadline = None
+
+        self.effective_sample_rate = None
+        if sample_rate is not None:
+            self.effective_sample_rate = float(sample_rate)
+            if decimate is not None:
+                self.effective_sample_rate *= 2.0 / decimate
+            self.client._declare_sample_rate(self.effective_sample_rate)
+
+    @property
+    def pending(self):
+        """Number of samples waiting to be sent."""
+        return self._count
+
+    def append(self, sample):
+        """Add one sample (a scalar or one value per trace)."""
+        if self._count == 0 and self.max_latency is not None:
+            self._deadline = time.monotonic() + self.max_latency
+        self._buffer[:, self._count] = sample
+        self._count += 1
+        if self._count >= self.batch_size:
+            self.flush()
+        elif self._deadline is not None and time.monotonic() >= self._deadline:
+            self._flush(whole_buckets=True)
+
+    def extend(self, samples):
+        """Add a ``(num_traces, n)`` block of samples."""
+        samples = np.asarray(samples)
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        i = 0
+        n = samples.shape[1]
+        while i < n:
+            if self._count == 0 and self.max_latency is not None:
+                self._deadline = time.monotonic() + self.max_latency
+            take = min(n - i, self.batch_size - self._count)
+            self._buffer[:, self._count:self._count + take] = samples[:, i:i + take]
+            self._count += take
+            i += take
+            if self._count >= self.batch_size:
+                self.flush()
+        self.poll()
+
+    def poll(self):
+        """Flush the pending batch if its latency deadline has passed."""
+        if self._count and self._deadline is not None \
+                and time.monotonic() >= self._deadline:
+            self._flush(whole_buckets=True)
+
+    def flush(self):
+        """Send every pending sample now."""
+        self._flush(whole_buckets=False)
+
+    def _flush(self, whole_buckets):
+        count = self._count
+        if whole_buckets and self.decimate is not None:
+            # A deadline flush only sends complete buckets so each
+            # decimated point keeps covering exactly k samples; the
+            # remainder waits (at most one more max_latency).
+            count -= count % self.decimate
+        if count == 0:
+            if self._count and self.max_latency is not None:
+                self._deadline = time.monotonic() + self.max_latency
+            return
+        if count == self.batch_size:
+            batch = self._buffer
+        else:
+            batch = np.ascontiguousarray(self._buffer[:, :count])
+        if self.decimate is not None:
+            batch = _minmax_decimate(batch, self.decimate)
+        # send_array copies the buffer into the ZMQ message, so the
+        # preallocated array can be refilled straight away.
+        self.client.send_array(batch)
+        rest = self._count - count
+        self._deadline = None
+        if rest:
+            self._buffer[:, :rest] = self._buffer[:, count:self._count]
+            if self.max_latency is not None:
+                self._deadline = time.monotonic() + self.max_latency
+        self._count = rest
 
-    #Process string inputs
-    elif isinstance(plot_descriptions, str):
-        plot_desc_dict = OrderedDict()
-        plot_desc_dict["plot0"] = {"names":[plot_descriptions]}
+    def __enter__(self):
+        return self
 
-    #Process dictionary inputs
-    elif isinstance(plot_descriptions, dict):
-        plot_desc_dict = OrderedDict()
-        plot_desc_dict["plot0"] = plot_descriptions
+    def __exit__(self, *exc):
+        self.flush()
+        return False
 
-    #Process typed inputs (Plot / ControlsRow) passed alone
-    elif hasattr(plot_descriptions, "to_dict"):
-        plot_desc_dict = OrderedDict()
-        plot_desc_dict["plot0"] = plot_descriptions.to_dict()
 
-    #Process lists of things
-    elif isinstance(plot_descriptions, list):
 
-        #Process list of strings
-        if isinstance(plot_descriptions[0],str):
-            plot_desc_dict = OrderedDict()
-            plot_desc_dict["plot0"] = {"names":plot_descriptions}
 
-        # Prcoess list with lists
-        if isinstance(plot_descriptions[0],list):
-            plot_desc_dict = OrderedDict()
-            for i,plot_desc in enumerate(plot_descriptions):
-                plot_desc_dict["plot{}".format(i)] = {"names":plot_desc}
+###########################
+# Default-client facade #
+###########################
+#
+# The original single-stream API. Every function below forwards to one
+# module-wide RTPlotClient, so existing scripts keep working unchanged.
 
-        #Process list of dicts or typed objects (Plot / ControlsRow),
-        # including mixed lists — anything exposing .to_dict() is normalized
-        # to the wire dict form.
-        elif isinstance(plot_descriptions[0],dict) or hasattr(plot_descriptions[0], "to_dict"):
-            plot_desc_dict = OrderedDict()
-            for i,plot_desc in enumerate(plot_descriptions):
-                if hasattr(plot_desc, "to_dict"):
-                    plot_desc = plot_desc.to_dict()
-                plot_desc_dict["plot{}".format(i)] = plot_desc
+_default_client = RTPlotClient()
 
-    #Throw error
-    else:
-        raise TypeError("Incorrect usage of initialize_plots, verify github for usage")
+#Module attributes that used to be globals and now live on the default
+# client; reads go through the module __getattr__ below and writes
+# through _ClientModule, so both ``client.plot_desc_dict`` and
+# ``client.plot_desc_dict = ...`` keep working.
+_DEFAULT_CLIENT_ATTRS = frozenset({
+    "context", "socket", "control_socket", "plot_desc_dict",
+    "prev_address", "bind_address", "control_bind_address",
+    "current_data_port", "known_pi_address_prev", "failed_bind",
+    "_wire_protocol", "_data_seq", "_sender",
+    "_control_values", "_control_button_events",
+})
 
-    _send_initialize_with_handshake(plot_desc_dict, handshake_timeout)
 
+def __getattr__(name):
+    if name in _DEFAULT_CLIENT_ATTRS:
+        return getattr(_default_client, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def _send_initialize_with_handshake(cfg, timeout):
-    """Publish ``cfg`` and block until the server acks it.
 
-    Any control events (button presses, slider updates) that happen to
-    arrive during the handshake are stashed in the module-level caches
-    so the next ``poll_controls()`` call still sees them — we don't
-    want the handshake to swallow real user interaction.
-    """
-    global _control_button_events
+class _ClientModule(types.ModuleType):
+    """Module type that forwards assignments to the old globals to the
+    default client, instead of shadowing them with a module attribute."""
 
-    def _send_once():
-        socket.send_string(SENDING_PLOT_UPDATE)
-        socket.send_json(cfg)
+    def __setattr__(self, name, value):
+        if name in _DEFAULT_CLIENT_ATTRS:
+            setattr(_default_client, name, value)
+        else:
+            super().__setattr__(name, value)
 
-    _send_once()
 
-    if timeout is None or timeout <= 0:
-        return  # opt-out: fire-and-forget like the pre-handshake behavior
+sys.modules[__name__].__class__ = _ClientModule
 
-    deadline = time.time() + timeout
-    resend_interval = 0.2
-    last_send = time.time()
 
-    poller = zmq.Poller()
-    poller.register(control_socket, zmq.POLLIN)
+def get_default_client():
+    """Return the RTPlotClient behind the module-level functions."""
+    return _default_client
 
-    while time.time() < deadline:
-        remaining_ms = max(10, int((deadline - time.time()) * 1000))
-        next_resend_ms = max(1, int((last_send + resend_interval - time.time()) * 1000))
-        wait_ms = min(remaining_ms, next_resend_ms)
-        events = dict(poller.poll(wait_ms))
-        if control_socket in events:
-            try:
-                event = control_socket.recv_json(flags=zmq.NOBLOCK)
-            except (zmq.Again, zmq.ZMQError):
-                continue
-            evtype = event.get("type")
-            if evtype == "config_ack":
-                return
-            elif evtype == "button":
-                _control_button_events.append(event.get("id"))
-            elif evtype == "slider":
-                _control_values[event.get("id")] = float(event.get("value", 0.0))
-            elif evtype == "text":
-                _control_values[event.get("id")] = str(event.get("value", ""))
-            # Unknown / resend_config: ignore during handshake.
-        # Resend if the window elapsed without an ack; PUB/SUB will
-        # drop the first send during slow-join but retries land.
-        if time.time() - last_send >= resend_interval:
-            _send_once()
-            last_send = time.time()
-
-    print(
-        "rtplot.client: initialize_plots() timed out waiting for server ack"
-        f" after {timeout:.1f}s — the plot config may have been dropped."
-        " If you're on an older server (rtplot < 0.4.9) this warning is"
-        " expected and harmless."
+
+def local_plot():
+    """Send data to a plot in the same computer"""
+    _default_client.local_plot()
+
+
+def configure_port(new_port:int):
+    """Rebind the local publisher on ``new_port``. See RTPlotClient.configure_port."""
+    _default_client.configure_port(new_port)
+
+
+def configure_ip(ip = None, known_pi_address = False, new_bind_address = None,
+                 connect_timeout = 1.0):
+    """Connect to a subscriber at a specific IP address. See RTPlotClient.configure_ip."""
+    _default_client.configure_ip(
+        ip, known_pi_address, new_bind_address, connect_timeout
     )
 
 
-def set_display(display_id: str, value):
-    """Push a single display box value to the browser.
+def send_array(A, flags=0, copy=True, track=False):
+    """Send a numpy array of samples. See RTPlotClient.send_array."""
+    _default_client.send_array(A, flags, copy, track)
 
-    Display boxes are read-only UI elements declared via a 'controls' row in
-    initialize_plots(). Call this method from your loop to update their
-    displayed value; the server rebroadcasts dirty values to all connected
-    browsers at ~30 Hz.
 
-    Accepts either numeric values (for 'display' elements) or strings
-    (for 'text' elements). Everything else is coerced to str().
-    """
-    if isinstance(value, (int, float)) and not isinstance(value, bool):
-        payload_value = float(value)
-    else:
-        payload_value = str(value)
-    socket.send_string(SENDING_DISPLAY, zmq.SNDMORE)
-    socket.send_json({"id": str(display_id), "value": payload_value})
+def enable_background_sender(queue_size=64, overflow="drop_oldest"):
+    """Move sends onto an I/O thread. See RTPlotClient.enable_background_sender."""
+    _default_client.enable_background_sender(queue_size, overflow)
 
 
-def set_text_input(input_id: str, value):
-    """Push a text_input control value to the browser and server state.
+def disable_background_sender(timeout=1.0):
+    """Flush and stop the I/O thread. See RTPlotClient.disable_background_sender."""
+    _default_client.disable_background_sender(timeout)
+
+
+def sender_stats():
+    """Background sender counters, or None. See RTPlotClient.sender_stats."""
+    return _default_client.sender_stats()
 
-    This is the editable-control companion to set_display(). It updates
-    declared 'text_input' controls without rebuilding the full plot config,
-    and the server keeps the value as the current control state returned by
-    poll_controls().
-    """
-    socket.send_string(SENDING_TEXT_INPUT, zmq.SNDMORE)
-    socket.send_json({"id": str(input_id), "value": str(value)})
+
+def initialize_plots(plot_descriptions=1, handshake_timeout=2.0, wire_dtype=None,
+                     compression=None, compression_level=None):
+    """Declare the plot layout and wait for the server's ack.
+    See RTPlotClient.initialize_plots for the accepted forms."""
+    _default_client.initialize_plots(
+        plot_descriptions, handshake_timeout, wire_dtype,
+        compression, compression_level,
+    )
+
+
+def set_display(display_id: str, value):
+    """Push a display box value to the browser. See RTPlotClient.set_display."""
+    _default_client.set_display(display_id, value)
+
+
+def set_text_input(input_id: str, value):
+    """Push a text_input control value. See RTPlotClient.set_text_input."""
+    _default_client.set_text_input(input_id, value)
 
 
 def poll_controls():
-    """Drain the return channel non-blocking and return current control state.
-
-    Returns a ControlState(values, buttons) where:
-      - values: dict of latest control values keyed by id. Sliders/dials
-        remain floats; text_input controls remain strings.
-      - buttons: list of button ids that fired since the previous poll
-        (cleared after this call).
-
-    Call this from your tight loop before computing the next sample.
-
-    Also transparently handles ``resend_config`` requests from the server:
-    if the server crashed and reconnected (or the user clicked the
-    Reconnect button on a tab), it asks us to re-publish the cached
-    initialize_plots() payload so the plot rewires without the user
-    restarting their script. The request is consumed silently — the
-    returned ControlState only ever contains control/button events.
-    """
-    global _control_button_events
-    while True:
-        try:
-            event = control_socket.recv_json(flags=zmq.NOBLOCK)
-        except zmq.Again:
-            break
-        except zmq.ZMQError:
-            break
-        evtype = event.get("type")
-        if evtype == "button":
-            _control_button_events.append(event.get("id"))
-        elif evtype == "slider":
-            _control_values[event.get("id")] = float(event.get("value", 0.0))
-        elif evtype == "text":
-            _control_values[event.get("id")] = str(event.get("value", ""))
-        elif evtype == "resend_config":
-            if plot_desc_dict is not None:
-                socket.send_string(SENDING_PLOT_UPDATE)
-                socket.send_json(plot_desc_dict)
-                # Surface a one-line confirmation so the user can see in
-                # their script log that the recovery handshake worked.
-                # If they never see this after clicking Reconnect, the
-                # PUSH/PULL channel back from the server isn't wired —
-                # check that poll_controls() is actually being called.
-                print("rtplot.client: resent cached initialize_plots() config")
-
-    buttons = _control_button_events
-    _control_button_events = []
-    return ControlState(values=dict(_control_values), buttons=buttons)
-
-
-def save_snapshot(path, server_url=None, animate=False, timeout=5.0):
+    """Drain the return channel and return ControlState(values, buttons).
+    See RTPlotClient.poll_controls."""
+    return _default_client.poll_controls()
+
+
+def save_snapshot(path, server_url=None, animate=False, timeout=5.0, points=None):
     """Download a static HTML snapshot of the current plot to ``path``.
 
     The server exposes a ``/snapshot.html`` endpoint that renders the
@@ -678,6 +1505,10 @@ def save_snapshot(path, server_url=None, animate=False, timeout=5.0):
         gallery previews that benefit from visible motion).
     timeout : float, optional
         Seconds to wait for the HTTP GET to complete. Default 5.0.
+    points : int, optional
+        Embed at most about this many points per trace (the min and max
+        of each stretch of samples) instead of the whole window. Keeps
+        snapshots of long windows small; spikes stay visible.
 
     Returns
     -------
@@ -691,7 +1522,12 @@ def save_snapshot(path, server_url=None, animate=False, timeout=5.0):
     base = base.strip().rstrip("/")
     if not base.lower().startswith(("http://", "https://")):
         base = "http://" + base
-    url = base + "/snapshot.html" + ("?animate=1" if animate else "")
+    query = []
+    if animate:
+        query.append("animate=1")
+    if points is not None:
+        query.append(f"points={int(points)}")
+    url = base + "/snapshot.html" + ("?" + "&".join(query) if query else "")
 
     with _urlopen(url, timeout=timeout) as resp:  # noqa: S310 — local HTTP to our own server
         body = resp.read()
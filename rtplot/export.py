@@ -0,0 +1,134 @@
+"""Incremental encoders for exporting sample history as files.
+
+The browser server streams ``/api/tabs/{id}/export`` a chunk at a time,
+so none of these ever hold more than one chunk of samples. Each format
+turns ``(traces, n)`` chunks, in order, into bytes:
+
+    npy   one ``(traces, n)`` array. Stored Fortran-order, i.e. sample by
+          sample, so chunks can be appended as they come; ``np.load``
+          returns it like any other array.
+    npz   the same array as ``data``, plus ``start`` (absolute position
+          of its first sample) and ``labels``, in a zip written with data
+          descriptors so nothing needs to be seeked back to.
+    csv   a ``sample,<label>,...`` header, then one row per sample.
+
+``np.load``/``np.genfromtxt`` read all three back without rtplot.
+"""
+
+import io
+import zipfile
+
+import numpy as np
+
+FORMATS = ("npy", "npz", "csv")
+CONTENT_TYPES = {
+    "npy": "application/octet-stream",
+    "npz": "application/zip",
+    "csv": "text/csv",
+}
+# Samples per chunk are picked so a chunk holds about this many bytes of
+# binary samples: small enough that reading and encoding one doesn't
+# hold up the event loop, big enough that per-chunk overhead vanishes.
+CHUNK_BYTES = 1 << 18
+
+
+def chunk_samples(num_traces, itemsize):
+    return max(1, CHUNK_BYTES // (max(1, num_traces) * itemsize))
+
+
+def npy_header(dtype, num_traces, num_samples):
+    """``.npy`` (v1.0) header for a Fortran-order ``(traces, n)`` array."""
+    header = repr({
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": True,
+        "shape": (int(num_traces), int(num_samples)),
+    })
+    # Magic, version and length take 10 bytes; pad the whole header to
+    # a multiple of 64 with spaces and a newline, as numpy does.
+    pad = -(10 + len(header) + 1) % 64
+    header = (header + " " * pad + "\n").encode("latin1")
+    return np.lib.format.magic(1, 0) + len(header).to_bytes(2, "little") + header
+
+
+def npy_chunk(arr):
+    """Bytes of a ``(traces, n)`` chunk in Fortran (sample-major) order."""
+    return arr.T.tobytes()
+
+
+def csv_header(labels):
+    return (",".join(["sample"] + [str(label).replace(",", " ") for label in labels])
+            + "\n").encode("utf-8")
+
+
+def csv_chunk(arr, start):
+    """CSV rows for a ``(traces, n)`` chunk whose first sample is ``start``.
+
+    Floats are written with enough digits to read back bit-exact. This
+    is pure-Python formatting; run it off the event loop.
+    """
+    digits = 17 if arr.dtype.itemsize > 4 else 9
+    row = "%d" + f",%.{digits}g" * arr.shape[0] + "\n"
+    n = arr.shape[1]
+    if n == 0:
+        return b""
+    table = np.empty((n, arr.shape[0] + 1), dtype=np.float64)
+    table[:, 0] = np.arange(start, start + n)
+    table[:, 1:] = arr.T
+    return ((row * n) % tuple(table.ravel().tolist())).encode("ascii")
+
+
+class _Sink:
+    """Write-only file object that hands its bytes to ``take``."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class NpzStream:
+    """An ``.npz`` built member by member without seeking.
+
+    ``begin_data`` opens the ``data`` member; feed it ``npy_chunk``
+    bytes with ``write`` and call ``finish`` after the last. After each
+    call, ``take`` returns the zip bytes produced so far.
+    """
+
+    def __init__(self):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", zipfile.ZIP_STORED, allowZip64=True)
+        self._member = None
+
+    def take(self):
+        return self._sink.take()
+
+    def _add_array(self, name, arr):
+        buf = io.BytesIO()
+        np.lib.format.write_array(buf, np.asanyarray(arr), allow_pickle=False)
+        self._zip.writestr(name + ".npy", buf.getvalue())
+
+    def begin_data(self, dtype, num_traces, num_samples, start, labels):
+        self._add_array("start", np.int64(start))
+        self._add_array("labels", np.array([str(label) for label in labels]))
+        # Sizes are unknown to zipfile up front on a stream; zip64 keeps
+        # members over 2 GiB valid.
+        self._member = self._zip.open("data.npy", "w", force_zip64=True)
+        self._member.write(npy_header(dtype, num_traces, num_samples))
+
+    def write(self, data):
+        self._member.write(data)
+
+    def finish(self):
+        self._member.close()
+        self._zip.close()
+
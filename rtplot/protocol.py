@@ -0,0 +1,374 @@
+"""Binary data-frame protocol shared by the client and both servers.
+
+The original data path sends three ZMQ messages per ``send_array()``
+call: the category string on its own, then a JSON metadata frame plus
+the raw array as a two-part message. The receiver has to reassemble
+them across three receives, which is where "lost sync with client"
+comes from, and every sample batch pays a ``json.dumps`` /
+``json.loads`` round trip.
+
+Protocol version 2 ("packed") replaces that with one atomic multipart
+message per batch::
+
+    frame 0   category string, ``SENDING_PACKED_DATA`` ("6")
+    frame 1   fixed-size little-endian header, ``DATA_HEADER_FMT``
+    frame 2   raw array bytes, C order, shape (num_traces, num_samples)
+
+ZMQ delivers all frames of a multipart message or none of them, so a
+receiver can never see a header without its payload. The header's flags
+byte may declare that the payload is filtered and compressed (see
+``encode_payload``).
+
+Protocol version 3 appends the client's wall-clock send time to the
+header so the server can measure network latency per frame.
+
+The client only switches to packed frames after the server advertised
+``"protocol": 2`` (or newer) in its ``config_ack`` — old servers keep
+getting the legacy three-receive framing — and only timestamps them
+when it advertised 3.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+try:  # Optional fast codecs; zlib (stdlib) is always available.
+    import lz4.frame as _lz4  # type: ignore
+except ImportError:
+    _lz4 = None  # type: ignore
+
+try:
+    import zstandard as _zstd  # type: ignore
+except ImportError:
+    _zstd = None  # type: ignore
+
+
+# Protocol versions. 1 is the legacy JSON-metadata framing, 2 adds the
+# packed single-message data frame, 3 adds a send timestamp to it.
+PROTOCOL_LEGACY = 1
+PROTOCOL_PACKED = 2
+PROTOCOL_TIMESTAMPED = 3
+PROTOCOL_VERSION = PROTOCOL_TIMESTAMPED
+
+# Category string that precedes a packed data frame. "0"-"5" are taken
+# by the legacy categories (see client.SENDING_*).
+SENDING_PACKED_DATA = "6"
+
+# Packed data-frame header:
+#   uint8  version      (PROTOCOL_PACKED or PROTOCOL_TIMESTAMPED)
+#   uint8  dtype code   (see DTYPE_CODES)
+#   uint8  flags        (payload encoding: codec | filter << 4, 0 = raw)
+#   uint8  pad
+#   uint32 num_traces
+#   uint32 num_samples
+#   uint64 seq          (monotonic per sender, wraps at 2**64)
+#   float64 send_time   (version 3 only: time.time() at send, seconds)
+DATA_HEADER_FMT = "<BBBxIIQ"
+DATA_HEADER_SIZE = struct.calcsize(DATA_HEADER_FMT)
+TIMESTAMPED_HEADER_FMT = DATA_HEADER_FMT + "d"
+TIMESTAMPED_HEADER_SIZE = struct.calcsize(TIMESTAMPED_HEADER_FMT)
+
+# Stable on-the-wire codes for the dtypes we accept. Anything else is
+# converted to float64 by the sender before packing.
+DTYPE_CODES = {
+    np.dtype("<f8"): 0,
+    np.dtype("<f4"): 1,
+    np.dtype("<i2"): 2,
+    np.dtype("<i4"): 3,
+    np.dtype("<i8"): 4,
+    np.dtype("<u1"): 5,
+    np.dtype("<u2"): 6,
+    np.dtype("<u4"): 7,
+}
+CODE_DTYPES = {code: dtype for dtype, code in DTYPE_CODES.items()}
+
+
+class ProtocolError(ValueError):
+    """A packed frame could not be decoded."""
+
+
+def _as_2d(A, dtype=None):
+    A = np.asarray(A, dtype=dtype)
+    if A.ndim == 0:
+        return A.reshape(1, 1)
+    if A.ndim == 1:
+        return A.reshape(-1, 1)
+    return A
+
+
+def as_wire_array(A):
+    """Return ``A`` as a 2-D, C-contiguous array with a wire-known dtype."""
+    A = _as_2d(A)
+    dtype = A.dtype.newbyteorder("<") if A.dtype.byteorder == ">" else A.dtype
+    if np.dtype(dtype) not in DTYPE_CODES:
+        dtype = np.float64
+    return np.ascontiguousarray(A, dtype=dtype)
+
+
+# Compact dtypes a client may ask send_array() to transmit instead of
+# whatever the caller passed. Integer ones are quantized against the
+# per-trace "scale" / "offset" declared in the plot config:
+#   physical = raw * scale + offset
+WIRE_DTYPES = ("float32", "int16", "int32")
+
+
+def trace_scaling(plot_descriptions):
+    """Collect per-trace ``(scale, offset)`` arrays from a plot config.
+
+    Each plot may set ``"scale"`` and ``"offset"`` to one number (shared
+    by all of its traces) or a list with one entry per trace. Traces that
+    don't declare them get 1.0 / 0.0. Returns None when no plot declares
+    either key, so the common case costs nothing on ingest.
+    """
+    scales, offsets = [], []
+    declared = False
+    for desc in plot_descriptions.values():
+        if "controls" in desc or "non_plot_labels" in desc:
+            continue
+        n = len(desc.get("names", []))
+        for key, default, out in (("scale", 1.0, scales), ("offset", 0.0, offsets)):
+            value = desc.get(key)
+            if value is None:
+                out.extend([default] * n)
+                continue
+            declared = True
+            if isinstance(value, (list, tuple)):
+                if len(value) != n:
+                    raise ValueError(
+                        f"'{key}' has {len(value)} entries for {n} traces"
+                    )
+                out.extend(float(v) for v in value)
+            else:
+                out.extend([float(value)] * n)
+    if not declared:
+        return None
+    scale = np.array(scales, dtype=np.float64)
+    if np.any(scale == 0):
+        raise ValueError("'scale' must be non-zero")
+    return scale, np.array(offsets, dtype=np.float64)
+
+
+def _per_row(values, rows, default):
+    # Columns broadcast against a (rows, N) array; extra rows (beyond the
+    # declared traces) pass through unscaled.
+    if len(values) >= rows:
+        return values[:rows, None]
+    padded = np.full(rows, default)
+    padded[:len(values)] = values
+    return padded[:, None]
+
+
+def quantize(A, dtype, scaling=None):
+    """Convert samples to the compact wire ``dtype`` (see WIRE_DTYPES).
+
+    Floats are just downcast. Integers store
+    ``round((A - offset) / scale)``, clipped to the dtype's range, with
+    ``scaling`` as returned by trace_scaling() (None means scale 1,
+    offset 0).
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return _as_2d(A).astype(dtype, copy=False)
+    A = _as_2d(A, dtype=np.float64)
+    if scaling is not None:
+        scale, offset = scaling
+        rows = A.shape[0]
+        A = (A - _per_row(offset, rows, 0.0)) / _per_row(scale, rows, 1.0)
+    q = np.rint(A)
+    info = np.iinfo(dtype)
+    np.clip(q, info.min, info.max, out=q)
+    return q.astype(dtype)
+
+
+def dequantize(arr, scaling):
+    """Map integer wire samples back to physical units.
+
+    Float arrays, and any array when ``scaling`` is None, are returned
+    unchanged.
+    """
+    if scaling is None or arr.dtype.kind not in "iu":
+        return arr
+    scale, offset = scaling
+    rows = arr.shape[0]
+    return arr * _per_row(scale, rows, 1.0) + _per_row(offset, rows, 0.0)
+
+
+# Payload compression, declared per frame in the header flags byte. The
+# low nibble is the codec, the high nibble the reversible filter applied
+# along the sample axis first: delta for integers, XOR of consecutive
+# bit patterns for floats. Slowly varying signals turn into long runs of
+# small numbers / zero bytes, which the codec then squeezes.
+#
+# Servers list the codecs they can decode in their config_ack
+# ("codecs"); clients only compress with one of those.
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZ4 = 2
+CODEC_ZSTD = 3
+CODEC_NAMES = {"zlib": CODEC_ZLIB, "lz4": CODEC_LZ4, "zstd": CODEC_ZSTD}
+
+FILTER_NONE = 0
+FILTER_DELTA = 1
+FILTER_XOR = 2
+
+# Preference order for compression="auto": fastest first.
+_AUTO_ORDER = ("lz4", "zstd", "zlib")
+
+
+def available_codecs():
+    """Names of the codecs this process can encode and decode."""
+    names = ["zlib"]
+    if _lz4 is not None:
+        names.append("lz4")
+    if _zstd is not None:
+        names.append("zstd")
+    return names
+
+
+def choose_codec(requested, peer_codecs):
+    """Pick the codec name to use given a request and the peer's list.
+
+    ``requested`` is a codec name or "auto" (fastest one both sides
+    have). Returns None if the peer can't decode the request.
+    """
+    usable = set(available_codecs()) & set(peer_codecs or ())
+    if requested == "auto":
+        for name in _AUTO_ORDER:
+            if name in usable:
+                return name
+        return None
+    return requested if requested in usable else None
+
+
+def _apply_filter(A):
+    """Return ``(filter_id, filtered)`` for the 2-D wire array ``A``."""
+    if A.shape[1] < 2:
+        return FILTER_NONE, A
+    if A.dtype.kind == "f":
+        u = A.view(np.dtype(f"<u{A.dtype.itemsize}"))
+        out = u.copy()
+        np.bitwise_xor(u[:, 1:], u[:, :-1], out=out[:, 1:])
+        return FILTER_XOR, out
+    out = A.copy()
+    # Integer subtraction wraps, and so does the cumsum that undoes it,
+    # so the round trip is exact even when a difference overflows.
+    np.subtract(A[:, 1:], A[:, :-1], out=out[:, 1:])
+    return FILTER_DELTA, out
+
+
+def _undo_filter(filter_id, arr, dtype):
+    if filter_id == FILTER_NONE:
+        return arr
+    if filter_id == FILTER_XOR:
+        u = arr.view(np.dtype(f"<u{dtype.itemsize}"))
+        return np.bitwise_xor.accumulate(u, axis=1).view(dtype)
+    if filter_id == FILTER_DELTA:
+        return np.cumsum(arr, axis=1, dtype=dtype)
+    raise ProtocolError(f"unknown filter {filter_id}")
+
+
+def _compress(codec, data, level):
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 1 if level is None else level)
+    if codec == CODEC_LZ4:
+        return _lz4.compress(data, compression_level=level or 0)
+    if codec == CODEC_ZSTD:
+        return _zstd.ZstdCompressor(level=1 if level is None else level).compress(data)
+    raise ValueError(f"unknown codec {codec}")
+
+
+def _decompress(codec, data, expected):
+    """Decompress at most ``expected + 1`` bytes of ``data``.
+
+    The payload comes off the network, so the output is capped at what
+    the header promises; one byte over is enough for the caller's size
+    check to reject a frame that would expand further.
+    """
+    limit = expected + 1
+    try:
+        if codec == CODEC_ZLIB:
+            return zlib.decompressobj().decompress(data, limit)
+        if codec == CODEC_LZ4 and _lz4 is not None:
+            return _lz4.LZ4FrameDecompressor().decompress(data, max_length=limit)
+        if codec == CODEC_ZSTD and _zstd is not None:
+            # decompress() would trust the frame's own content size.
+            with _zstd.ZstdDecompressor().stream_reader(data) as reader:
+                return reader.read(limit)
+    except Exception as exc:  # noqa: BLE001 — every codec has its own error type
+        raise ProtocolError(f"could not decompress payload: {exc}") from exc
+    raise ProtocolError(f"unsupported codec {codec}")
+
+
+def encode_payload(A, codec_name, level=None):
+    """Filter and compress the 2-D wire array ``A``.
+
+    Returns ``(flags, payload)``. Falls back to the raw array with flags 0
+    when compression doesn't make the frame smaller (tiny batches, noise).
+    """
+    codec = CODEC_NAMES[codec_name]
+    filter_id, filtered = _apply_filter(A)
+    packed = _compress(codec, filtered.tobytes(), level)
+    if len(packed) >= A.nbytes:
+        return 0, A
+    return codec | (filter_id << 4), packed
+
+
+def pack_data_header(A, seq, flags=0, send_time=None):
+    """Pack the header frame describing the 2-D wire array ``A``.
+
+    With ``send_time`` the header is a version 3 (timestamped) one.
+    """
+    fields = (
+        DTYPE_CODES[A.dtype],
+        flags,
+        A.shape[0],
+        A.shape[1],
+        seq & 0xFFFFFFFFFFFFFFFF,
+    )
+    if send_time is None:
+        return struct.pack(DATA_HEADER_FMT, PROTOCOL_PACKED, *fields)
+    return struct.pack(
+        TIMESTAMPED_HEADER_FMT, PROTOCOL_TIMESTAMPED, *fields, send_time
+    )
+
+
+def unpack_data_frame(header, payload):
+    """Decode a packed ``(header, payload)`` pair.
+
+    Returns ``(array, seq, send_time)`` where ``array`` has shape
+    ``(num_traces, num_samples)`` and ``send_time`` is None for version 2
+    frames. For uncompressed frames the array is a read-only view on
+    ``payload`` — copy it if you need to keep it past the next receive.
+    """
+    send_time = None
+    if len(header) == DATA_HEADER_SIZE:
+        version, dtype_code, flags, num_traces, num_samples, seq = struct.unpack(
+            DATA_HEADER_FMT, header
+        )
+        expected_version = PROTOCOL_PACKED
+    elif len(header) == TIMESTAMPED_HEADER_SIZE:
+        (version, dtype_code, flags, num_traces, num_samples, seq,
+         send_time) = struct.unpack(TIMESTAMPED_HEADER_FMT, header)
+        expected_version = PROTOCOL_TIMESTAMPED
+    else:
+        raise ProtocolError(
+            f"bad header size {len(header)} (expected {DATA_HEADER_SIZE}"
+            f" or {TIMESTAMPED_HEADER_SIZE})"
+        )
+    if version != expected_version:
+        raise ProtocolError(f"unsupported data frame version {version}")
+    dtype = CODE_DTYPES.get(dtype_code)
+    if dtype is None:
+        raise ProtocolError(f"unknown dtype code {dtype_code}")
+    expected = num_traces * num_samples * dtype.itemsize
+    if flags:
+        payload = _decompress(flags & 0x0F, payload, expected)
+    if len(payload) != expected:
+        raise ProtocolError(
+            f"payload is {len(payload)} bytes, header promises {expected}"
+        )
+    arr = np.frombuffer(payload, dtype=dtype).reshape(num_traces, num_samples)
+    if flags:
+        arr = _undo_filter(flags >> 4, arr, dtype)
+    return arr, seq, send_time
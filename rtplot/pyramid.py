@@ -0,0 +1,222 @@
+"""Multi-resolution min/max/mean summaries of a tab's sample history.
+
+``RingBuffer`` only keeps the newest ``--history`` samples, and answering
+"what did the last hour look like" from it means scanning every sample
+in the hour. ``HistoryPyramid`` keeps, next to the ring, a stack of
+coarser levels: level ``k`` holds one bin per ``fanout ** k`` samples
+with that bin's min, max and sum per trace. Each level is itself a
+fixed-size ring, so coarse levels reach back much further than the raw
+history for a few MB per trace.
+
+Bins are aligned to absolute sample positions (the same positions as
+``RingBuffer.head``). ``write`` updates only the bins a batch touches,
+and ``query`` reads the coarsest level that still resolves the request,
+so its cost follows the number of output points, not the span.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Summary(NamedTuple):
+    """``(traces, n)`` min/max/mean of ``n`` consecutive bins.
+
+    Bin ``j`` covers absolute samples
+    ``[start + j * bin_size, start + (j + 1) * bin_size)``; the first and
+    last bins may be only partly filled.
+    """
+
+    start: int
+    bin_size: int
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+
+
+def summarize(mins, maxs, sums, start, size):
+    """Merge per-unit stats into groups of ``size`` aligned units.
+
+    ``mins``/``maxs``/``sums`` are ``(traces, n)`` stats of consecutive
+    units starting at absolute unit ``start``. Groups start at multiples
+    of ``size``, so the first and last groups may hold fewer units.
+    Returns ``(first_group, mins, maxs, sums)``; with no units, the
+    arrays are empty.
+    """
+    if mins.shape[1] == 0:
+        return start // size, mins, maxs, sums.astype(np.float64)
+    starts = np.arange(-(start % size), mins.shape[1], size)
+    starts[0] = 0
+    return (
+        start // size,
+        np.minimum.reduceat(mins, starts, axis=1),
+        np.maximum.reduceat(maxs, starts, axis=1),
+        np.add.reduceat(sums, starts, axis=1, dtype=np.float64),
+    )
+
+
+class HistoryPyramid:
+    """Per-trace min/max/sum bins at ``fanout ** 1 .. fanout ** levels``.
+
+    Level ``k`` keeps ``max(history // fanout ** k, min_bins)`` bins, so
+    the finest levels cover about as much as the raw ring and each level
+    above reaches ``fanout`` times further back.
+    """
+
+    def __init__(self, num_traces, history, fanout=16, levels=5,
+                 min_bins=16384, dtype=np.float32):
+        if fanout < 2:
+            raise ValueError(f"fanout must be at least 2, got {fanout}")
+        self.fanout = int(fanout)
+        rows = max(1, num_traces)
+        self.bin_sizes = [self.fanout ** k for k in range(1, levels + 1)]
+        self.capacities = [max(history // size, min_bins, self.fanout)
+                           for size in self.bin_sizes]
+        self.mins = [np.zeros((rows, c), dtype=dtype) for c in self.capacities]
+        self.maxs = [np.zeros((rows, c), dtype=dtype) for c in self.capacities]
+        self.sums = [np.zeros((rows, c), dtype=np.float64) for c in self.capacities]
+        self.head = 0
+        self.origin = 0
+        # Levels above the first are brought up to date lazily; they
+        # reflect samples before ``_synced`` (see ``_sync``).
+        self._synced = 0
+
+    @property
+    def num_traces(self):
+        return self.mins[0].shape[0]
+
+    def reset(self, head=0):
+        """Forget everything and start summarizing at absolute ``head``."""
+        self.head = self.origin = self._synced = int(head)
+
+    def _first_bin(self, level):
+        """Oldest bin of ``level`` that still holds data."""
+        size = self.bin_sizes[level]
+        end = -(-self.head // size)
+        return max(self.origin // size, end - self.capacities[level])
+
+    def oldest(self, level):
+        """Absolute index of the oldest sample ``level`` still covers."""
+        return max(self.origin, self._first_bin(level) * self.bin_sizes[level])
+
+    def _store(self, level, first, mins, maxs, sums):
+        capacity = self.capacities[level]
+        n = mins.shape[1]
+        if n > capacity:
+            first += n - capacity
+            mins, maxs, sums = mins[:, -capacity:], maxs[:, -capacity:], sums[:, -capacity:]
+            n = capacity
+        i = first % capacity
+        if i + n <= capacity:
+            idx = slice(i, i + n)
+        else:
+            idx = np.arange(i, i + n) % capacity
+        self.mins[level][:, idx] = mins
+        self.maxs[level][:, idx] = maxs
+        self.sums[level][:, idx] = sums
+
+    def _read(self, level, lo, hi):
+        capacity = self.capacities[level]
+        i = lo % capacity
+        if i + hi - lo <= capacity:
+            idx = slice(i, i + hi - lo)
+        else:
+            idx = np.arange(i, i + hi - lo) % capacity
+        return self.mins[level][:, idx], self.maxs[level][:, idx], self.sums[level][:, idx]
+
+    def write(self, arr):
+        """Fold the batch ``arr`` (traces, n), which starts at ``head``, in.
+
+        Rows past ``num_traces`` are ignored and a single-row ``arr`` is
+        broadcast, as in ``RingBuffer.write``.
+        """
+        arr = arr[:self.num_traces]
+        n = arr.shape[1]
+        if n == 0:
+            return
+        if arr.shape[0] < self.num_traces:
+            arr = np.broadcast_to(arr, (self.num_traces, n))
+        start = self.head
+        self.head += n
+        f = self.fanout
+
+        # Level 1 from the raw samples. The first bin may already hold
+        # samples from the previous batch; merge with those.
+        first, mins, maxs, sums = summarize(arr, arr, arr, start, f)
+        if max(first * f, self.origin) < start:
+            old_min, old_max, old_sum = self._read(0, first, first + 1)
+            mins[:, :1] = np.minimum(mins[:, :1], old_min)
+            maxs[:, :1] = np.maximum(maxs[:, :1], old_max)
+            sums[:, :1] += old_sum
+        self._store(0, first, mins, maxs, sums)
+
+        # The levels above change far less per sample; batch them up.
+        if len(self.bin_sizes) > 1 and self.head - self._synced >= self.bin_sizes[1]:
+            self._sync()
+
+    def _sync(self):
+        """Recompute the bins above level 1 that changed since ``_synced``.
+
+        Each level's touched bins are rebuilt from their children
+        (complete ones included) in the level below.
+        """
+        if self._synced == self.head:
+            return
+        f = self.fanout
+        changed_lo = self._synced // f
+        changed_hi = -(-self.head // f)
+        self._synced = self.head
+        for level in range(1, len(self.bin_sizes)):
+            lo = max((changed_lo // f) * f, self._first_bin(level - 1))
+            if lo >= changed_hi:
+                break
+            mins, maxs, sums = self._read(level - 1, lo, changed_hi)
+            first, mins, maxs, sums = summarize(mins, maxs, sums, lo, f)
+            self._store(level, first, mins, maxs, sums)
+            changed_lo, changed_hi = first, first + mins.shape[1]
+
+    def query(self, lo, hi, max_points):
+        """Summarize samples ``[lo, hi)`` in at most ``max_points`` bins.
+
+        Reads the coarsest level whose bins are no wider than the output
+        bins and that still reaches back to ``lo`` (``lo`` is clamped to
+        what the top level covers), so the work is ``O(max_points *
+        fanout)`` whatever the span. Output bins are whole multiples of
+        that level's bins, aligned to absolute positions; each one is
+        summarized in full (up to what is written and still covered),
+        even where it reaches past ``[lo, hi)``. Returns None if nothing
+        in the range has been written.
+        """
+        lo = max(int(lo), self.origin)
+        hi = min(int(hi), self.head)
+        max_points = max(1, int(max_points))
+        if hi <= lo:
+            return None
+        self._sync()
+        ideal = (hi - lo) / max_points
+        level = 0
+        for k, size in enumerate(self.bin_sizes):
+            if size <= ideal:
+                level = k
+        while level < len(self.bin_sizes) - 1 and self.oldest(level) > lo:
+            level += 1
+        lo = max(lo, self.oldest(level))
+        if hi <= lo:
+            return None
+
+        size = self.bin_sizes[level]
+        b_lo, b_hi = lo // size, -(-hi // size)
+        group = max(1, -(-(b_hi - b_lo) // max_points))
+        while (b_hi - 1) // group - b_lo // group + 1 > max_points:
+            group += 1
+        # Read whole output bins so every sum matches its count below.
+        b_lo = max((b_lo // group) * group, self._first_bin(level))
+        b_hi = min(-(-b_hi // group) * group, -(-self.head // size))
+        mins, maxs, sums = self._read(level, b_lo, b_hi)
+        first, mins, maxs, sums = summarize(mins, maxs, sums, b_lo, group)
+
+        bin_size = group * size
+        starts = (first + np.arange(mins.shape[1])) * bin_size
+        counts = (np.minimum(starts + bin_size, self.head)
+                  - np.maximum(starts, self.oldest(level)))
+        return Summary(int(first * bin_size), bin_size, mins, maxs, sums / counts)
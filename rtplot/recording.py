@@ -0,0 +1,222 @@
+"""Append-only on-disk recordings of a tab's samples.
+
+A recording is one file per tab per session, written without any
+dependency beyond numpy:
+
+    8 bytes   MAGIC
+    uint32    header length
+    JSON      header: config, trace labels, dtype, start time, ...
+    chunk*    appended as samples arrive
+
+and each chunk is
+
+    CHUNK_FMT  b"CHNK", num_traces, num_samples, first sample index,
+               unix time its first batch arrived
+    dtype[num_traces]                 per-trace min of the chunk
+    dtype[num_traces]                 per-trace max of the chunk
+    dtype[num_traces * num_samples]   samples, one trace after another
+
+Sample indices count from the start of the recording, not the tab's
+ring positions, so a config resent by a reconnecting client doesn't
+break the sequence. The per-chunk min/max lets a reader skip or
+summarize chunks without touching their samples. A file that is still
+being written (or was cut short by a crash) reads fine up to its last
+complete chunk.
+
+``Recorder`` does all file I/O on its own thread; the event loop only
+puts arrays on a queue.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+MAGIC = b"RTPLTREC"
+VERSION = 1
+CHUNK_MAGIC = b"CHNK"
+CHUNK_FMT = "<4sIIQd"
+CHUNK_SIZE = struct.calcsize(CHUNK_FMT)
+
+# A chunk is written once this many samples are pending, or after
+# FLUSH_INTERVAL seconds, whichever comes first.
+CHUNK_SAMPLES = 65536
+FLUSH_INTERVAL = 1.0
+
+
+class Recorder:
+    """Append one tab's samples to ``path`` from a background thread.
+
+    ``header`` is stored as the file's JSON header (``num_traces``,
+    ``dtype`` and ``version`` are filled in). ``write`` only copies the
+    batch onto a queue; ``close`` flushes what is pending and waits for
+    the thread, so call it off the event loop.
+    """
+
+    def __init__(self, path, header, num_traces, dtype=np.float32,
+                 chunk_samples=CHUNK_SAMPLES, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.num_traces = max(1, num_traces)
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.header = dict(header)
+        self.header.update({
+            "version": VERSION,
+            "num_traces": self.num_traces,
+            "dtype": self.dtype.str,
+        })
+        self.header.setdefault("started", time.time())
+        self.chunk_samples = chunk_samples
+        self.flush_interval = flush_interval
+        self.samples = 0          # queued so far
+        self.bytes_written = 0    # on disk so far
+        self.error = None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="rtplot-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, arr):
+        """Queue ``arr`` (traces, n). Rows past ``num_traces`` are
+        ignored and a single-row ``arr`` is broadcast."""
+        if self.error is not None:
+            return
+        arr = arr[:self.num_traces]
+        n = arr.shape[1]
+        if n == 0:
+            return
+        if arr.shape[0] < self.num_traces:
+            arr = np.broadcast_to(arr, (self.num_traces, n))
+        self._queue.put((self.samples, time.time(), arr.astype(self.dtype)))
+        self.samples += n
+
+    def close(self):
+        """Write out everything queued and close the file."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "wb") as fh:
+                header = json.dumps(self.header).encode("utf-8")
+                fh.write(MAGIC + struct.pack("<I", len(header)) + header)
+                fh.flush()
+                self.bytes_written = fh.tell()
+                self._drain(fh)
+        except OSError as exc:
+            self.error = str(exc)
+            print(f"[rtplot] recording to {self.path} stopped: {exc}")
+
+    def _drain(self, fh):
+        pending = []
+        pending_n = 0
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval if pending else None)
+            except queue.Empty:
+                item = False
+            if item:
+                pending.append(item)
+                pending_n += item[2].shape[1]
+                if pending_n < self.chunk_samples:
+                    continue
+            if pending:
+                self._write_chunk(fh, pending)
+                pending = []
+                pending_n = 0
+            if item is None:
+                return
+
+    def _write_chunk(self, fh, pending):
+        first, started, _ = pending[0]
+        data = np.concatenate([arr for _, _, arr in pending], axis=1)
+        fh.write(struct.pack(
+            CHUNK_FMT, CHUNK_MAGIC, self.num_traces, data.shape[1], first, started
+        ))
+        fh.write(data.min(axis=1).tobytes())
+        fh.write(data.max(axis=1).tobytes())
+        fh.write(data.tobytes())
+        fh.flush()
+        self.bytes_written = fh.tell()
+
+
+class Chunk(NamedTuple):
+    first: int          # index of its first sample in the recording
+    num_samples: int
+    time: float         # unix time its first batch arrived
+    offset: int         # file offset of its samples
+    min: np.ndarray     # (num_traces,)
+    max: np.ndarray
+
+
+class RecordingReader:
+    """Random access to a recording file through ``np.memmap``.
+
+    ``header`` is the JSON header and ``chunks`` the chunk index, built
+    by hopping over the chunk headers once on open.
+    """
+
+    def __init__(self, path):
+        path = os.path.expanduser(path)
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an rtplot recording")
+            (length,) = struct.unpack("<I", fh.read(4))
+            self.header = json.loads(fh.read(length).decode("utf-8"))
+            data_start = fh.tell()
+        self.num_traces = int(self.header["num_traces"])
+        self.dtype = np.dtype(self.header["dtype"])
+        size = os.path.getsize(path)
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r") if size else None
+        self.chunks = self._index(data_start, size)
+        self.num_samples = (
+            self.chunks[-1].first + self.chunks[-1].num_samples if self.chunks else 0
+        )
+
+    def _index(self, pos, size):
+        chunks = []
+        itemsize = self.dtype.itemsize
+        while pos + CHUNK_SIZE <= size:
+            magic, traces, n, first, started = struct.unpack_from(CHUNK_FMT, self._mm, pos)
+            stats = pos + CHUNK_SIZE
+            offset = stats + 2 * traces * itemsize
+            end = offset + traces * n * itemsize
+            if magic != CHUNK_MAGIC or traces != self.num_traces or end > size:
+                break   # torn last chunk of a file still being written
+            # Copied, so the index doesn't keep the mapping alive.
+            minmax = self._mm[stats:offset].view(self.dtype).copy()
+            chunks.append(Chunk(first, n, started, offset, minmax[:traces], minmax[traces:]))
+            pos = end
+        return chunks
+
+    def _chunk_data(self, chunk):
+        nbytes = self.num_traces * chunk.num_samples * self.dtype.itemsize
+        return self._mm[chunk.offset:chunk.offset + nbytes].view(self.dtype).reshape(
+            self.num_traces, chunk.num_samples
+        )
+
+    def close(self):
+        """Drop the file mapping. It is unmapped once no ``read`` still
+        holds a view of it, so a read in flight elsewhere stays safe."""
+        self._mm = None
+
+    def read(self, lo=0, hi=None, rows=None):
+        """``(traces, n)`` copy of recording samples ``[lo, hi)``."""
+        hi = self.num_samples if hi is None else min(hi, self.num_samples)
+        lo = max(0, lo)
+        rows = list(range(self.num_traces)) if rows is None else rows
+        out = np.empty((len(rows), max(0, hi - lo)), dtype=self.dtype)
+        for chunk in self.chunks:
+            a = max(lo, chunk.first)
+            b = min(hi, chunk.first + chunk.num_samples)
+            if a < b:
+                data = self._chunk_data(chunk)
+                out[:, a - lo:b - lo] = data[rows, a - chunk.first:b - chunk.first]
+        return out
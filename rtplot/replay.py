@@ -0,0 +1,205 @@
+"""Play a recording (see ``rtplot.recording``) back into rtplot.
+
+``ReplaySource`` hands out a recording's samples in batches, paced so
+they come out at ``speed`` times the rate they were recorded at, or as
+fast as the consumer takes them. The browser server feeds it into a
+"replay" tab through the same ingest path as live ZMQ data. The
+``rtplot-replay`` command instead sends it to a server over ZMQ, like
+any client script:
+
+    rtplot-replay session.rtrec                    # 1x, bind :5555
+    rtplot-replay session.rtrec -s 10 -a pi:5555   # 10x, to a server
+    rtplot-replay session.rtrec -s max             # throughput benchmark
+
+At ``-s max`` it reports samples/s and MB/s at the end: with the
+browser open, that's the whole ingest -> push -> render pipeline
+measured on real data shapes.
+"""
+
+import argparse
+import sys
+import time
+from time import perf_counter
+
+import numpy as np
+
+from rtplot.recording import RecordingReader
+
+# How often a paced replay hands out a batch, in wall-clock seconds.
+TICK = 0.01
+# Samples per batch at max speed, and the most a paced replay hands out
+# at once when it has fallen behind.
+MAX_BATCH = 1000
+MAX_CATCHUP = 65536
+# Assumed rate of a recording with a single chunk and no sample_rate.
+DEFAULT_RATE = 1000.0
+
+
+class ReplaySource:
+    """Batches of ``reader``'s samples, paced to ``speed`` x real time.
+
+    ``speed`` 0 means as fast as ``next_batch`` is called. Recorded times
+    are interpolated between the chunk timestamps, so the replay keeps
+    the session's pace (pauses included) at chunk granularity.
+    """
+
+    def __init__(self, reader, speed=1.0, position=0, loop=False):
+        self.reader = reader
+        self.loop = loop
+        self.num_samples = reader.num_samples
+        chunks = reader.chunks
+        positions = [c.first for c in chunks]
+        times = [c.time for c in chunks]
+        if len(chunks) >= 2 and times[-1] > times[0]:
+            rate = (positions[-1] - positions[0]) / (times[-1] - times[0])
+        else:
+            rate = _declared_rate(reader.header) or DEFAULT_RATE
+        if chunks:
+            positions.append(self.num_samples)
+            times.append(times[-1] + chunks[-1].num_samples / rate)
+        else:
+            positions, times = [0, 1], [0.0, 1.0 / rate]
+        self._positions = np.asarray(positions, dtype=np.float64)
+        self._times = np.maximum.accumulate(np.asarray(times) - times[0])
+        self.speed = float(speed)
+        self.paused = False
+        self.position = 0
+        self.seek(position)
+
+    @property
+    def duration(self):
+        """Length of the recording in recorded seconds."""
+        return float(self._times[-1])
+
+    def time_at(self, position):
+        return float(np.interp(position, self._positions, self._times))
+
+    def position_at(self, seconds):
+        return int(np.interp(seconds, self._times, self._positions))
+
+    def _anchor(self):
+        self._anchor_wall = perf_counter()
+        self._anchor_time = self.time_at(self.position)
+
+    def seek(self, position):
+        self.position = int(min(max(0, position), self.num_samples))
+        self._anchor()
+
+    def set_speed(self, speed):
+        self.speed = float(speed)
+        self._anchor()
+
+    def set_paused(self, paused):
+        self.paused = bool(paused)
+        self._anchor()
+
+    def next_batch(self):
+        """Return ``(samples, wait)``.
+
+        ``samples`` is the ``(traces, n)`` batch now due, or None if
+        none is; ``wait`` is how long to sleep before asking again.
+        Both are None once a non-looping replay has run out.
+        """
+        if self.position >= self.num_samples:
+            if not self.loop or self.num_samples == 0:
+                return None, None
+            self.seek(0)
+        if self.paused:
+            return None, TICK
+        lo = self.position
+        if self.speed <= 0:
+            hi = min(lo + MAX_BATCH, self.num_samples)
+            wait = 0.0
+        else:
+            due = self._anchor_time + (perf_counter() - self._anchor_wall) * self.speed
+            hi = min(self.position_at(due), lo + MAX_CATCHUP, self.num_samples)
+            if hi <= lo:
+                return None, TICK
+            wait = 0.0 if hi == lo + MAX_CATCHUP else TICK
+        self.position = hi
+        return self.reader.read(lo, hi), wait
+
+
+def _declared_rate(header):
+    for desc in (header.get("config") or {}).values():
+        if isinstance(desc, dict) and desc.get("sample_rate"):
+            return float(desc["sample_rate"])
+    return None
+
+
+def parse_speed(text):
+    """``"max"`` -> 0, otherwise a positive multiple of real time
+    (a trailing ``x`` is allowed: ``10x``)."""
+    if text.lower() == "max":
+        return 0.0
+    speed = float(text.lower().rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="rtplot-replay",
+        description="Send a recorded rtplot session to a server, like a live client.",
+    )
+    parser.add_argument("path", help="recording file (.rtrec)")
+    parser.add_argument(
+        "-a", "--address", default=None,
+        help="server host[:port] to connect to. Default: bind :5555 like a client script",
+    )
+    parser.add_argument(
+        "-s", "--speed", type=parse_speed, default=1.0,
+        help="1, 10, ... times real time, or 'max' (default 1)",
+    )
+    parser.add_argument(
+        "--seek", type=float, default=0.0,
+        help="start this many recorded seconds in",
+    )
+    parser.add_argument(
+        "--loop", action="store_true", help="start over at the end (not with -s max)",
+    )
+    opts = parser.parse_args(argv)
+
+    from rtplot.client import RTPlotClient
+
+    reader = RecordingReader(opts.path)
+    source = ReplaySource(reader, speed=opts.speed, loop=opts.loop and opts.speed > 0)
+    source.seek(source.position_at(opts.seek))
+    print(
+        f"[rtplot-replay] {reader.num_samples} samples x {reader.num_traces} traces,"
+        f" {source.duration:.1f} s recorded"
+    )
+
+    sender = RTPlotClient(opts.address)
+    sender.initialize_plots(list((reader.header.get("config") or {}).values()))
+    source.seek(source.position)    # don't count the handshake as playback time
+
+    sent = 0
+    started = perf_counter()
+    try:
+        while True:
+            batch, wait = source.next_batch()
+            if batch is None and wait is None:
+                break
+            if batch is not None:
+                sender.send_array(batch)
+                sent += batch.shape[1]
+            if wait:
+                time.sleep(wait)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = perf_counter() - started
+        sender.close()
+        reader.close()
+    mb = sent * reader.num_traces * reader.dtype.itemsize / 1e6
+    print(
+        f"[rtplot-replay] sent {sent} samples in {elapsed:.2f} s"
+        f" ({sent / max(elapsed, 1e-9):,.0f} samples/s, {mb / max(elapsed, 1e-9):.1f} MB/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Fixed-size per-trace sample history for the browser server.
+
+Each tab used to keep a ``(50, 10_000_000)`` float64 array and write at a
+column index that only ever grew, so a long-running tab fell off the end
+after 10M samples. ``RingBuffer`` keeps the last ``capacity`` samples of
+every trace in a fixed block and wraps around instead.
+
+Positions are absolute sample counts, like the old ``Tab.li``: ``head``
+is the number of samples written so far, and the ring holds the range
+``[oldest, head)``. Reads and writes that straddle the wrap point are
+split into at most two contiguous slice copies.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """``num_traces`` x ``capacity`` wraparound sample store."""
+
+    def __init__(self, num_traces, capacity, dtype=np.float64):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = int(capacity)
+        self.data = np.zeros((max(1, num_traces), self.capacity), dtype=dtype)
+        self.head = 0
+
+    @property
+    def num_traces(self):
+        return self.data.shape[0]
+
+    @property
+    def oldest(self):
+        """Absolute index of the oldest sample still held."""
+        return max(0, self.head - self.capacity)
+
+    def reset(self, head=0):
+        """Forget the history and restart at absolute position ``head``.
+
+        Samples ``[oldest, head)`` read back as zeros. Nothing older is
+        ever readable, so only that span is cleared.
+        """
+        self.head = int(head)
+        lo = self.oldest
+        i = lo % self.capacity
+        n = self.head - lo
+        first = min(n, self.capacity - i)
+        self.data[:, i:i + first] = 0
+        if first < n:
+            self.data[:, :n - first] = 0
+
+    def write(self, arr):
+        """Append ``arr`` (traces, n) at ``head``.
+
+        Rows past ``num_traces`` are ignored and a single-row ``arr`` is
+        broadcast, as with the old slice assignment. If ``n`` exceeds the
+        capacity only the newest ``capacity`` samples are kept.
+        """
+        arr = arr[:self.num_traces]
+        n = arr.shape[1]
+        start = self.head
+        end = start + n
+        if n > self.capacity:
+            arr = arr[:, n - self.capacity:]
+            start = end - self.capacity
+            n = self.capacity
+        i = start % self.capacity
+        first = min(n, self.capacity - i)
+        self.data[:, i:i + first] = arr[:, :first]
+        if first < n:
+            self.data[:, :n - first] = arr[:, first:]
+        # Moved last, so a reader that goes by head (SharedRing, in
+        # another process) never sees samples that aren't there yet.
+        self.head = end
+
+    def read(self, lo, hi, rows=None, dtype=None, out=None):
+        """Return a ``(rows, hi - lo)`` copy of samples ``[lo, hi)``.
+
+        ``lo`` is clamped to ``oldest`` and ``hi`` to ``head``. ``rows``
+        limits the copy to the first ``rows`` traces; ``dtype`` converts
+        during the copy so callers don't pay for a second one. Pass
+        ``out`` (e.g. a view on an outgoing frame) to copy into it
+        instead of allocating; its shape must match the clamped range.
+        """
+        # Runs once per browser push, so kept lean: no property lookups
+        # and a single slice assignment unless the range wraps.
+        data = self.data
+        capacity = self.capacity
+        head = self.head
+        if rows is None or rows > data.shape[0]:
+            rows = data.shape[0]
+        lo = max(int(lo), head - capacity, 0)
+        n = max(0, min(int(hi), head) - lo)
+        if out is None:
+            out = np.empty((rows, n), dtype=dtype or data.dtype)
+        elif out.shape != (rows, n):
+            raise ValueError(f"out has shape {out.shape}, expected {(rows, n)}")
+        if n == 0:
+            return out
+        i = lo % capacity
+        if i + n <= capacity:
+            out[...] = data[:rows, i:i + n]
+        else:
+            first = capacity - i
+            out[:, :first] = data[:rows, i:]
+            out[:, first:] = data[:rows, :n - first]
+        return out
@@ -17,6 +17,13 @@ from time import perf_counter
 # of the plotter
 import argparse
 
+# Import the packed data-frame protocol shared with the client
+try:
+    from rtplot import protocol
+except ImportError:
+    # Fallback: running as a loose script from inside the rtplot/ directory
+    import protocol
+
 ############################
 # Command Line Arguments #
 ###########################
@@ -125,6 +132,9 @@ if args.plot_config is True:
         " integer that describes how many datapoints are in the subplot."
         " Default is 200 datapoints"
         "\n\r"
+        "\n\r'sample_rate' - Samples per second arriving for this plot."
+        " When set, the x axis is labelled in seconds instead of samples."
+        "\n\r"
         "\n\rYou only need to specify the things that you want, if the"
         " dictionary element is left out then the default value is used."
         "\n\r"
@@ -172,6 +182,12 @@ context = zmq.Context()
 # Using the pub - sub paradigm
 socket = context.socket(zmq.SUB)
 
+# Return channel to the client (data port + 1). We only use it to ack
+# plot configs so initialize_plots() returns promptly and can negotiate
+# the packed data protocol.
+control_socket = context.socket(zmq.PUSH)
+control_socket.setsockopt(zmq.LINGER, 0)
+
 # Current default is to connect to the neurobionics pi hotspot
 # since that is the current use case
 if args.pi_ip is not None:
@@ -187,12 +203,21 @@ if args.pi_ip is not None:
     socket.connect(connect_string)
     print(f"Connected to {connect_string}")
 
+    #The control channel lives on the next port
+    host, port = connect_string.rsplit(":", 1)
+    control_socket.connect(f"{host}:{int(port) + 1}")
+
 # Default behavior, wait for people to connect to you
 else:
     # Bind so that you can get more
     socket.bind("tcp://*:5555")
     print("Bounded every ip address on port :5555")
 
+    try:
+        control_socket.bind("tcp://*:5556")
+    except zmq.error.ZMQError as e:
+        print(f"Could not bind control channel on port :5556 ({e})")
+
 # Initialize subscriber
 socket.setsockopt_string(zmq.SUBSCRIBE, "")
 
@@ -358,6 +383,10 @@ def initialize_plot(json_config, subplots_to_remove=None):
         # Potential performance boost
         new_plot.setXRange(0, num_datapoints_in_plot)
 
+        # Label the x axis in seconds when the sample rate is known
+        if plot_description.get("sample_rate"):
+            new_plot.getAxis("bottom").setScale(1.0 / plot_description["sample_rate"])
+
         # Get the y range
         if "yrange" in plot_description:
             new_plot.setYRange(*plot_description["yrange"])
@@ -440,11 +469,42 @@ def recv_array(socket, flags=0, copy=True, track=False):
     return A.reshape(md["shape"])
 
 
+# Receive a numpy array sent as a single packed multipart message
+def recv_packed_array(socket):
+    """recv the header + payload frames that follow a packed category"""
+    frames = []
+    while socket.getsockopt(zmq.RCVMORE):
+        frames.append(socket.recv(copy=False))
+    if len(frames) != 2:
+        raise protocol.ProtocolError(
+            f"packed data frame has {len(frames) + 1} parts, expected 3"
+        )
+    A, _seq, _send_time = protocol.unpack_data_frame(frames[0].buffer, frames[1].buffer)
+    return A
+
+
+# Tell the client that the plot configuration arrived
+def send_config_ack():
+    try:
+        control_socket.send_json(
+            {
+                "type": "config_ack",
+                "protocol": protocol.PROTOCOL_VERSION,
+                "codecs": protocol.available_codecs(),
+            },
+            flags=zmq.NOBLOCK,
+        )
+    except zmq.ZMQError:
+        # No client on the return channel (e.g. an old client), that's ok
+        pass
+
+
 # Create definitions to define when you receive data or new plots
 RECEIVED_PLOT_UPDATE = 0
 RECEIVED_DATA = 1
 NOT_RECEIVED_DATA = 2
 SAVE_PLOT = 3
+RECEIVED_PACKED_DATA = int(protocol.SENDING_PACKED_DATA)
 
 # Variable to store initial time when data was missed
 time_when_data_was_missed = None
@@ -524,6 +584,7 @@ subplots = None
 
 # Make sure that you don't try to plot data without having a plot
 initialized_plot = False
+trace_scaling = None
 
 # Create a counter that will be used in case we want to update the plot 
 # every X datapoints
@@ -578,6 +639,13 @@ while True:
         # Get number of traces that will not be plotted
         num_non_plot_traces = len(non_plot_labels)
 
+        # Per-trace (scale, offset) for integer wire dtypes
+        try:
+            trace_scaling = protocol.trace_scaling(plot_configuration)
+        except ValueError as e:
+            print(f"Ignoring scale/offset in plot config: {e}")
+            trace_scaling = None
+
         # Setup local data buffer
         # Since we save using the index, we just need to update
         # the index and not set the buffer to zero
@@ -589,6 +657,9 @@ while True:
         # You can now plot data
         initialized_plot = True
 
+        # Let the client know the config landed
+        send_config_ack()
+
         # Define fps variable
         fps = None
 
@@ -599,10 +670,19 @@ while True:
         firstTime = perf_counter()
 
     # Read some data and plot it
-    elif (category == RECEIVED_DATA) and (initialized_plot == True):
+    elif (category in (RECEIVED_DATA, RECEIVED_PACKED_DATA)) \
+        and (initialized_plot == True):
 
         # Read in numpy array
-        receive_np_array = recv_array(socket)
+        if category == RECEIVED_PACKED_DATA:
+            try:
+                receive_np_array = recv_packed_array(socket)
+            except protocol.ProtocolError as e:
+                print(f"Dropping packed data frame: {e}")
+                continue
+        else:
+            receive_np_array = recv_array(socket)
+        receive_np_array = protocol.dequantize(receive_np_array, trace_scaling)
         # Get how many new values are in it
         num_values = receive_np_array.shape[1]
 
@@ -720,6 +800,12 @@ while True:
             # Reset the data counter
             data_between_plots_refresh = 0
 
+    elif category == RECEIVED_PACKED_DATA:
+        # Packed data before any plot exists. The header and payload are
+        # part of the same message, so drain them to stay in sync.
+        while socket.getsockopt(zmq.RCVMORE):
+            socket.recv()
+
     elif category == SAVE_PLOT:
         # Parquet save was removed in rtplot 0.3 — the feature was
         # rarely used and tied rtplot to pandas + pyarrow. Drain the
@@ -20,8 +20,10 @@ subscribed tab's PUSH socket.
 
 import argparse
 import asyncio
+import base64
 import dataclasses
 import json
+import math
 import os
 import socket
 import subprocess
@@ -30,7 +32,7 @@ import sys
 import time
 import uuid
 import webbrowser
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from time import perf_counter
 from typing import Optional
@@ -40,6 +42,13 @@ import zmq
 import zmq.asyncio
 from zmq.utils.monitor import recv_monitor_message
 
+from rtplot import export, protocol
+from rtplot.pyramid import HistoryPyramid, Summary, summarize
+from rtplot.recording import Recorder, RecordingReader
+from rtplot.replay import ReplaySource
+from rtplot.ring import RingBuffer
+from rtplot.shard import SharedRing, pack as shard_pack, ring_message
+
 # pyzmq's asyncio integration needs event_loop.add_reader(), which the
 # Windows-default ProactorEventLoop (Python 3.8+) does not implement.
 # Without this policy override, zmq receives throw on first recv, the
@@ -154,15 +163,82 @@ parser.add_argument(
 parser.add_argument(
     "--rate",
     help=(
-        "Maximum WebSocket push rate in Hz. The server only sends when new"
-        " samples have arrived, so this caps the push frequency without"
-        " pinning the asyncio loop. Default 1000."
+        "Maximum WebSocket push rate per tab in Hz. Pushes are triggered"
+        " by arriving samples, and anything that lands within 1/RATE of"
+        " the previous push is coalesced into the next one. Default 1000."
     ),
     action="store",
     type=int,
     default=1000,
 )
 
+parser.add_argument(
+    "--history",
+    help=(
+        "Samples of history kept per trace, per tab (default 1000000)."
+        " The buffer is a fixed-size ring, so memory is roughly"
+        " traces x history x itemsize and never grows after that."
+    ),
+    action="store",
+    type=int,
+    default=1_000_000,
+)
+
+parser.add_argument(
+    "--storage-dtype",
+    help=(
+        "Element type of the per-tab history (default float32, which is"
+        " what browsers are sent). float64 keeps full precision; native"
+        " stores whatever the sender puts on the wire, e.g. int16 counts"
+        " from initialize_plots(wire_dtype='int16'), and applies the"
+        " plot's scale/offset when reading."
+    ),
+    choices=["float32", "float64", "native"],
+    default="float32",
+)
+
+parser.add_argument(
+    "--record-dir",
+    help=(
+        "Directory tab recordings are written to, one file per tab per"
+        " session (toggled from the browser). Default"
+        " ~/.rtplot/recordings, or RTPLOT_RECORD_DIR if set."
+    ),
+    action="store",
+    type=str,
+    default=os.environ.get(
+        "RTPLOT_RECORD_DIR",
+        os.path.join(os.path.expanduser("~"), ".rtplot", "recordings"),
+    ),
+)
+
+parser.add_argument(
+    "--workers",
+    help=(
+        "Receive ZMQ data in N worker processes instead of the server's"
+        " event loop (default 0: no workers). Each ZMQ tab is given to one"
+        " worker, which decodes its frames into a shared-memory history"
+        " ring, so many busy tabs spread over several cores."
+    ),
+    action="store",
+    type=int,
+    default=0,
+)
+
+parser.add_argument(
+    "--viewer-max-pending",
+    help=(
+        "Disconnect a browser once this many messages are queued for it"
+        " (default 1024; 0 never disconnects). Plot data never counts"
+        " towards it: a viewer that falls behind on data gets one fresh"
+        " snapshot instead. Only a browser that has stopped reading"
+        " entirely piles up this many control and status messages."
+    ),
+    action="store",
+    type=int,
+    default=1024,
+)
+
 parser.add_argument(
     "--password",
     help=(
@@ -190,11 +266,15 @@ AUTH_PASSWORD = args.password if args.password is not None else os.environ.get("
 ###############################
 
 DEFAULT_NUM_DATAPOINTS_IN_PLOT = 200
-MAX_LOCAL_STORAGE = 10_000_000
-INITIAL_NUM_TRACES = 50
+# Per-trace ring depth. A plot's xrange wider than this grows the ring
+# for that tab so the visible window always fits.
+HISTORY_SAMPLES = max(1, args.history)
+# None means "native": follow the dtype of the incoming frames.
+STORAGE_DTYPE = None if args.storage_dtype == "native" else np.dtype(args.storage_dtype)
 
 # Binary frame pushed to browsers (plot data):
-#   uint8  msg_type   (0 = snapshot, 1 = delta)
+#   uint8  msg_type   (0 = snapshot, 1 = delta, 2 = envelope, 3 = range,
+#                      4 / 5 = int16 snapshot / delta)
 #   uint8  status     (0 = green,    1 = red)
 #   uint8  reserved   (was non-plot trace count, kept for wire compat)
 #   uint8  pad
@@ -206,6 +286,50 @@ HEADER_FMT = "<BBBxIIf"
 HEADER_SIZE = struct.calcsize(HEADER_FMT)
 MSG_SNAPSHOT = 0
 MSG_DELTA = 1
+MSG_ENVELOPE = 2
+
+# Envelope frames (MSG_ENVELOPE) summarize a wide window per pixel
+# column instead of sending every sample. num_samples above is
+# 4 * num_bins, and the common header is followed by
+#   uint32 bin_size   samples per column
+#   uint32 num_bins
+#   uint64 first_bin  bin index; bins are aligned to absolute sample
+#                     index, bin b covers [b * bin_size, (b+1) * bin_size)
+#   uint64 head       absolute index one past the newest sample
+#   float32[num_traces * num_bins * 4]  first, min, max, last of each bin
+# (the M4 reduction: drawn as a line it is pixel-identical to the raw
+# samples). A frame may start at an already-sent, then-partial bin;
+# the browser overwrites from first_bin on.
+ENVELOPE_FMT = "<IIQQ"
+ENVELOPE_SIZE = struct.calcsize(ENVELOPE_FMT)
+# With fewer samples per column than this the raw samples are no
+# bigger than their envelope, so we keep sending those.
+ENVELOPE_MIN_BIN = 4
+
+# Range frames (MSG_RANGE) answer GET /api/tabs/{id}/range. The common
+# header is followed by
+#   uint32 bin_size   1 for raw samples, else samples per bin
+#   uint32 num_bins
+#   uint64 start      absolute index of the first sample / bin start;
+#                     bins are aligned to multiples of bin_size
+#   uint64 head       absolute index one past the newest sample
+#   float32[num_traces * num_bins]      raw samples, if bin_size == 1
+#   float32[num_traces * num_bins * 3]  min, max, mean of each bin, else
+# and num_samples is num_bins * values per bin, as for envelopes.
+MSG_RANGE = 3
+RANGE_FMT = "<IIQQ"
+RANGE_SIZE = struct.calcsize(RANGE_FMT)
+
+# Quantized snapshot / delta frames carry the same samples in half the
+# bytes, for viewers on slow links. The common header is followed by
+#   float32[num_traces] scale
+#   float32[num_traces] offset
+#   int16[num_traces * num_samples]  value = q * scale + offset, row-major
+# scale and offset span each trace's min..max over the frame, so the
+# error is at most (max - min) / 131068. -32768 marks a NaN / inf.
+MSG_SNAPSHOT_I16 = 4
+MSG_DELTA_I16 = 5
+I16_NONFINITE = -32768
 
 ZMQ_DEFAULT_PORT = 5555
 ZMQ_CONTROL_PORT = ZMQ_DEFAULT_PORT + 1
@@ -216,6 +340,7 @@ RECEIVED_DATA = 1
 SAVE_PLOT = 3
 RECEIVED_DISPLAY = 4
 RECEIVED_TEXT_INPUT = 5
+RECEIVED_PACKED_DATA = int(protocol.SENDING_PACKED_DATA)
 
 BIND_ME_ID = "bind_me"
 BIND_ME_NAME = "Shared - Bind to me"
@@ -345,6 +470,51 @@ def _probe_connect_target(endpoint):
     return True, bool(data_open and ctrl_open), None
 
 
+###############################
+# Latency stats #
+###############################
+
+# Pipeline stages we time, in order:
+#   network  client send_array() -> zmq_receiver (needs the client's
+#            clock in sync with ours when it runs on another host)
+#   queue    zmq_receiver -> tab_pusher hands the frame to the websockets
+#   render   browser receives the frame -> uPlot finished drawing it
+LATENCY_STAGES = ("network", "queue", "render")
+
+
+class LatencyStats:
+    """Rolling window of the last ``size`` latency samples, in ms."""
+
+    def __init__(self, size=2048):
+        self._ring = np.zeros(size)
+        self._n = 0
+        self._i = 0
+
+    def add(self, value_ms):
+        self._ring[self._i] = value_ms
+        self._i = (self._i + 1) % len(self._ring)
+        if self._n < len(self._ring):
+            self._n += 1
+
+    def extend(self, values_ms):
+        for v in values_ms:
+            self.add(v)
+
+    def summary(self):
+        """``{"p50", "p95", "p99", "count"}`` over the window, or None."""
+        if self._n == 0:
+            return None
+        p50, p95, p99 = np.percentile(self._ring[:self._n], (50, 95, 99))
+        return {
+            "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "count": self._n,
+        }
+
+
+def _new_latency_stats():
+    return {stage: LatencyStats() for stage in LATENCY_STAGES}
+
+
 ###############################
 # Tab model #
 ###############################
@@ -365,6 +535,8 @@ class Tab:
     config_message: Optional[dict] = None
     initialized: bool = False
     num_datapoints_in_plot: int = DEFAULT_NUM_DATAPOINTS_IN_PLOT
+    # Each plot's own window (its xrange), in layout order.
+    plot_windows: list = field(default_factory=list)
     li: int = DEFAULT_NUM_DATAPOINTS_IN_PLOT
     buffer_bounds: np.ndarray = field(
         default_factory=lambda: np.array([0, DEFAULT_NUM_DATAPOINTS_IN_PLOT])
@@ -372,6 +544,9 @@ class Tab:
     num_traces: int = 0
     traces_per_plot: list = field(default_factory=list)
     trace_labels: list = field(default_factory=list)
+    # Per-trace (scale, offset) for integer wire dtypes, None if the
+    # config declares neither key.
+    trace_scaling: Optional[tuple] = None
     last_pushed_li: int = DEFAULT_NUM_DATAPOINTS_IN_PLOT
     layout: list = field(default_factory=list)
     control_rows: list = field(default_factory=list)
@@ -387,16 +562,56 @@ class Tab:
     data_sock: Optional[zmq.Socket] = None
     ctrl_sock: Optional[zmq.Socket] = None
     receiver_task: Optional[asyncio.Task] = None
+    # Set by zmq_receiver when new samples land; tab_pusher waits on it.
+    data_ready: asyncio.Event = field(default_factory=asyncio.Event)
+    pusher_task: Optional[asyncio.Task] = None
     monitor_task: Optional[asyncio.Task] = None
-
-    # Data buffer, lazy-allocated on first use (roughly 4 GB virtual,
-    # but pages in only when written on Linux/Windows — a single tab
-    # typically touches a few MB worth of pages).
-    buffer: Optional[np.ndarray] = None
+    # Index of the --workers process receiving this tab's data, or None
+    # if zmq_receiver does it here. ``buffer`` is then a SharedRing the
+    # worker writes; ``li`` trails its head until shard_listener has
+    # taken the new samples in.
+    shard: Optional[int] = None
+
+    # Sample history, allocated when the first config arrives and
+    # reallocated only if the trace count or xrange outgrows it. ``li``
+    # mirrors ``buffer.head``: the absolute index one past the newest
+    # sample.
+    buffer: Optional[RingBuffer] = None
+    # Coarse min/max/mean levels over the same positions, for zoomed-out
+    # views that reach further back than ``buffer`` (see ``history``).
+    pyramid: Optional[HistoryPyramid] = None
+
+    # Recording to disk, toggled from the browser. ``recorder`` is open
+    # while ``recording`` is on and the tab has a config; a new config
+    # starts a new file.
+    recording: bool = False
+    recorder: Optional[Recorder] = None
+    # The newest recording file this session, kept after it stops so
+    # /api/tabs/{id}/export?source=recording can still read it.
+    recording_path: Optional[str] = None
+    # Replay tabs (mode "replay") play a recording through the same
+    # ingest path instead of reading a ZMQ socket.
+    replay: Optional[ReplaySource] = None
 
     # Used by the resources panel so operators can see which tab is busy.
     data_rate_hz: float = 0.0
     _last_rx_ts: float = 0.0
+    _last_ingest_ts: float = 0.0
+
+    # Per-stage latency windows (see LATENCY_STAGES), plus receive times
+    # of frames the pusher hasn't sent on yet, for the queue stage.
+    latency: dict = field(default_factory=_new_latency_stats)
+    _unpushed_rx: deque = field(default_factory=lambda: deque(maxlen=4096))
+
+    # Data-frame accounting. ``frames_received`` counts every frame that
+    # reached the socket, ``frames_discarded`` the ones we then threw
+    # away (no config yet, undecodable), ``frames_gapped`` the ones the
+    # sender's sequence numbers say never arrived (PUB/SUB high-water
+    # mark, reconnects). Legacy frames carry no seq, so no gaps for them.
+    frames_received: int = 0
+    frames_gapped: int = 0
+    frames_discarded: int = 0
+    _next_seq: Optional[int] = None
 
     # When the most recent client-supplied config failed to parse we
     # stash the reason + a unix timestamp so the browser can surface
@@ -404,19 +619,101 @@ class Tab:
     # silently rendering nothing. Cleared on the next successful parse.
     last_config_error: Optional[dict] = None
 
-    def ensure_buffer(self):
-        if self.buffer is None:
-            self.buffer = np.zeros((INITIAL_NUM_TRACES, MAX_LOCAL_STORAGE))
+    def note_seq(self, seq):
+        """Account for a packed frame's sequence number."""
+        expected = self._next_seq
+        if expected is not None and seq > expected:
+            self.frames_gapped += seq - expected
+        # seq < expected means the sender restarted; re-baseline on it.
+        self._next_seq = seq + 1
+
+    def frame_counts(self) -> dict:
+        return {
+            "received": self.frames_received,
+            "gaps": self.frames_gapped,
+            "discarded": self.frames_discarded,
+        }
+
+    def ensure_buffer(self, dtype=None):
+        """Make sure ``buffer`` fits the config and stores ``dtype``.
+
+        A replacement ring starts out as zeros up to ``li``.
+        """
+        rows = max(1, self.num_traces)
+        capacity = max(HISTORY_SAMPLES, self.num_datapoints_in_plot, *self.plot_windows)
+        buf = self.buffer
+        if dtype is None:
+            dtype = STORAGE_DTYPE or (buf.data.dtype if buf is not None else np.float32)
+        if (buf is None or buf.num_traces != rows or buf.capacity < capacity
+                or buf.data.dtype != dtype):
+            if isinstance(buf, SharedRing):
+                buf.release()
+            ring = RingBuffer if self.shard is None else SharedRing
+            self.buffer = ring(rows, capacity, dtype)
+            self.buffer.reset(head=self.li)
+            self.pyramid = HistoryPyramid(
+                rows, capacity,
+                dtype=np.float64 if dtype == np.float64 else np.float32,
+            )
+            self.pyramid.reset(head=self.li)
+
+    def read_samples(self, lo, hi, dtype=np.float32, out=None):
+        """Samples ``[lo, hi)`` of the configured traces as ``dtype``.
+
+        Float storage is copied straight out (into ``out`` if given);
+        integer (native) storage is scaled back to physical units first.
+        """
+        buf = self.buffer
+        if buf.data.dtype.kind == "f":
+            return buf.read(lo, hi, rows=self.num_traces, dtype=dtype, out=out)
+        raw = buf.read(lo, hi, rows=self.num_traces)
+        scaled = protocol.dequantize(raw, self.trace_scaling)
+        if out is None:
+            return scaled.astype(dtype, copy=False)
+        out[...] = scaled
+        return out
+
+    def history(self, lo, hi, max_points):
+        """Min/max/mean of samples ``[lo, hi)`` in about ``max_points`` bins.
+
+        Ranges still in ``buffer`` that need finer bins than the pyramid's
+        first level are summarized from the raw samples; everything else
+        comes from ``pyramid``. Either way the work scales with
+        ``max_points``, not with ``hi - lo``. Returns a ``Summary``, or
+        None if nothing in the range is held.
+        """
+        pyramid = self.pyramid
+        if pyramid is None:
+            return None
+        lo = max(int(lo), pyramid.origin)
+        hi = min(int(hi), self.li)
+        max_points = max(1, int(max_points))
+        if hi <= lo:
+            return None
+        if (hi - lo) / max_points < pyramid.fanout and lo >= self.buffer.oldest:
+            raw = self.read_samples(lo, hi, dtype=np.float64)
+            group = -(-(hi - lo) // max_points)
+            while (hi - 1) // group - lo // group + 1 > max_points:
+                group += 1
+            first, mins, maxs, sums = summarize(raw, raw, raw, lo, group)
+            starts = (first + np.arange(mins.shape[1])) * group
+            counts = np.minimum(starts + group, hi) - np.maximum(starts, lo)
+            return Summary(int(first * group), group, mins, maxs, sums / counts)
+        return pyramid.query(lo, hi, max_points)
 
     def reset_buffer_state(self, num_datapoints_in_plot, num_traces):
         """Reset the buffer indices when a new plot config arrives."""
-        self.ensure_buffer()
         self.num_datapoints_in_plot = num_datapoints_in_plot
+        self.num_traces = num_traces
         self.li = num_datapoints_in_plot
+        self.ensure_buffer()
         self.buffer_bounds = np.array([0, num_datapoints_in_plot])
-        self.num_traces = num_traces
         self.last_pushed_li = num_datapoints_in_plot
-        self.buffer[:num_traces, :num_datapoints_in_plot] = 0
+        # Start with a window of zeros so the first frame has something
+        # to scroll in from. The zeros aren't data, so the pyramid
+        # starts summarizing after them.
+        self.buffer.reset(head=num_datapoints_in_plot)
+        self.pyramid.reset(head=num_datapoints_in_plot)
 
 
 ###############################
@@ -432,6 +729,9 @@ ws_tab: "dict[web.WebSocketResponse, str]" = {}
 # set of all currently open WebSocketResponse instances.
 ws_clients: set = set()
 
+# ws -> ViewerQueue feeding it (see "WebSocket broadcasts").
+ws_queues: "dict[web.WebSocketResponse, ViewerQueue]" = {}
+
 
 def tab_public(t: Tab) -> dict:
     """Tab summary that's safe to send to browsers."""
@@ -443,6 +743,37 @@ def tab_public(t: Tab) -> dict:
         "status": t.status,
         "error": t.error,
         "last_config_error": t.last_config_error,
+        "frames": t.frame_counts(),
+        "recording": recording_public(t),
+        "replay": replay_public(t),
+    }
+
+
+def replay_public(t: Tab) -> Optional[dict]:
+    src = t.replay
+    if src is None:
+        return None
+    return {
+        "time": src.time_at(src.position),
+        "duration": src.duration,
+        "position": src.position,
+        "num_samples": src.num_samples,
+        "speed": src.speed,
+        "paused": src.paused,
+    }
+
+
+def recording_public(t: Tab) -> Optional[dict]:
+    if not t.recording:
+        return None
+    rec = t.recorder
+    if rec is None:
+        return {"path": None, "samples": 0, "bytes": 0, "error": None}
+    return {
+        "path": rec.path,
+        "samples": rec.samples,
+        "bytes": rec.bytes_written,
+        "error": rec.error,
     }
 
 
@@ -492,6 +823,56 @@ def save_persisted_tabs():
         print(f"[rtplot] Could not save tabs.json: {exc}")
 
 
+###############################
+# Recording (per tab) #
+###############################
+
+def _open_recorder(t: Tab) -> Recorder:
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in t.id)
+    path = os.path.join(args.record_dir, f"{safe_id}-{stamp}.rtrec")
+    dtype = np.float64 if t.buffer is not None and t.buffer.data.dtype == np.float64 else np.float32
+    header = {
+        "tab": t.id,
+        "name": t.name,
+        "config": t.config_dict,
+        "trace_labels": [name for name, _ in t.trace_labels],
+    }
+    print(f"[{t.id}] recording to {path}")
+    t.recording_path = path
+    return Recorder(path, header, t.num_traces, dtype=dtype)
+
+
+async def _close_recorder(t: Tab):
+    rec, t.recorder = t.recorder, None
+    if rec is not None:
+        # Flushing the last chunk is file I/O; keep it off the loop.
+        await asyncio.get_running_loop().run_in_executor(None, rec.close)
+
+
+async def set_recording(t: Tab, on: bool):
+    """Start or stop recording ``t`` to ``--record-dir``."""
+    if on and not t.recording:
+        t.recording = True
+        if t.initialized:
+            t.recorder = _open_recorder(t)
+    elif not on and t.recording:
+        t.recording = False
+        await _close_recorder(t)
+    await broadcast_tab(t.id)
+
+
+async def _roll_recording(t: Tab):
+    """A config arrived: keep recording, in a new file if it changed."""
+    if not t.recording:
+        return
+    rec = t.recorder
+    if rec is not None and rec.header.get("config") == t.config_dict:
+        return
+    await _close_recorder(t)
+    t.recorder = _open_recorder(t)
+
+
 ###############################
 # Config parsing (per tab) #
 ###############################
@@ -504,6 +885,7 @@ def parse_config(tab: Tab, json_config):
     slider_values = {}
     text_values = {}
     layout = []
+    plot_windows = []
     num_datapoints_in_plot = DEFAULT_NUM_DATAPOINTS_IN_PLOT
 
     plot_counter = 0
@@ -529,6 +911,9 @@ def parse_config(tab: Tab, json_config):
 
         if "xrange" in plot_description:
             num_datapoints_in_plot = plot_description["xrange"]
+        plot_windows.append(
+            int(plot_description.get("xrange") or DEFAULT_NUM_DATAPOINTS_IN_PLOT)
+        )
 
         for name in trace_names:
             trace_info.append((name, plot_counter))
@@ -536,8 +921,14 @@ def parse_config(tab: Tab, json_config):
         layout.append({"kind": "plot", "index": plot_counter})
         plot_counter += 1
 
+    # Validate before touching tab state so a bad scale list keeps the
+    # previous config live.
+    trace_scaling = protocol.trace_scaling(json_config)
+
     tab.traces_per_plot = traces_per_plot
+    tab.plot_windows = plot_windows
     tab.trace_labels = trace_info
+    tab.trace_scaling = trace_scaling
     tab.control_rows = control_rows
     # Preserve display values across re-init when the same ids are reused;
     # drop ids that are no longer declared so stale data doesn't linger.
@@ -594,6 +985,7 @@ def build_config_message(tab: Tab, config_dict) -> dict:
                 "xrange": plot_description.get("xrange"),
                 "yrange": plot_description.get("yrange"),
                 "height": plot_description.get("height"),
+                "sample_rate": plot_description.get("sample_rate"),
             }
         )
     return {
@@ -622,20 +1014,29 @@ def refresh_config_message(tab: Tab):
 ###############################
 
 def make_data_message(tab: Tab, msg_type, lo, hi):
-    """Pack a binary delta/snapshot message for ``tab.buffer[:, lo:hi]``."""
+    """Pack a binary delta/snapshot message for samples ``[lo, hi)``.
+
+    The frame is allocated once and the samples are copied from the ring
+    straight into it (converting to float32 on the way), so a push costs
+    one copy rather than slice -> float32 -> bytes -> header concat.
+    """
     num_traces = tab.num_traces
+    if num_traces <= 0 or tab.buffer is None:
+        return None
+    lo = max(lo, tab.buffer.oldest)
+    hi = min(hi, tab.buffer.head)
     n_samples = hi - lo
-    if n_samples <= 0 or num_traces <= 0 or tab.buffer is None:
+    if n_samples <= 0:
         return None
     status_int = 1 if tab.title_color == "red" else 0
     fps = float(tab.fps) if tab.fps else 0.0
-    header = struct.pack(
-        HEADER_FMT, msg_type, status_int, 0, num_traces, n_samples, fps
+    frame = bytearray(HEADER_SIZE + 4 * num_traces * n_samples)
+    struct.pack_into(
+        HEADER_FMT, frame, 0, msg_type, status_int, 0, num_traces, n_samples, fps
     )
-    payload = np.ascontiguousarray(
-        tab.buffer[:num_traces, lo:hi], dtype=np.float32
-    )
-    return header + payload.tobytes()
+    out = np.frombuffer(frame, dtype="<f4", offset=HEADER_SIZE)
+    tab.read_samples(lo, hi, out=out.reshape(num_traces, n_samples))
+    return frame
 
 
 def make_snapshot_message(tab: Tab):
@@ -645,49 +1046,492 @@ def make_snapshot_message(tab: Tab):
     return make_data_message(tab, MSG_SNAPSHOT, lo, hi)
 
 
+# The last frame quantized and its result: a broadcast hands the same
+# frame to every viewer, so the int16 ones share one conversion.
+_last_quantized = (None, None)
+
+
+def quantize_frame(frame):
+    """The MSG_*_I16 version of a MSG_SNAPSHOT / MSG_DELTA frame."""
+    global _last_quantized
+    if _last_quantized[0] is frame:
+        return _last_quantized[1]
+    msg_type, status_int, reserved, num_traces, n, fps = struct.unpack_from(HEADER_FMT, frame)
+    data = np.frombuffer(frame, dtype="<f4", count=num_traces * n, offset=HEADER_SIZE)
+    data = data.reshape(num_traces, n)
+    lo = data.min(axis=1)
+    hi = data.max(axis=1)
+    finite = None
+    if not (np.isfinite(lo).all() and np.isfinite(hi).all()):
+        finite = np.isfinite(data)
+        lo = np.where(finite, data, np.inf).min(axis=1)
+        hi = np.where(finite, data, -np.inf).max(axis=1)
+        empty = lo > hi     # nothing finite in the row
+        lo[empty] = hi[empty] = 0.0
+    offset = ((lo.astype(np.float64) + hi) / 2).astype(np.float32)
+    scale = ((hi.astype(np.float64) - lo) / 65534).astype(np.float32)
+    scale[scale == 0] = 1.0
+
+    out = bytearray(HEADER_SIZE + 8 * num_traces + 2 * num_traces * n)
+    i16_type = MSG_SNAPSHOT_I16 if msg_type == MSG_SNAPSHOT else MSG_DELTA_I16
+    struct.pack_into(HEADER_FMT, out, 0, i16_type, status_int, reserved, num_traces, n, fps)
+    np.frombuffer(out, dtype="<f4", count=num_traces, offset=HEADER_SIZE)[:] = scale
+    np.frombuffer(out, dtype="<f4", count=num_traces, offset=HEADER_SIZE + 4 * num_traces)[:] = offset
+    q = np.frombuffer(out, dtype="<i2", offset=HEADER_SIZE + 8 * num_traces).reshape(num_traces, n)
+    with np.errstate(invalid="ignore"):
+        scaled = np.rint((data - offset[:, None]) / scale[:, None])
+    np.clip(scaled, -32767, 32767, out=scaled)
+    if finite is not None:
+        scaled[~finite] = I16_NONFINITE
+    q[...] = scaled
+    _last_quantized = (frame, out)
+    return out
+
+
+def envelope_bin_size(window, pixel_width):
+    """Samples per column for ``window`` samples over ``pixel_width``
+    pixels, or 0 if raw samples are the better deal."""
+    if pixel_width <= 0 or window <= 0:
+        return 0
+    bin_size = -(-window // pixel_width)
+    return bin_size if bin_size >= ENVELOPE_MIN_BIN else 0
+
+
+def envelope_windows(tab: Tab):
+    """``(narrowest, widest)`` plot window of ``tab``, in samples.
+
+    One envelope serves every plot of a tab, so its bins are sized for
+    the narrowest plot (no plot is drawn coarser than a pixel column)
+    and it reaches back as far as the widest one.
+    """
+    windows = tab.plot_windows or [tab.num_datapoints_in_plot]
+    return min(windows), max(windows)
+
+
+def make_envelope_message(tab: Tab, bin_size, from_bin=None):
+    """Pack a MSG_ENVELOPE frame of the tab's widest plot window.
+
+    Covers the whole window, or only bins ``from_bin`` onwards when
+    given (a viewer that already has the earlier ones). Vectorized over
+    all traces with ``reduceat``.
+    """
+    num_traces = tab.num_traces
+    if num_traces <= 0 or tab.buffer is None:
+        return None
+    head = tab.li
+    oldest = tab.buffer.oldest
+    first_bin = max(head - envelope_windows(tab)[1], oldest) // bin_size
+    if from_bin is not None:
+        first_bin = max(first_bin, from_bin)
+    start = max(first_bin * bin_size, oldest)
+    if start >= head:
+        return None
+    samples = tab.read_samples(start, head)
+    last_bin = (head - 1) // bin_size
+    num_bins = last_bin - first_bin + 1
+    starts = np.arange(first_bin, last_bin + 1, dtype=np.int64) * bin_size - start
+    starts[0] = 0   # first bin may be cut short by the ring's oldest sample
+    ends = np.append(starts[1:], head - start)
+
+    status_int = 1 if tab.title_color == "red" else 0
+    fps = float(tab.fps) if tab.fps else 0.0
+    frame = bytearray(HEADER_SIZE + ENVELOPE_SIZE + 16 * num_traces * num_bins)
+    struct.pack_into(
+        HEADER_FMT, frame, 0,
+        MSG_ENVELOPE, status_int, 0, num_traces, 4 * num_bins, fps,
+    )
+    struct.pack_into(
+        ENVELOPE_FMT, frame, HEADER_SIZE, bin_size, num_bins, first_bin, head
+    )
+    out = np.frombuffer(
+        frame, dtype="<f4", offset=HEADER_SIZE + ENVELOPE_SIZE
+    ).reshape(num_traces, num_bins, 4)
+    out[:, :, 0] = samples[:, starts]
+    out[:, :, 1] = np.minimum.reduceat(samples, starts, axis=1)
+    out[:, :, 2] = np.maximum.reduceat(samples, starts, axis=1)
+    out[:, :, 3] = samples[:, ends - 1]
+    return frame
+
+
+def make_range_message(tab: Tab, lo, hi, points=None, rows=None):
+    """Pack a MSG_RANGE frame of samples ``[lo, hi)``.
+
+    Raw samples when ``points`` is None or the range already fits in
+    it (those must still be in the ring), otherwise about ``points``
+    min/max/mean bins from ``Tab.history``. ``rows`` picks a subset of
+    traces. Returns None if nothing in the range is held.
+    """
+    if tab.num_traces <= 0 or tab.buffer is None:
+        return None
+    if rows is None:
+        rows = list(range(tab.num_traces))
+    head = tab.li
+    if points is None or min(hi, head) - max(lo, tab.buffer.oldest) <= points:
+        lo = max(lo, tab.buffer.oldest)
+        hi = min(hi, head)
+        if hi <= lo:
+            return None
+        samples = tab.read_samples(lo, hi)[rows]
+        bin_size, start, values = 1, lo, samples[:, :, None]
+    else:
+        summary = tab.history(lo, hi, points)
+        if summary is None:
+            return None
+        bin_size, start = summary.bin_size, summary.start
+        values = np.stack([summary.min[rows], summary.max[rows], summary.mean[rows]], axis=2)
+    num_bins = values.shape[1]
+    per_bin = values.shape[2]
+
+    status_int = 1 if tab.title_color == "red" else 0
+    fps = float(tab.fps) if tab.fps else 0.0
+    frame = bytearray(HEADER_SIZE + RANGE_SIZE + 4 * values.size)
+    struct.pack_into(
+        HEADER_FMT, frame, 0,
+        MSG_RANGE, status_int, 0, len(rows), per_bin * num_bins, fps,
+    )
+    struct.pack_into(RANGE_FMT, frame, HEADER_SIZE, bin_size, num_bins, start, head)
+    out = np.frombuffer(frame, dtype="<f4", offset=HEADER_SIZE + RANGE_SIZE)
+    out.reshape(values.shape)[...] = values
+    return frame
+
+
 ###############################
 # WebSocket broadcasts #
 ###############################
+#
+# Every browser gets its own outgoing FIFO and writer task, so sending
+# to one viewer never waits on another: a phone on bad Wi-Fi only slows
+# itself down. Broadcasting encodes a message once and appends the same
+# object to each queue.
+
+# Pending plot-data frames a viewer may fall behind by before its
+# backlog is collapsed into one fresh snapshot.
+VIEWER_MAX_PENDING_FRAMES = 32
+# Anything beyond this many queued messages of any kind means the
+# browser has stopped reading; it gets disconnected (0: never).
+VIEWER_MAX_PENDING = max(0, args.viewer_max_pending)
+# Sample encodings a viewer can ask for (see ViewerQueue). "auto" goes
+# int16 once this many data frames are queued or one takes this long
+# to send, and stays there for WIRE_AUTO_HOLD seconds.
+WIRE_MODES = ("float32", "int16", "auto")
+WIRE_AUTO_BACKLOG = 4
+WIRE_AUTO_DRAIN_S = 0.01
+WIRE_AUTO_HOLD = 5.0
+
+
+class ViewerQueue:
+    """Outgoing messages for one WebSocket, drained by a writer task.
+
+    A viewer may also ask for a push budget (``set_budget``): at most
+    ``max_fps`` data frames per second, at most ``max_bytes_per_sec`` of
+    them, or ``auto`` pacing from how long its sends take to drain. A
+    budgeted viewer doesn't get the shared per-push deltas; the writer
+    instead builds one delta from where that viewer left off whenever
+    the budget allows, so it receives every sample in fewer frames.
+
+    Likewise a viewer that reported its plot ``pixel_width`` gets its
+    own MSG_ENVELOPE frames once the tab's window has several samples
+    per pixel column.
+
+    ``wire`` picks the sample encoding of snapshots and deltas:
+    ``float32``, ``int16`` (MSG_*_I16, half the bytes), or ``auto``,
+    which switches to int16 while the link can't keep up (frames back
+    up in the queue or take long to drain) and back once it has kept
+    up for ``WIRE_AUTO_HOLD`` seconds.
+    """
 
-async def ws_send_text(ws, message):
+    def __init__(self, ws):
+        self.ws = ws
+        self._items = deque()   # (is_data_frame, str | bytes-like)
+        self._pending_frames = 0
+        self._wake = asyncio.Event()
+        self.collapsed = 0      # backlogs replaced by a snapshot
+
+        # Push budget; 0 / False means unlimited.
+        self.max_fps = 0.0
+        self.max_bytes_per_sec = 0.0
+        self.auto = False
+        # Budgeted viewers only: the tab with samples we still owe, and
+        # the absolute sample index this viewer has been sent up to.
+        self._owed: Optional[Tab] = None
+        self._sent_li: Optional[int] = None
+        self._tokens = 0.0      # byte budget, refilled at max_bytes_per_sec
+        self._last_refill = perf_counter()
+        self._last_frame_at = 0.0
+        self._drain_s = 0.0     # smoothed time one data frame takes to send
+        self.pixel_width = 0
+        self._env_bin = 0       # bin size of the envelope last sent, 0 = raw
+        self.wire = "float32"
+        self._int16_until = 0.0  # auto: quantize until this perf_counter()
+
+        self.task = asyncio.create_task(self._writer())
+
+    @property
+    def budgeted(self):
+        return self.max_fps > 0 or self.max_bytes_per_sec > 0 or self.auto
+
+    def set_budget(self, max_fps=0.0, max_bytes_per_sec=0.0, auto=False):
+        self.max_fps = max(0.0, float(max_fps or 0.0))
+        self.max_bytes_per_sec = max(0.0, float(max_bytes_per_sec or 0.0))
+        self.auto = bool(auto)
+        self._tokens = self.max_bytes_per_sec
+        self._wake.set()
+
+    def set_pixel_width(self, width, tab=None):
+        """Record the widest plot's width in device pixels; re-send
+        ``tab`` right away if that changes what this viewer gets."""
+        width = max(0, int(width))
+        if width == self.pixel_width:
+            return
+        self.pixel_width = width
+        if tab is not None and tab.initialized:
+            self._sent_li = None
+            self._owed = tab
+            self._wake.set()
+
+    def set_wire(self, wire):
+        self.wire = wire if wire in WIRE_MODES else "float32"
+
+    def _int16(self):
+        """Whether snapshots and deltas go out quantized right now."""
+        if self.wire != "auto":
+            return self.wire == "int16"
+        now = perf_counter()
+        if (self._pending_frames >= WIRE_AUTO_BACKLOG
+                or self._drain_s >= WIRE_AUTO_DRAIN_S):
+            self._int16_until = now + WIRE_AUTO_HOLD
+        return now < self._int16_until
+
+    def reset_position(self):
+        """Forget the stream position, e.g. when switching tabs."""
+        self._owed = None
+        self._sent_li = None
+        self._env_bin = 0
+
+    def put_text(self, text):
+        self._put(False, text)
+
+    def put_bytes(self, payload):
+        self._put(False, payload)
+
+    def put_frame(self, tab, payload):
+        """Queue a plot-data frame of ``tab`` that ends at ``tab.li``."""
+        if self.budgeted or self._bin_size(tab):
+            if payload[0] == MSG_SNAPSHOT:
+                self._sent_li = None
+            self._owed = tab
+            self._wake.set()
+            return
+        if self._env_bin or (
+            payload[0] == MSG_DELTA
+            and self._sent_li != tab.li - struct.unpack_from("<I", payload, 8)[0]
+        ):
+            # This viewer's plot doesn't end where the shared delta
+            # starts (it had envelopes, or subscribed between pushes).
+            payload = make_snapshot_message(tab)
+            self._env_bin = 0
+            if payload is None:
+                return
+        if self._pending_frames >= VIEWER_MAX_PENDING_FRAMES:
+            # Drop the queued deltas and send where the tab is *now*.
+            # The pusher has just advanced last_pushed_li to tab.li, so
+            # this snapshot ends exactly where the next delta starts.
+            snap = make_snapshot_message(tab)
+            if snap is not None:
+                self._items = deque(item for item in self._items if not item[0])
+                self._pending_frames = 0
+                self.collapsed += 1
+                self._int16_until = perf_counter() + WIRE_AUTO_HOLD
+                payload = snap
+        if self._int16():
+            payload = quantize_frame(payload)
+        self._put(True, payload)
+        self._sent_li = tab.li
+
+    def _put(self, is_frame, item):
+        if VIEWER_MAX_PENDING and len(self._items) >= VIEWER_MAX_PENDING:
+            print("[rtplot] dropping a browser that stopped reading")
+            _remove_ws(self.ws)
+            asyncio.create_task(self.ws.close())
+            return
+        self._items.append((is_frame, item))
+        if is_frame:
+            self._pending_frames += 1
+        self._wake.set()
+
+    def _budget_delay(self):
+        """Seconds until the budget allows the next data frame."""
+        now = perf_counter()
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        if self.auto:
+            # Spend at most about half the time blocked on this socket.
+            interval = max(interval, 2.0 * self._drain_s)
+        delay = self._last_frame_at + interval - now
+        if self.max_bytes_per_sec > 0:
+            rate = self.max_bytes_per_sec
+            self._tokens = min(rate, self._tokens + (now - self._last_refill) * rate)
+            self._last_refill = now
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / rate)
+        return delay
+
+    def _bin_size(self, tab):
+        return envelope_bin_size(envelope_windows(tab)[0], self.pixel_width)
+
+    def _build_owed_frame(self):
+        """Everything ``_owed`` has beyond ``_sent_li`` as one frame."""
+        tab = self._owed
+        self._owed = None
+        if tab is None or not tab.initialized or tab.buffer is None:
+            return None
+        li = tab.li
+        sent = self._sent_li
+        bin_size = self._bin_size(tab)
+        stale = (
+            sent is None or bin_size != self._env_bin
+            or li - sent >= envelope_windows(tab)[1] or sent < tab.buffer.oldest
+        )
+        if bin_size:
+            # Re-send the bin the last frame ended in; it was partial.
+            from_bin = None if stale else (sent - 1) // bin_size
+            frame = make_envelope_message(tab, bin_size, from_bin)
+        elif stale:
+            frame = make_snapshot_message(tab)
+        elif li > sent:
+            frame = make_data_message(tab, MSG_DELTA, sent, li)
+        else:
+            frame = None
+        if frame is not None:
+            self._sent_li = li
+            self._env_bin = bin_size
+            if not bin_size and self._int16():
+                frame = quantize_frame(frame)
+        return frame
+
+    async def _send(self, item):
+        if isinstance(item, str):
+            await self.ws.send_str(item)
+        else:
+            await self.ws.send_bytes(item)
+
+    async def _writer(self):
+        ws = self.ws
+        try:
+            while True:
+                timeout = None
+                if self._owed is not None and not self._items:
+                    delay = self._budget_delay()
+                    if delay <= 0:
+                        frame = self._build_owed_frame()
+                        if frame is not None:
+                            started = perf_counter()
+                            await self._send(frame)
+                            took = perf_counter() - started
+                            self._drain_s = 0.8 * self._drain_s + 0.2 * took
+                            self._last_frame_at = perf_counter()
+                            self._tokens -= len(frame)
+                        continue
+                    timeout = delay
+                if not self._items:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+                while self._items:
+                    is_frame, item = self._items.popleft()
+                    if not is_frame:
+                        await self._send(item)
+                        continue
+                    self._pending_frames -= 1
+                    started = perf_counter()
+                    await self._send(item)
+                    self._drain_s = 0.8 * self._drain_s + 0.2 * (perf_counter() - started)
+        except (ConnectionResetError, RuntimeError):
+            pass    # the socket closed under us
+        except Exception as exc:  # noqa: BLE001 — keep a broken viewer from lingering
+            print(f"[rtplot] browser writer failed: {exc!r}; disconnecting it")
+            asyncio.create_task(ws.close())
+        finally:
+            # Also on cancellation: a viewer without a writer gets nothing.
+            _remove_ws(ws)
+
+
+_BUDGET_KEYS = ("max_fps", "max_bytes_per_sec", "auto_rate", "wire")
+
+
+def _apply_viewer_budget(q: ViewerQueue, payload: dict):
+    """Apply a browser's ``max_fps`` / ``max_bytes_per_sec`` / ``auto_rate``
+    and ``wire`` sample encoding."""
+    if "wire" in payload:
+        q.set_wire(payload.get("wire"))
+    def _num(key):
+        try:
+            v = float(payload.get(key) or 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+        return v if v > 0 and np.isfinite(v) else 0.0
+    q.set_budget(_num("max_fps"), _num("max_bytes_per_sec"), bool(payload.get("auto_rate")))
+
+
+def _apply_pixel_width(q: ViewerQueue, payload: dict, tab: Optional[Tab] = None):
+    """Apply a browser's ``pixel_width`` (widest plot, device pixels)."""
     try:
-        await ws.send_str(json.dumps(message))
-        return True
-    except (ConnectionResetError, RuntimeError):
+        width = int(payload.get("pixel_width") or 0)
+    except (TypeError, ValueError):
+        return
+    q.set_pixel_width(min(max(width, 0), 16384), tab)
+
+
+async def ws_send_text(ws, message):
+    q = ws_queues.get(ws)
+    if q is None:
         return False
+    q.put_text(json.dumps(message))
+    return True
 
 
-async def ws_send_bytes(ws, payload):
-    try:
-        await ws.send_bytes(payload)
-        return True
-    except (ConnectionResetError, RuntimeError):
+async def ws_send_bytes(ws, payload, tab=None):
+    """Queue a binary frame; with ``tab`` it's plot data that may collapse."""
+    q = ws_queues.get(ws)
+    if q is None:
         return False
+    if tab is not None:
+        q.put_frame(tab, payload)
+    else:
+        q.put_bytes(payload)
+    return True
 
 
 async def broadcast_text_all(message):
     """Send a JSON dict to every connected client."""
     if not ws_clients:
         return
-    dead = []
+    text = json.dumps(message)
     for ws in list(ws_clients):
-        if not await ws_send_text(ws, message):
-            dead.append(ws)
-    for ws in dead:
-        _remove_ws(ws)
+        q = ws_queues.get(ws)
+        if q is not None:
+            q.put_text(text)
 
 
 async def broadcast_text_tab(tab_id, message):
     """Send a JSON dict only to browsers currently viewing ``tab_id``."""
-    for ws in viewers_of(tab_id):
-        await ws_send_text(ws, message)
+    viewers = viewers_of(tab_id)
+    if not viewers:
+        return
+    text = json.dumps(message)
+    for ws in viewers:
+        q = ws_queues.get(ws)
+        if q is not None:
+            q.put_text(text)
 
 
 async def broadcast_bytes_tab(tab_id, payload):
     if payload is None:
         return
+    t = tabs.get(tab_id)
     for ws in viewers_of(tab_id):
-        await ws_send_bytes(ws, payload)
+        await ws_send_bytes(ws, payload, tab=t)
 
 
 async def broadcast_tab_list():
@@ -709,6 +1553,9 @@ async def broadcast_peer_count():
 def _remove_ws(ws):
     ws_clients.discard(ws)
     ws_tab.pop(ws, None)
+    q = ws_queues.pop(ws, None)
+    if q is not None and q.task is not asyncio.current_task():
+        q.task.cancel()
 
 
 ###############################
@@ -760,27 +1607,34 @@ def _open_tab_sockets(tab: Tab):
     attempts = 4 if tab.mode == "bind" else 1
     for attempt in range(attempts):
         monitor = None
+        data = None
         try:
-            data = zmq_ctx.socket(zmq.SUB)
-            data.setsockopt_string(zmq.SUBSCRIBE, "")
-            data.setsockopt(zmq.LINGER, 0)
+            # With --workers the tab's worker opens the data socket.
+            if tab.shard is None:
+                data = zmq_ctx.socket(zmq.SUB)
+                data.setsockopt_string(zmq.SUBSCRIBE, "")
+                data.setsockopt(zmq.LINGER, 0)
             ctrl = zmq_ctx.socket(zmq.PUSH)
             ctrl.setsockopt(zmq.SNDHWM, 1000)
             ctrl.setsockopt(zmq.LINGER, 0)
 
             if tab.mode == "bind":
-                data.bind(f"tcp://*:{ZMQ_DEFAULT_PORT}")
+                if data is not None:
+                    data.bind(f"tcp://*:{ZMQ_DEFAULT_PORT}")
                 ctrl.bind(f"tcp://*:{ZMQ_CONTROL_PORT}")
                 tab.endpoint = f"*:{ZMQ_DEFAULT_PORT}"
                 print(f"[{tab.id}] ZMQ: bound on tcp://*:{ZMQ_DEFAULT_PORT}")
             else:
-                monitor = data.get_monitor_socket(
+                # Without a data socket here, the control socket's
+                # connection to the same peer stands in for it.
+                monitor = (data or ctrl).get_monitor_socket(
                     zmq.EVENT_CONNECTED
                     | zmq.EVENT_DISCONNECTED
                     | zmq.EVENT_CONNECT_DELAYED
                     | zmq.EVENT_CONNECT_RETRIED
                 )
-                data.connect(connect_data_ep)
+                if data is not None:
+                    data.connect(connect_data_ep)
                 ctrl_ep, _ = _normalize_connect_target(
                     _control_target_from_data(tab.endpoint), port=ZMQ_CONTROL_PORT
                 )
@@ -789,6 +1643,15 @@ def _open_tab_sockets(tab: Tab):
                 tab.monitor_task = asyncio.create_task(zmq_monitor(tab, monitor))
                 print(f"[{tab.id}] ZMQ: connecting to {connect_data_ep} (ctrl {ctrl_ep})")
 
+            if tab.shard is not None:
+                if tab.mode == "bind":
+                    shard_command(tab, "open", {"bind": f"tcp://*:{ZMQ_DEFAULT_PORT}"})
+                else:
+                    shard_command(tab, "open", {"connect": connect_data_ep})
+                # A reopened tab keeps its config and history.
+                send_shard_ring(tab)
+                print(f"[{tab.id}] data received by worker {tab.shard}")
+
             tab.data_sock = data
             tab.ctrl_sock = ctrl
             tab.status = "idle"
@@ -822,6 +1685,8 @@ def _open_tab_sockets(tab: Tab):
 
 
 def _close_tab_sockets(tab: Tab):
+    if tab.shard is not None:
+        shard_command(tab, "close")
     for attr in ("data_sock", "ctrl_sock"):
         sock = getattr(tab, attr, None)
         if sock is not None:
@@ -921,11 +1786,139 @@ async def _recv_array_async(sock):
     return arr.reshape(md["shape"])
 
 
+async def _recv_packed_array_async(sock):
+    """Receive the header + payload frames that follow a packed category.
+
+    Both frames belong to the same multipart message as the category, so
+    they are already queued locally. Returns ``(array, seq, send_time)``; raises
+    ``protocol.ProtocolError`` on a malformed frame after draining the
+    rest of the message, so the next receive starts on a fresh category.
+    """
+    frames = []
+    while sock.getsockopt(zmq.RCVMORE):
+        frames.append(await sock.recv(copy=False))
+    if len(frames) != 2:
+        raise protocol.ProtocolError(
+            f"packed data frame has {len(frames) + 1} parts, expected 3"
+        )
+    return protocol.unpack_data_frame(frames[0].buffer, frames[1].buffer)
+
+
+async def ingest_config(tab: Tab, cfg) -> bool:
+    """Apply a plot config that arrived for ``tab``.
+
+    Shared by the ZMQ receiver and replay tabs. Returns False (and
+    keeps the previous config live) if it was rejected.
+    """
+    try:
+        parse_config(tab, cfg)
+    except Exception as exc:  # noqa: BLE001
+        msg = f"Configuration rejected: {type(exc).__name__}: {exc}"
+        print(f"[{tab.id}] {msg}")
+        tab.last_config_error = {"message": msg, "timestamp": time.time()}
+        await broadcast_tab(tab.id)
+        return False
+
+    tab.last_config_error = None  # clear: this one was good
+    tab.config_dict = cfg
+    refresh_config_message(tab)
+    tab.initialized = True
+    await _roll_recording(tab)
+    tab.fps = 0.0
+    tab._last_ingest_ts = perf_counter()
+    tab.status = "streaming"
+    tab.error = None
+    # Blocking-handshake ack: tells initialize_plots() on the
+    # client side that the config made it past PUB/SUB's
+    # slow-joiner window so it can stop resending and return.
+    # Old clients ignore unknown event types and keys, so this is
+    # safe to emit unconditionally. The "protocol" field advertises
+    # the newest data framing we decode, which lets newer clients
+    # switch to packed single-message frames; "codecs" lists the
+    # payload compressors we can decode.
+    await send_control_event(tab, {
+        "type": "config_ack",
+        "protocol": protocol.PROTOCOL_VERSION,
+        "codecs": protocol.available_codecs(),
+    })
+    await broadcast_text_tab(tab.id, tab.config_message)
+    await broadcast_tab(tab.id)
+    snap = make_snapshot_message(tab)
+    if snap is not None:
+        await broadcast_bytes_tab(tab.id, snap)
+    # Echo seeded slider defaults back so client's first
+    # poll_controls() call already sees the declared initial values.
+    for sid, svalue in tab.slider_values.items():
+        await send_control_event(
+            tab, {"type": "slider", "id": sid, "value": svalue}
+        )
+    for text_id, text_value in tab.text_values.items():
+        await send_control_event(
+            tab, {"type": "text", "id": text_id, "value": text_value}
+        )
+    return True
+
+
+async def ingest_samples(tab: Tab, arr, now):
+    """Store a ``(traces, n)`` batch on ``tab`` and wake its pusher.
+
+    Shared by the ZMQ receiver and replay tabs; ``now`` is the
+    ``perf_counter()`` time the batch arrived.
+    """
+    tab._unpushed_rx.append(now)
+    if STORAGE_DTYPE is None:
+        # --storage-dtype native: keep integer counts as they came.
+        tab.ensure_buffer(
+            arr.dtype if arr.dtype in protocol.DTYPE_CODES else np.float64
+        )
+    else:
+        tab.ensure_buffer()
+    if tab.buffer.data.dtype.kind == "f":
+        arr = protocol.dequantize(arr, tab.trace_scaling)
+
+    tab.buffer.write(arr)
+    values = (
+        arr if arr.dtype.kind == "f"
+        else protocol.dequantize(arr, tab.trace_scaling)
+    )
+    await samples_landed(tab, values, tab.buffer.head, now)
+
+
+async def samples_landed(tab: Tab, values, head, now, frames=1):
+    """Catch ``tab`` up once ``tab.buffer`` holds samples up to ``head``.
+
+    ``values`` are the new samples as floats, ``frames`` the number of
+    data frames they came in (for the rate readout; 0 leaves it alone).
+    """
+    tab.pyramid.write(values)
+    if tab.recorder is not None:
+        tab.recorder.write(values)
+
+    dt = now - tab._last_ingest_ts
+    if frames and dt > 0:
+        tab._last_ingest_ts = now
+        if not tab.fps:
+            fps = frames / dt
+        else:
+            s = float(np.clip(dt * 3.0, 0, 1))
+            fps = tab.fps * (1 - s) + (frames / dt) * s
+        tab.fps = fps
+        tab.data_rate_hz = fps
+
+    num_values = head - tab.li
+    tab.li = head
+    tab.buffer_bounds[0] += num_values
+    tab.buffer_bounds[1] += num_values
+    tab.title_color = "green"
+    tab.data_ready.set()
+    if tab.status != "streaming":
+        tab.status = "streaming"
+        tab.error = None
+        await broadcast_tab(tab.id)
+
+
 async def zmq_receiver(tab: Tab):
     """Drain ``tab.data_sock`` as fast as possible into ``tab.buffer``."""
-    last_time = perf_counter()
-    fps = None
-
     while True:
         sock = tab.data_sock
         if sock is None:
@@ -962,83 +1955,30 @@ async def zmq_receiver(tab: Tab):
             try:
                 cfg = await sock.recv_json(object_pairs_hook=OrderedDict)
             except Exception as exc:  # noqa: BLE001
-                msg = f"Could not decode config JSON: {type(exc).__name__}: {exc}"
-                print(f"[{tab.id}] {msg}")
-                tab.last_config_error = {"message": msg, "timestamp": time.time()}
-                await broadcast_tab(tab.id)
-                continue
-
-            try:
-                parse_config(tab, cfg)
-            except Exception as exc:  # noqa: BLE001
-                msg = f"Configuration rejected: {type(exc).__name__}: {exc}"
-                print(f"[{tab.id}] {msg}")
-                tab.last_config_error = {"message": msg, "timestamp": time.time()}
-                await broadcast_tab(tab.id)
+                await reject_config_json(tab, exc)
                 continue
 
-            tab.last_config_error = None  # clear: this one was good
-            tab.config_dict = cfg
-            refresh_config_message(tab)
-            tab.initialized = True
-            fps = None
-            tab.fps = 0.0
-            last_time = now
-            tab.status = "streaming"
-            tab.error = None
-            # Blocking-handshake ack: tells initialize_plots() on the
-            # client side that the config made it past PUB/SUB's
-            # slow-joiner window so it can stop resending and return.
-            # Old clients ignore unknown event types, so this is safe
-            # to emit unconditionally.
-            await send_control_event(tab, {"type": "config_ack"})
-            await broadcast_text_tab(tab.id, tab.config_message)
-            await broadcast_tab(tab.id)
-            snap = make_snapshot_message(tab)
-            if snap is not None:
-                await broadcast_bytes_tab(tab.id, snap)
-            # Echo seeded slider defaults back so client's first
-            # poll_controls() call already sees the declared initial values.
-            for sid, svalue in tab.slider_values.items():
-                await send_control_event(
-                    tab, {"type": "slider", "id": sid, "value": svalue}
-                )
-            for text_id, text_value in tab.text_values.items():
-                await send_control_event(
-                    tab, {"type": "text", "id": text_id, "value": text_value}
-                )
+            await ingest_config(tab, cfg)
 
-        elif category == RECEIVED_DATA:
-            arr = await _recv_array_async(sock)
+        elif category in (RECEIVED_DATA, RECEIVED_PACKED_DATA):
+            send_time = None
+            tab.frames_received += 1
+            if category == RECEIVED_DATA:
+                arr = await _recv_array_async(sock)
+            else:
+                try:
+                    arr, seq, send_time = await _recv_packed_array_async(sock)
+                except protocol.ProtocolError as exc:
+                    print(f"[{tab.id}] dropping packed data frame: {exc}")
+                    tab.frames_discarded += 1
+                    continue
+                tab.note_seq(seq)
             if not tab.initialized:
+                tab.frames_discarded += 1
                 continue
-            tab.ensure_buffer()
-
-            num_values = arr.shape[1]
-            li = tab.li
-            num_traces = tab.num_traces
-
-            tab.buffer[:num_traces, li:li + num_values] = arr[:num_traces, :]
-
-            dt = now - last_time
-            last_time = now
-            if dt > 0:
-                if fps is None:
-                    fps = 1.0 / dt
-                else:
-                    s = float(np.clip(dt * 3.0, 0, 1))
-                    fps = fps * (1 - s) + (1.0 / dt) * s
-                tab.fps = fps
-                tab.data_rate_hz = fps
-
-            tab.li = li + num_values
-            tab.buffer_bounds[0] += num_values
-            tab.buffer_bounds[1] += num_values
-            tab.title_color = "green"
-            if tab.status != "streaming":
-                tab.status = "streaming"
-                tab.error = None
-                await broadcast_tab(tab.id)
+            if send_time is not None:
+                tab.latency["network"].add((time.time() - send_time) * 1000.0)
+            await ingest_samples(tab, arr, now)
 
         elif category == SAVE_PLOT:
             # Legacy parquet-save; ignored but still drained.
@@ -1048,30 +1988,318 @@ async def zmq_receiver(tab: Tab):
                 pass
 
         elif category == RECEIVED_DISPLAY:
-            payload = await sock.recv_json()
-            display_id = payload.get("id")
-            value = payload.get("value")
-            if display_id is None:
-                continue
-            if not isinstance(value, (int, float, str)):
-                continue
-            if tab.display_values.get(display_id) != value:
-                tab.display_values[display_id] = value
-                tab.display_dirty.add(display_id)
+            ingest_display(tab, await sock.recv_json())
 
         elif category == RECEIVED_TEXT_INPUT:
-            payload = await sock.recv_json()
-            text_id = payload.get("id")
-            if text_id is None:
+            await ingest_text_input(tab, await sock.recv_json())
+
+
+async def reject_config_json(tab: Tab, exc):
+    """Surface a config that didn't even decode as JSON."""
+    msg = f"Could not decode config JSON: {type(exc).__name__}: {exc}"
+    print(f"[{tab.id}] {msg}")
+    tab.last_config_error = {"message": msg, "timestamp": time.time()}
+    await broadcast_tab(tab.id)
+
+
+def ingest_display(tab: Tab, payload):
+    """Store a display value the client sent; display_pusher sends it on."""
+    display_id = payload.get("id")
+    value = payload.get("value")
+    if display_id is None:
+        return
+    if not isinstance(value, (int, float, str)):
+        return
+    if tab.display_values.get(display_id) != value:
+        tab.display_values[display_id] = value
+        tab.display_dirty.add(display_id)
+
+
+async def ingest_text_input(tab: Tab, payload):
+    """Store a text box value the client set, and echo it back to it."""
+    text_id = payload.get("id")
+    if text_id is None:
+        return
+    value = str(payload.get("value", ""))
+    if tab.text_values.get(text_id) != value:
+        tab.text_values[text_id] = value
+        tab.text_dirty.add(text_id)
+        refresh_config_message(tab)
+        await send_control_event(
+            tab, {"type": "text", "id": text_id, "value": value}
+        )
+
+
+async def replay_feeder(tab: Tab):
+    """Play ``tab.replay`` into the tab at its speed, like zmq_receiver."""
+    src = tab.replay
+    if not await ingest_config(tab, src.reader.header.get("config") or OrderedDict()):
+        return
+    src.seek(src.position)
+    while True:
+        batch, wait = src.next_batch()
+        if batch is None and wait is None:
+            # Ran out; wait for a seek.
+            if tab.status != "idle":
+                tab.status = "idle"
+                await broadcast_tab(tab.id)
+            await asyncio.sleep(0.1)
+            continue
+        if batch is not None:
+            if tab.status != "streaming":
+                tab.status = "streaming"
+                await broadcast_tab(tab.id)
+            now = perf_counter()
+            tab._last_rx_ts = now
+            tab.frames_received += 1
+            await ingest_samples(tab, batch, now)
+        # At max speed wait is 0: still yield so pushers and sockets run.
+        await asyncio.sleep(wait)
+
+
+async def control_replay(tab: Tab, payload: dict):
+    """Apply a browser's ``speed`` / ``paused`` / ``seek`` (recorded seconds)."""
+    src = tab.replay
+    if src is None:
+        return
+    try:
+        if "speed" in payload:
+            src.set_speed(max(0.0, float(payload["speed"])))
+        if "paused" in payload:
+            src.set_paused(bool(payload["paused"]))
+        if "seek" in payload:
+            src.seek(src.position_at(float(payload["seek"])))
+    except (TypeError, ValueError):
+        return
+    await broadcast_tab(tab.id)
+
+
+###############################
+# Worker processes (--workers) #
+###############################
+
+# Main's ends of the rtplot.shard channels: one PULL every worker
+# reports to, and a PUSH per worker (by index) for its commands.
+shard_events: Optional[zmq.asyncio.Socket] = None
+shard_commands: list = []
+shard_procs: list = []
+# How long to wait for the workers to come up at startup.
+SHARD_START_TIMEOUT = 20.0
+# Worker messages taken in per turn of the event loop, and the most
+# values (samples x traces) read from a ring before the loop gets a turn.
+SHARD_MAX_BATCH = 1024
+SHARD_CHUNK_VALUES = 1 << 18
+
+
+async def start_workers(count: int):
+    """Launch ``count`` ingest workers and wait until each is listening.
+
+    Workers are plain ``python -m rtplot.shard`` processes rather than
+    multiprocessing children, so they don't re-import (and re-parse the
+    arguments of) this module. If they don't come up, tabs are received
+    here as without --workers.
+    """
+    global shard_events
+    shard_events = zmq_ctx.socket(zmq.PULL)
+    shard_events.setsockopt(zmq.LINGER, 0)
+    port = shard_events.bind_to_random_port("tcp://127.0.0.1")
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (package_root, env.get("PYTHONPATH")) if p
+    )
+    for index in range(count):
+        shard_procs.append(subprocess.Popen(
+            [sys.executable, "-m", "rtplot.shard",
+             f"tcp://127.0.0.1:{port}", str(index), str(os.getpid())],
+            env=env,
+        ))
+
+    endpoints = {}
+    deadline = perf_counter() + SHARD_START_TIMEOUT
+    while len(endpoints) < count:
+        remaining = deadline - perf_counter()
+        if remaining <= 0 or not await shard_events.poll(remaining * 1000):
+            print(
+                f"[rtplot] only {len(endpoints)}/{count} workers started;"
+                " receiving on the event loop instead"
+            )
+            stop_workers()
+            return
+        _, kind, body = await shard_events.recv_multipart()
+        if kind == b"ready":
+            msg = json.loads(body)
+            endpoints[msg["index"]] = msg["commands"]
+    sync_ctx = zmq.Context.shadow(zmq_ctx.underlying)
+    for index in range(count):
+        sock = sync_ctx.socket(zmq.PUSH)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(endpoints[index])
+        shard_commands.append(sock)
+    print(f"[rtplot] --workers: receiving ZMQ data in {count} processes")
+
+
+def stop_workers():
+    """Tell the workers to exit, and make sure they do."""
+    for sock in shard_commands:
+        try:
+            sock.send_multipart(shard_pack("", "exit", {}), flags=zmq.DONTWAIT)
+        except zmq.ZMQError:
+            pass
+    for proc in shard_procs:
+        try:
+            proc.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    for sock in shard_commands:
+        sock.close(0)
+    shard_commands.clear()
+    shard_procs.clear()
+    if shard_events is not None:
+        shard_events.close(0)
+
+
+def pick_shard() -> Optional[int]:
+    """Index of the worker with the fewest tabs, or None without workers."""
+    if not shard_commands:
+        return None
+    load = [0] * len(shard_commands)
+    for t in tabs.values():
+        if t.shard is not None:
+            load[t.shard] += 1
+    return load.index(min(load))
+
+
+def shard_command(tab: Tab, kind, payload=None):
+    try:
+        shard_commands[tab.shard].send_multipart(
+            shard_pack(tab.id, kind, payload or {}), flags=zmq.DONTWAIT
+        )
+    except (IndexError, zmq.ZMQError) as exc:
+        print(f"[{tab.id}] could not reach worker {tab.shard}: {exc}")
+
+
+def send_shard_ring(tab: Tab):
+    """Hand ``tab``'s worker the current ring, config state and scaling."""
+    shard_command(tab, "ring", ring_message(
+        tab.buffer, tab.initialized, tab.trace_scaling, STORAGE_DTYPE is None
+    ))
+
+
+async def ingest_shard_data(tab: Tab, report, now):
+    """Take in the samples a worker wrote to ``tab.buffer`` since ``li``.
+
+    Reports can arrive faster than they are handled; whichever comes
+    first takes everything written so far and the rest only add their
+    frame counts. A big backlog is taken a chunk at a time, letting the
+    loop run in between.
+    """
+    tab.frames_received += report["frames"]
+    tab.frames_gapped += report["gaps"]
+    tab.frames_discarded += report["discarded"]
+    for ms in report["network"]:
+        tab.latency["network"].add(ms)
+    tab._last_rx_ts = now
+    buf = tab.buffer
+    if not tab.initialized or buf is None:
+        return
+    head = buf.head
+    if head <= tab.li:
+        return
+    tab._unpushed_rx.append(now)
+    dtype = np.float64 if buf.data.dtype == np.float64 else np.float32
+    step = max(1, SHARD_CHUNK_VALUES // max(1, tab.num_traces))
+    lo = tab.li
+    while True:
+        hi = min(lo + step, head)
+        values = tab.read_samples(lo, hi, dtype=dtype)
+        # Lets the worker reuse the space (it stays half a ring ahead
+        # of this at most, so nothing here is overwritten before it's read).
+        buf.tail = hi
+        if hi == head:
+            await samples_landed(tab, values, hi, now, frames=max(1, report["frames"]))
+            return
+        await samples_landed(tab, values, hi, now, frames=0)
+        lo = hi
+        await asyncio.sleep(0)
+        if tabs.get(tab.id) is not tab or tab.buffer is not buf or tab.li != hi:
+            return      # deleted or reconfigured meanwhile
+
+
+async def shard_listener():
+    """Apply what the workers report (see rtplot.shard for the messages).
+
+    Whatever has queued up is taken in one go, with each tab's data
+    reports merged so its new samples are read once, then the loop gets
+    a turn: a recv that is ready never yields, and busy workers would
+    otherwise starve the pushers and HTTP handlers.
+    """
+    while True:
+        messages = [await shard_events.recv_multipart()]
+        while len(messages) < SHARD_MAX_BATCH:
+            try:
+                messages.append(await shard_events.recv_multipart(flags=zmq.NOBLOCK))
+            except zmq.Again:
+                break
+        now = perf_counter()
+        reports = {}
+        for tab_id, kind, body in messages:
+            t = tabs.get(tab_id.decode("utf-8"))
+            if t is None or t.shard is None:
                 continue
-            value = str(payload.get("value", ""))
-            if tab.text_values.get(text_id) != value:
-                tab.text_values[text_id] = value
-                tab.text_dirty.add(text_id)
-                refresh_config_message(tab)
-                await send_control_event(
-                    tab, {"type": "text", "id": text_id, "value": value}
-                )
+            kind = kind.decode("ascii")
+            if kind == "data":
+                merged = reports.setdefault(t.id, (t, {
+                    "frames": 0, "gaps": 0, "discarded": 0, "network": [],
+                }))[1]
+                report = json.loads(body)
+                for key in ("frames", "gaps", "discarded", "network"):
+                    merged[key] += report[key]
+                continue
+            # Anything else is handled in order with the tab's data.
+            if t.id in reports:
+                await ingest_shard_data(*reports.pop(t.id), now)
+            await _shard_event(t, kind, body, now)
+        for t, report in reports.values():
+            await ingest_shard_data(t, report, now)
+        await asyncio.sleep(0)
+
+
+async def _shard_event(t: Tab, kind, body, now):
+    try:
+        if kind == "config":
+            t._last_rx_ts = now
+            try:
+                cfg = json.loads(body, object_pairs_hook=OrderedDict)
+            except ValueError as exc:
+                await reject_config_json(t, exc)
+            else:
+                await ingest_config(t, cfg)
+            # The worker holds samples until it hears back.
+            send_shard_ring(t)
+        elif kind == "ring?":
+            if t.initialized:
+                wire = np.dtype(json.loads(body)["dtype"])
+                if STORAGE_DTYPE is None:
+                    t.ensure_buffer(
+                        wire if wire in protocol.DTYPE_CODES else np.float64
+                    )
+                else:
+                    t.ensure_buffer()
+            send_shard_ring(t)
+        elif kind == "display":
+            ingest_display(t, json.loads(body))
+        elif kind == "text":
+            await ingest_text_input(t, json.loads(body))
+        elif kind == "error":
+            t.status = "error"
+            t.error = json.loads(body)["message"]
+            print(f"[{t.id}] worker {t.shard}: {t.error}")
+            await broadcast_tab(t.id)
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:  # noqa: BLE001
+        print(f"[{t.id}] bad {kind!r} message from worker {t.shard}: {exc}")
 
 
 ###############################
@@ -1112,39 +2340,70 @@ async def text_input_pusher():
             )
 
 
-async def ws_pusher():
-    """Push new samples to viewers as binary delta frames, per tab."""
-    target_dt = 1.0 / max(1, args.rate)
-    while True:
-        await asyncio.sleep(target_dt)
-        if not ws_clients:
-            continue
-        for t in list(tabs.values()):
-            if not t.initialized:
-                continue
-            if not viewers_of(t.id):
-                # No browser is watching this tab, skip encoding cost.
-                continue
+async def push_tab_data(t: Tab):
+    """Send ``t``'s samples since the last push to its viewers."""
+    if not t.initialized:
+        return
+    if not viewers_of(t.id):
+        # No browser is watching this tab, skip encoding cost.
+        # Nothing is queued for a viewer either. A new viewer gets a
+        # snapshot on subscribe, so the next push only owes a delta.
+        t.last_pushed_li = t.li
+        t._unpushed_rx.clear()
+        return
 
-            current_li = t.li
-            last_li = t.last_pushed_li
-            if current_li <= last_li:
-                continue
+    current_li = t.li
+    last_li = t.last_pushed_li
+    if current_li <= last_li:
+        return
 
-            num_traces = t.num_traces
-            if num_traces == 0:
-                continue
+    num_traces = t.num_traces
+    if num_traces == 0:
+        return
+
+    window = t.num_datapoints_in_plot
+    n_new = current_li - last_li
+    if n_new >= window:
+        payload = make_data_message(t, MSG_SNAPSHOT, current_li - window, current_li)
+    else:
+        payload = make_data_message(t, MSG_DELTA, last_li, current_li)
+    t.last_pushed_li = current_li
+
+    if payload is not None:
+        await broadcast_bytes_tab(t.id, payload)
+        pushed = perf_counter()
+        queue_stats = t.latency["queue"]
+        for rx in t._unpushed_rx:
+            queue_stats.add((pushed - rx) * 1000.0)
+    t._unpushed_rx.clear()
+
+
+async def tab_pusher(t: Tab):
+    """Push ``t``'s new samples to viewers as binary delta frames.
+
+    Sleeps on ``t.data_ready`` (set by zmq_receiver on ingest), so an
+    idle tab costs nothing. A frame that arrives after a quiet spell is
+    pushed right away; after each push we hold off until ``1/--rate``
+    has passed, and everything that lands meanwhile goes out as one
+    coalesced delta.
+    """
+    min_interval = 1.0 / max(1, args.rate)
+    while True:
+        await t.data_ready.wait()
+        t.data_ready.clear()
+        started = perf_counter()
+        await push_tab_data(t)
+        wait = min_interval - (perf_counter() - started)
+        if wait > 0:
+            await asyncio.sleep(wait)
 
-            window = t.num_datapoints_in_plot
-            n_new = current_li - last_li
-            if n_new >= window:
-                payload = make_data_message(t, MSG_SNAPSHOT, current_li - window, current_li)
-            else:
-                payload = make_data_message(t, MSG_DELTA, last_li, current_li)
-            t.last_pushed_li = current_li
 
-            if payload is not None:
-                await broadcast_bytes_tab(t.id, payload)
+def latency_public() -> dict:
+    """Per-tab, per-stage latency percentiles (ms) for the UI and API."""
+    return {
+        tid: {stage: stats.summary() for stage, stats in t.latency.items()}
+        for tid, t in tabs.items()
+    }
 
 
 async def resources_pusher():
@@ -1167,7 +2426,16 @@ async def resources_pusher():
             "available": _PSUTIL_AVAILABLE,
             "tabs": len(tabs),
             "viewers": len(ws_clients),
+            "workers": len(shard_commands),
             "rates": {tid: t.data_rate_hz for tid, t in tabs.items()},
+            "latency": latency_public(),
+            "frames": {tid: t.frame_counts() for tid, t in tabs.items()},
+            "recording": {
+                tid: recording_public(t) for tid, t in tabs.items() if t.recording
+            },
+            "replay": {
+                tid: replay_public(t) for tid, t in tabs.items() if t.replay is not None
+            },
         }
         # Decay the per-tab Hz estimate when a sender goes quiet so the
         # panel doesn't show a stale reading forever.
@@ -1196,16 +2464,24 @@ def _new_tab_id() -> str:
     return "tab_" + uuid.uuid4().hex[:8]
 
 
+def _start_receiver(t: Tab):
+    # Tabs handed to a worker are fed by shard_listener instead.
+    if t.shard is None:
+        t.receiver_task = asyncio.create_task(zmq_receiver(t))
+
+
 async def create_bind_me_tab():
     t = Tab(
         id=BIND_ME_ID,
         name=BIND_ME_NAME,
         mode="bind",
         endpoint=f"*:{ZMQ_DEFAULT_PORT}",
+        shard=pick_shard(),
     )
     tabs[t.id] = t
     _open_tab_sockets(t)
-    t.receiver_task = asyncio.create_task(zmq_receiver(t))
+    _start_receiver(t)
+    t.pusher_task = asyncio.create_task(tab_pusher(t))
 
 
 async def create_connect_tab(
@@ -1223,10 +2499,12 @@ async def create_connect_tab(
         name=display_name,
         mode="connect",
         endpoint=label,
+        shard=pick_shard(),
     )
     tabs[t.id] = t
     _open_tab_sockets(t)
-    t.receiver_task = asyncio.create_task(zmq_receiver(t))
+    _start_receiver(t)
+    t.pusher_task = asyncio.create_task(tab_pusher(t))
     # If the client at the other end is already running and only called
     # initialize_plots() once at its startup, this nudges it to resend
     # the cached config so the new tab populates without a script restart.
@@ -1237,6 +2515,34 @@ async def create_connect_tab(
     return t
 
 
+async def create_replay_tab(name: str, path: str) -> Tab:
+    """Open a tab playing the recording at ``path``, which must resolve
+    to a file inside ``--record-dir`` (any browser can ask for one)."""
+    root = os.path.realpath(args.record_dir)
+    full = os.path.realpath(os.path.join(root, path))
+    t = Tab(
+        id=_new_tab_id(),
+        name=name.strip() or os.path.basename(full),
+        mode="replay",
+        endpoint=os.path.basename(full),
+    )
+    tabs[t.id] = t
+    if os.path.commonpath([root, full]) != root:
+        t.status = "error"
+        t.error = "Recordings must be inside --record-dir."
+    else:
+        try:
+            t.replay = ReplaySource(RecordingReader(full))
+        except (OSError, ValueError, KeyError) as exc:
+            t.status = "error"
+            t.error = f"Could not open recording: {exc}"
+        else:
+            t.receiver_task = asyncio.create_task(replay_feeder(t))
+    t.pusher_task = asyncio.create_task(tab_pusher(t))
+    await broadcast_tab_list()
+    return t
+
+
 async def delete_tab(tab_id: str):
     if tab_id == BIND_ME_ID:
         return
@@ -1244,8 +2550,14 @@ async def delete_tab(tab_id: str):
     if t is None:
         return
     await _cancel_task(t.receiver_task)
+    await _cancel_task(t.pusher_task)
     await _cancel_task(t.monitor_task)
     _close_tab_sockets(t)
+    await _close_recorder(t)
+    if t.replay is not None:
+        t.replay.reader.close()
+    if isinstance(t.buffer, SharedRing):
+        t.buffer.release()
     # Move any viewers off this tab back to bind_me on the browser side;
     # server tells them via tab_removed + they re-subscribe.
     for ws in list(ws_tab.keys()):
@@ -1332,6 +2644,10 @@ async def reconnect_tab(tab_id: str):
     t = tabs.get(tab_id)
     if t is None:
         return
+    if t.mode == "replay":
+        # Nothing to reconnect; play it again from the start.
+        await control_replay(t, {"seek": 0, "paused": False})
+        return
     await _cancel_task(t.receiver_task)
     await _cancel_task(t.monitor_task)
     t.monitor_task = None
@@ -1342,7 +2658,7 @@ async def reconnect_tab(tab_id: str):
     # resources panel until new samples arrive.
     t.data_rate_hz = 0.0
     t._last_rx_ts = 0.0
-    t.receiver_task = asyncio.create_task(zmq_receiver(t))
+    _start_receiver(t)
     asyncio.create_task(_request_config_resend(t))
     await broadcast_tab(tab_id)
 
@@ -1375,6 +2691,7 @@ async def handle_ws(request):
     await ws.prepare(request)
     ws_clients.add(ws)
     ws_tab[ws] = BIND_ME_ID  # default until client sends tab_subscribe
+    ws_queues[ws] = ViewerQueue(ws)
     await broadcast_peer_count()
     try:
         # Initial sync: tab list. The browser picks an active tab and
@@ -1395,6 +2712,13 @@ async def handle_ws(request):
                         continue
                     ws_tab[ws] = tid
                     t = tabs[tid]
+                    q = ws_queues.get(ws)
+                    if q is not None:
+                        q.reset_position()
+                        if any(k in payload for k in _BUDGET_KEYS):
+                            _apply_viewer_budget(q, payload)
+                        if "pixel_width" in payload:
+                            _apply_pixel_width(q, payload)
                     await ws_send_text(
                         ws,
                         {
@@ -1417,7 +2741,7 @@ async def handle_ws(request):
                             )
                         snap = make_snapshot_message(t)
                         if snap is not None:
-                            await ws_send_bytes(ws, snap)
+                            await ws_send_bytes(ws, snap, tab=t)
                     else:
                         await ws_send_text(
                             ws, {"type": "no_config", "tab": t.id}
@@ -1425,6 +2749,10 @@ async def handle_ws(request):
 
                 elif ptype == "tab_create":
                     name = str(payload.get("name", "")).strip()
+                    replay = str(payload.get("replay", "")).strip()
+                    if replay:
+                        await create_replay_tab(name, replay)
+                        continue
                     endpoint = str(payload.get("endpoint", "")).strip()
                     if not endpoint:
                         continue
@@ -1441,6 +2769,16 @@ async def handle_ws(request):
                     if tid and tid != BIND_ME_ID:
                         await delete_tab(tid)
 
+                elif ptype == "replay_control":
+                    t = tabs.get(payload.get("id"))
+                    if t is not None:
+                        await control_replay(t, payload)
+
+                elif ptype == "tab_record":
+                    t = tabs.get(payload.get("id"))
+                    if t is not None:
+                        await set_recording(t, bool(payload.get("on")))
+
                 elif ptype == "tab_reconnect":
                     tid = payload.get("id")
                     if tid:
@@ -1480,6 +2818,26 @@ async def handle_ws(request):
                         await send_control_event(
                             t, {"type": "text", "id": text_id, "value": value}
                         )
+                elif ptype == "viewer_budget":
+                    q = ws_queues.get(ws)
+                    if q is not None:
+                        _apply_viewer_budget(q, payload)
+
+                elif ptype == "viewer_pixels":
+                    q = ws_queues.get(ws)
+                    if q is not None:
+                        _apply_pixel_width(q, payload, tabs.get(ws_tab.get(ws, BIND_ME_ID)))
+
+                elif ptype == "latency_report":
+                    # Browser-measured frame-arrival -> rendered times (ms).
+                    t = tabs.get(payload.get("tab") or ws_tab.get(ws, BIND_ME_ID))
+                    samples = payload.get("render_ms")
+                    if t is not None and isinstance(samples, list):
+                        t.latency["render"].extend(
+                            s for s in samples[:1024]
+                            if isinstance(s, (int, float)) and not isinstance(s, bool)
+                            and math.isfinite(s) and s >= 0
+                        )
             elif msg.type == WSMsgType.ERROR:
                 break
     finally:
@@ -1520,6 +2878,20 @@ _SNAPSHOT_TEMPLATE = """<!doctype html>
 <script>
 (function () {
   const SNAP = __SNAPSHOT_JSON__;
+  // Trace data arrives as base64 little-endian float32, one trace after
+  // another; x holds sample offsets when the window was downsampled.
+  function decodeF32(b64) {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new Float32Array(bytes.buffer);
+  }
+  const ALL = decodeF32(SNAP.trace_data);
+  SNAP.trace_data = [];
+  for (let t = 0; t < SNAP.num_traces; t++) {
+    SNAP.trace_data.push(ALL.subarray(t * SNAP.num_points, (t + 1) * SNAP.num_points));
+  }
+  const XOFF = SNAP.x ? decodeF32(SNAP.x) : null;
   const plotsDiv = document.getElementById('plots');
   const COLOR_MAP = { r:'rgb(255,0,0)', g:'rgb(0,200,0)', b:'rgb(0,0,255)',
                       c:'rgb(0,200,200)', m:'rgb(200,0,200)',
@@ -1534,9 +2906,10 @@ _SNAPSHOT_TEMPLATE = """<!doctype html>
   const plots = [];
   let traceOffset = 0;
   SNAP.plots.forEach(function (pcfg) {
-    const xrange = SNAP.num_samples;
+    const xrange = SNAP.num_points;
+    const dt = Number(pcfg.sample_rate) > 0 ? 1 / Number(pcfg.sample_rate) : 1;
     const xs = new Float64Array(xrange);
-    for (let i = 0; i < xrange; i++) xs[i] = i;
+    for (let i = 0; i < xrange; i++) xs[i] = (XOFF ? XOFF[i] : i) * dt;
     const traceCount = pcfg.names.length;
     const colors = pcfg.colors || DEFAULT_COLORS;
     const widths = pcfg.line_width || [];
@@ -1564,7 +2937,7 @@ _SNAPSHOT_TEMPLATE = """<!doctype html>
       height: 260,
       title: pcfg.title || '',
       scales: {
-        x: { time: false, range: [0, xrange - 1] },
+        x: { time: false, range: [0, (SNAP.num_samples - 1) * dt] },
         y: pcfg.yrange ? { range: [pcfg.yrange[0], pcfg.yrange[1]] } : {},
       },
       axes: [{ label: pcfg.xlabel || '' }, { label: pcfg.ylabel || '' }],
@@ -1580,7 +2953,7 @@ _SNAPSHOT_TEMPLATE = """<!doctype html>
   if (SNAP.animate) {
     let phase = 0;
     setInterval(function () {
-      phase = (phase + 1) % SNAP.num_samples;
+      phase = (phase + 1) % SNAP.num_points;
       plots.forEach(function (p) {
         const nd = [p.xs];
         for (let t = 0; t < p.traceCount; t++) {
@@ -1618,18 +2991,32 @@ except Exception as _exc:  # noqa: BLE001
     _UPLOT_CSS = ""
 
 
-def _build_snapshot_html(tab: Tab, animate: bool) -> str:
-    """Serialize the given tab's plot state into a static snapshot."""
+# The template around the data never changes: substitute the uPlot
+# bundle once and keep the bytes on either side of the JSON payload.
+_SNAPSHOT_PREFIX, _SNAPSHOT_SUFFIX = (
+    part.encode("utf-8")
+    for part in _SNAPSHOT_TEMPLATE
+    .replace("__UPLOT_CSS__", _UPLOT_CSS)
+    .replace("__UPLOT_JS__", _UPLOT_JS)
+    .split("__SNAPSHOT_JSON__")
+)
+# Windows with more sample data than this are encoded in the executor.
+SNAPSHOT_EXECUTOR_BYTES = 1 << 18
+
+
+def _snapshot_parts(tab: Tab, animate: bool, points=None):
+    """Copy what a snapshot of ``tab`` needs off the live state.
+
+    Returns ``(meta, data, xs)``: the JSON-able plot description, the
+    ``(traces, n)`` float32 samples and, when ``points`` downsampled the
+    window, their float32 x offsets in samples (else None). Returns None
+    if the tab has no plot yet. Cheap enough for the loop; the encoding
+    in ``_render_snapshot`` is what can get expensive.
+    """
     num_points = tab.num_datapoints_in_plot
     num_traces = tab.num_traces
     if num_traces == 0 or not tab.initialized or tab.buffer is None:
-        return (
-            "<!doctype html><html><body style='font-family:sans-serif;padding:32px'>"
-            "<h1>rtplot snapshot</h1>"
-            f"<p>No plot has been initialized on tab <b>{tab.name}</b> yet"
-            " &mdash; start your client and call <code>initialize_plots()</code>"
-            " first, then hit <code>/snapshot.html</code> again.</p></body></html>"
-        )
+        return None
     li = tab.li
     lo = max(0, li - num_points)
     hi = li
@@ -1649,43 +3036,303 @@ def _build_snapshot_html(tab: Tab, animate: bool) -> str:
             "xlabel": plot_description.get("xlabel"),
             "ylabel": plot_description.get("ylabel"),
             "yrange": plot_description.get("yrange"),
+            "sample_rate": plot_description.get("sample_rate"),
         })
 
-    trace_data = []
-    arr = tab.buffer[:num_traces, lo:hi]
-    for i in range(num_traces):
-        trace_data.append([float(v) for v in arr[i]])
+    xs = None
+    summary = None
+    if points is not None and hi - lo > points:
+        # Each bin contributes its min and max, so spikes survive.
+        summary = tab.history(lo, hi, max(1, points // 2))
+    if summary is not None:
+        num_bins = summary.min.shape[1]
+        data = np.empty((num_traces, 2 * num_bins), dtype=np.float32)
+        data[:, 0::2] = summary.min[:num_traces]
+        data[:, 1::2] = summary.max[:num_traces]
+        mid = summary.start + (np.arange(num_bins) + 0.5) * summary.bin_size - lo
+        xs = np.repeat(np.clip(mid, 0, hi - lo - 1), 2).astype(np.float32)
+    else:
+        data = tab.read_samples(lo, hi)
 
-    payload = {
+    meta = {
         "plots": plots,
         "num_samples": int(hi - lo),
-        "trace_data": trace_data,
+        "num_traces": num_traces,
+        "num_points": int(data.shape[1]),
         "animate": bool(animate),
     }
-    html = _SNAPSHOT_TEMPLATE
-    html = html.replace("__UPLOT_CSS__", _UPLOT_CSS)
-    html = html.replace("__UPLOT_JS__", _UPLOT_JS)
-    html = html.replace("__SNAPSHOT_JSON__", json.dumps(payload))
-    return html
+    return meta, data, xs
+
+
+def _render_snapshot(meta, data, xs) -> bytes:
+    """The snapshot HTML for ``_snapshot_parts``' output."""
+    meta = dict(meta)
+    meta["trace_data"] = base64.b64encode(data.astype("<f4", copy=False).tobytes()).decode("ascii")
+    if xs is not None:
+        meta["x"] = base64.b64encode(xs.astype("<f4", copy=False).tobytes()).decode("ascii")
+    return b"".join((_SNAPSHOT_PREFIX, json.dumps(meta).encode("utf-8"), _SNAPSHOT_SUFFIX))
+
+
+def _empty_snapshot_html(tab: Tab) -> str:
+    return (
+        "<!doctype html><html><body style='font-family:sans-serif;padding:32px'>"
+        "<h1>rtplot snapshot</h1>"
+        f"<p>No plot has been initialized on tab <b>{tab.name}</b> yet"
+        " &mdash; start your client and call <code>initialize_plots()</code>"
+        " first, then hit <code>/snapshot.html</code> again.</p></body></html>"
+    )
 
 
 async def handle_snapshot(request):
+    """GET /snapshot.html -> a static HTML copy of a tab's plots.
+
+    Query: ``tab`` (default the bind tab), ``animate=1`` for a replay
+    loop, ``points`` to embed at most about that many points per trace
+    (min/max pairs of the window's bins) instead of every sample.
+    """
     animate = request.query.get("animate") == "1"
     tid = request.query.get("tab") or BIND_ME_ID
     t = tabs.get(tid) or tabs[BIND_ME_ID]
-    html = _build_snapshot_html(t, animate=animate)
+    try:
+        points = int(request.query["points"]) if "points" in request.query else None
+    except ValueError:
+        return web.Response(status=400, text="points takes an integer.\n")
+    if points is not None and points < 2:
+        return web.Response(status=400, text="points must be at least 2.\n")
+    parts = _snapshot_parts(t, animate, points)
+    if parts is None:
+        return web.Response(
+            text=_empty_snapshot_html(t),
+            content_type="text/html",
+            headers={"Cache-Control": "no-store"},
+        )
+    if parts[1].nbytes >= SNAPSHOT_EXECUTOR_BYTES:
+        # Encoding a big window takes milliseconds; keep it off the
+        # loop so polling dashboards don't stall live streaming.
+        body = await asyncio.get_running_loop().run_in_executor(
+            None, _render_snapshot, *parts
+        )
+    else:
+        body = _render_snapshot(*parts)
     return web.Response(
-        text=html,
+        body=body,
         content_type="text/html",
+        charset="utf-8",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+async def handle_latency(request):
+    """GET /api/latency -> per-tab p50/p95/p99 for each pipeline stage."""
+    return web.json_response(
+        {"stages": list(LATENCY_STAGES), "tabs": latency_public()},
         headers={"Cache-Control": "no-store"},
     )
 
 
+async def handle_range(request):
+    """GET /api/tabs/{id}/range -> one MSG_RANGE frame.
+
+    Query: ``from`` / ``to`` absolute sample positions (negative counts
+    back from the newest sample; default the live window), ``points``
+    to summarize into about that many min/max/mean bins, ``traces`` a
+    comma-separated list of trace indices.
+    """
+    t = tabs.get(request.match_info["id"])
+    if t is None:
+        return web.Response(status=404, text="No such tab.\n")
+    if not t.initialized or t.buffer is None:
+        return web.Response(status=404, text="No plot data on this tab yet.\n")
+    head = t.li
+    q = request.query
+    try:
+        hi = int(q["to"]) if "to" in q else head
+        lo = int(q["from"]) if "from" in q else hi - t.num_datapoints_in_plot
+        points = int(q["points"]) if "points" in q else None
+        rows = [int(i) for i in q["traces"].split(",")] if q.get("traces") else None
+    except ValueError:
+        return web.Response(status=400, text="from, to, points and traces take integers.\n")
+    if hi < 0:
+        hi += head
+    if lo < 0:
+        lo += head
+    if points is not None and points < 1:
+        return web.Response(status=400, text="points must be at least 1.\n")
+    if rows is not None and not all(0 <= i < t.num_traces for i in rows):
+        return web.Response(
+            status=400, text=f"traces must be between 0 and {t.num_traces - 1}.\n"
+        )
+    frame = make_range_message(t, lo, hi, points, rows)
+    if frame is None:
+        return web.Response(status=404, text="Nothing held in that range.\n")
+    return web.Response(
+        body=frame,
+        content_type="application/octet-stream",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+def _export_source(t: Tab, source: str):
+    """``(read, lo, hi, dtype, labels, opened)`` for exporting ``t``'s samples.
+
+    ``read(lo, hi, rows)`` copies a ``(rows, n)`` chunk. The buffer is
+    read on the loop (it changes under us otherwise); a recording file
+    only ever grows, so its reads can run in the executor. A replay
+    tab's own reader is reused; otherwise the recording is opened here
+    and returned as ``opened`` for the caller to close. Returns None if
+    there is nothing to export.
+    """
+    if source == "recording":
+        opened = None
+        if t.replay is not None:
+            reader = t.replay.reader
+        elif t.recording_path is None:
+            return None
+        else:
+            try:
+                reader = opened = RecordingReader(t.recording_path)
+            except (OSError, ValueError, KeyError):
+                return None
+        if reader.num_samples == 0:
+            if opened is not None:
+                opened.close()
+            return None
+        labels = reader.header.get("trace_labels") or [
+            f"trace {i}" for i in range(reader.num_traces)
+        ]
+        return reader.read, 0, reader.num_samples, reader.dtype, labels, opened
+    if not t.initialized or t.buffer is None:
+        return None
+    dtype = np.float64 if t.buffer.data.dtype == np.float64 else np.float32
+    # Positions before the pyramid's origin are the zeros a fresh ring
+    # starts with, not samples.
+    lo = max(t.buffer.oldest, t.pyramid.origin)
+
+    def read(a, b, rows):
+        return t.read_samples(a, b, dtype=dtype)[rows]
+    return read, lo, t.li, np.dtype(dtype), [name for name, _ in t.trace_labels], None
+
+
+async def handle_export(request):
+    """GET /api/tabs/{id}/export -> the tab's samples as a file download.
+
+    Query: ``format`` npy (default), npz or csv; ``source`` buffer (the
+    tab's in-memory history, default) or recording (its newest recording
+    file, or the file a replay tab plays); ``from`` / ``to`` positions
+    (buffer: absolute, recording: from the start of the file; negative
+    counts back from the newest sample; default everything held);
+    ``traces`` a comma-separated list of trace indices.
+
+    The body is streamed a chunk at a time, so memory use doesn't grow
+    with the export and the loop is only held for one chunk's copy.
+    """
+    t = tabs.get(request.match_info["id"])
+    if t is None:
+        return web.Response(status=404, text="No such tab.\n")
+    q = request.query
+    fmt = q.get("format", "npy")
+    if fmt not in export.FORMATS:
+        return web.Response(
+            status=400, text=f"format must be one of {', '.join(export.FORMATS)}.\n"
+        )
+    source = q.get("source", "buffer")
+    if source not in ("buffer", "recording"):
+        return web.Response(status=400, text="source must be buffer or recording.\n")
+    found = _export_source(t, source)
+    if found is None:
+        return web.Response(status=404, text=f"No {source} data on this tab.\n")
+    read, oldest, head, dtype, labels, opened = found
+    try:
+        try:
+            hi = int(q["to"]) if "to" in q else head
+            lo = int(q["from"]) if "from" in q else oldest
+            rows = [int(i) for i in q["traces"].split(",")] if q.get("traces") else None
+        except ValueError:
+            return web.Response(status=400, text="from, to and traces take integers.\n")
+        if hi < 0:
+            hi += head
+        if lo < 0:
+            lo += head
+        lo, hi = max(lo, oldest), min(hi, head)
+        if rows is None:
+            rows = list(range(len(labels)))
+        elif not all(0 <= i < len(labels) for i in rows):
+            return web.Response(
+                status=400, text=f"traces must be between 0 and {len(labels) - 1}.\n"
+            )
+        if hi <= lo:
+            return web.Response(status=404, text="Nothing held in that range.\n")
+
+        n = hi - lo
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in t.name) or t.id
+        resp = web.StreamResponse(headers={
+            "Content-Type": export.CONTENT_TYPES[fmt],
+            "Content-Disposition": f'attachment; filename="{safe_name}-{lo}-{hi}.{fmt}"',
+            "Cache-Control": "no-store",
+            "X-Rtplot-Start": str(lo),
+            "X-Rtplot-Samples": str(n),
+        })
+        npy_head = export.npy_header(dtype, len(rows), n)
+        if fmt == "npy":
+            resp.content_length = len(npy_head) + n * len(rows) * dtype.itemsize
+        await resp.prepare(request)
+
+        loop = asyncio.get_running_loop()
+        npz = None
+        if fmt == "npy":
+            await resp.write(npy_head)
+        elif fmt == "npz":
+            npz = export.NpzStream()
+            npz.begin_data(dtype, len(rows), n, lo, [labels[i] for i in rows])
+            await resp.write(npz.take())
+        else:
+            await resp.write(export.csv_header([labels[i] for i in rows]))
+
+        step = export.chunk_samples(len(rows), dtype.itemsize)
+        buffer = t.buffer
+        for a in range(lo, hi, step):
+            b = min(a + step, hi)
+            if source == "recording":
+                chunk = await loop.run_in_executor(None, read, a, b, rows)
+            elif t.buffer is not buffer or t.li < hi or a < buffer.oldest:
+                # New samples overwrote the rest of the range before we got
+                # to it, or a new config reset the history. Cut the
+                # connection so the client sees a truncated download rather
+                # than a short file that looks complete.
+                print(f"[{t.id}] export overtaken by new samples at {a}; aborting")
+                request.transport.close()
+                return resp
+            else:
+                chunk = read(a, b, rows)
+            if fmt == "csv":
+                data = await loop.run_in_executor(None, export.csv_chunk, chunk, a)
+            else:
+                data = export.npy_chunk(chunk)
+                if npz is not None:
+                    npz.write(data)
+                    data = npz.take()
+            # Waits for the socket to drain, so a slow client paces the
+            # export instead of piling chunks up in memory.
+            await resp.write(data)
+        if npz is not None:
+            npz.finish()
+            await resp.write(npz.take())
+        await resp.write_eof()
+        return resp
+    finally:
+        if opened is not None:
+            opened.close()
+
+
 ###############################
 # Lifecycle #
 ###############################
 
 async def on_startup(app):
+    if args.workers > 0:
+        await start_workers(args.workers)
+        if shard_commands:
+            app["shard_task"] = asyncio.create_task(shard_listener())
     await create_bind_me_tab()
 
     # Persisted tabs (user-created connect tabs) from disk.
@@ -1714,19 +3361,24 @@ async def on_startup(app):
         if existing is None:
             await create_connect_tab(f"CLI {label}", args.pi_ip, persist=False)
 
-    app["ws_task"] = asyncio.create_task(ws_pusher())
     app["display_task"] = asyncio.create_task(display_pusher())
     app["text_input_task"] = asyncio.create_task(text_input_pusher())
     app["resources_task"] = asyncio.create_task(resources_pusher())
 
 
 async def on_cleanup(app):
-    for key in ("ws_task", "display_task", "text_input_task", "resources_task"):
+    for key in ("display_task", "text_input_task", "resources_task", "shard_task"):
         await _cancel_task(app.get(key))
     for t in list(tabs.values()):
         await _cancel_task(t.receiver_task)
+        await _cancel_task(t.pusher_task)
         await _cancel_task(t.monitor_task)
         _close_tab_sockets(t)
+        await _close_recorder(t)
+    stop_workers()
+    for t in tabs.values():
+        if isinstance(t.buffer, SharedRing):
+            t.buffer.release()
     for ws in list(ws_clients):
         try:
             await ws.close()
@@ -1871,6 +3523,9 @@ def build_app():
     app.router.add_get("/logout", handle_logout)
     app.router.add_get("/ws", handle_ws)
     app.router.add_get("/snapshot.html", handle_snapshot)
+    app.router.add_get("/api/latency", handle_latency)
+    app.router.add_get("/api/tabs/{id}/range", handle_range)
+    app.router.add_get("/api/tabs/{id}/export", handle_export)
     static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
     app.router.add_static("/static/", static_dir)
     app.on_startup.append(on_startup)
@@ -0,0 +1,454 @@
+"""Multi-process ZMQ ingest for the browser server (``--workers N``).
+
+By default every tab's receiver, the pushers, the HTTP server and all
+the numpy work share one asyncio loop, so one core. With ``--workers``
+each ZMQ tab is assigned to one of N worker processes, which own its
+data socket, decode its frames and write the samples straight into a
+``SharedRing``: a ``RingBuffer`` whose block (and head) live in
+``multiprocessing.shared_memory``. The main process keeps the tab's
+control socket, config handling, history pyramid, recording and
+WebSocket fan-out, and reads the ring in place.
+
+Main and workers talk over loopback TCP (it works on Windows too),
+each message ``[tab_id, kind, json]``. Main binds one PULL all workers
+report to; each worker binds a PULL for its commands and tells main
+where in its first message:
+
+    main -> worker   open    {"bind": ep} or {"connect": ep}
+                     close   {}
+                     ring    the tab's ring (see ``ring_message``); sent
+                             after every config and ring request
+                     exit    {} (tab_id empty)
+    worker -> main   ready   {"index": i, "commands": ep} (tab_id empty)
+                     config  raw config JSON as the client sent it
+                     display / text   raw JSON payloads
+                     ring?   {"dtype": wire dtype} - a ring that can
+                             store this is needed first
+                     data    {"frames", "gaps", "discarded", "network"}
+                             after new samples were written; the new
+                             head is in the ring itself
+                     error   {"message": ...}
+
+After forwarding a config the worker holds that tab's samples until
+main answers with ``ring``, so main can reset or replace the ring (and
+its scaling) without racing the writer. Main also stores how far it has
+read (``tail``) in the block. A worker never gets more than half a ring
+ahead of that: it stops reading the tab's socket instead, and the
+sender's PUB drops frames (seen as sequence gaps), just as when the
+server's own receiver can't keep up.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import zmq
+
+from rtplot import protocol
+from rtplot.ring import RingBuffer
+
+# Must match the category numbers in server_browser / client.
+RECEIVED_PLOT_UPDATE = 0
+RECEIVED_DATA = 1
+SAVE_PLOT = 3
+RECEIVED_DISPLAY = 4
+RECEIVED_TEXT_INPUT = 5
+RECEIVED_PACKED_DATA = int(protocol.SENDING_PACKED_DATA)
+
+# Messages drained from one tab's socket before the worker looks at the
+# others and reports progress; bounds how stale a "data" report gets.
+MAX_DRAIN = 256
+# Frames held per tab while waiting for a ring from main.
+MAX_PENDING = 1024
+# The ring's head and tail counters sit in front of the samples, in one
+# cache line.
+HEAD_BYTES = 64
+# How often a worker that is waiting for main to catch up looks again.
+FULL_POLL_MS = 2
+
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    # Only the creator (main) may unlink it. Python < 3.13 registers
+    # attached blocks with the resource tracker too, which would unlink
+    # them when this process exits.
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:  # noqa: BLE001
+        pass
+    return shm
+
+
+class SharedRing(RingBuffer):
+    """``RingBuffer`` in a shared-memory block another process can map.
+
+    ``name=None`` creates a new (all-zero) block; otherwise the named one is
+    attached. ``head`` is stored in the block, so a worker's writes are
+    visible to readers in other processes as soon as it is bumped
+    (``RingBuffer.write`` moves it after the samples are in place).
+    ``tail`` is where the reader has got to, for the writer to respect.
+    """
+
+    def __init__(self, num_traces, capacity, dtype=np.float64, name=None):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = int(capacity)
+        rows = max(1, num_traces)
+        dtype = np.dtype(dtype)
+        if name is None:
+            size = HEAD_BYTES + rows * self.capacity * dtype.itemsize
+            shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            shm = _attach(name)
+        self.owner = name is None
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=shm.buf)
+        self.data = np.ndarray(
+            (rows, self.capacity), dtype=dtype, buffer=shm.buf, offset=HEAD_BYTES
+        )
+        # Set after the views: when a dropped ring is collected they go
+        # first, so the block's own cleanup can unmap it.
+        self.shm = shm
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def head(self):
+        return int(self._counters[0])
+
+    @head.setter
+    def head(self, value):
+        self._counters[0] = value
+
+    @property
+    def tail(self):
+        return int(self._counters[1])
+
+    @tail.setter
+    def tail(self, value):
+        self._counters[1] = value
+
+    def reset(self, head=0):
+        super().reset(head)
+        self.tail = head
+
+    def release(self):
+        """Unmap the block, and free it if we created it."""
+        self._counters = self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass    # a view is still alive; the mapping goes with it
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def ring_message(ring, initialized, scaling, native):
+    """The ``ring`` command describing ``ring`` (None: no ring yet)."""
+    msg = {"initialized": bool(initialized), "native": bool(native), "scaling": None}
+    if scaling is not None:
+        msg["scaling"] = [np.asarray(scaling[0]).tolist(), np.asarray(scaling[1]).tolist()]
+    if ring is not None:
+        msg.update({
+            "shm": ring.name,
+            "rows": ring.num_traces,
+            "capacity": ring.capacity,
+            "dtype": ring.data.dtype.str,
+        })
+    return msg
+
+
+def pack(tab_id, kind, payload):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    return [tab_id.encode("utf-8"), kind.encode("ascii"), body]
+
+
+###############################
+# Worker process #
+###############################
+
+class _WorkerTab:
+    """One tab's socket and ring inside a worker."""
+
+    def __init__(self, tab_id, sock):
+        self.id = tab_id
+        self.sock = sock
+        self.polled = True          # sock is registered with the poller
+        self.ring = None
+        self.initialized = False
+        self.native = False
+        self.scaling = None
+        self.waiting = False        # for main's answer to config / ring?
+        # Frames not in the ring yet, oldest first: while waiting, or
+        # while the ring is as far ahead of main as it may get.
+        self.pending = deque()
+        self.next_seq = None
+        self.frames = self.gaps = self.discarded = 0
+        self.written = False
+        self.network = []
+
+    @property
+    def full(self):
+        return bool(self.pending) and not self.waiting
+
+    def set_ring(self, msg):
+        name = msg.get("shm")
+        if self.ring is not None and self.ring.name != name:
+            self.ring.release()
+            self.ring = None
+        if name is not None and self.ring is None:
+            self.ring = SharedRing(msg["rows"], msg["capacity"], msg["dtype"], name=name)
+        self.initialized = msg["initialized"]
+        self.native = msg["native"]
+        scaling = msg.get("scaling")
+        self.scaling = None if scaling is None else (
+            np.asarray(scaling[0]), np.asarray(scaling[1])
+        )
+        self.waiting = False
+
+    def close(self):
+        self.sock.close(0)
+        if self.ring is not None:
+            self.ring.release()
+            self.ring = None
+
+    def note_seq(self, seq):
+        if self.next_seq is not None and seq > self.next_seq:
+            self.gaps += seq - self.next_seq
+        self.next_seq = seq + 1
+
+
+class _Worker:
+    def __init__(self, ctx, events):
+        self.ctx = ctx
+        self.events = events
+        self.tabs = {}
+        self.poller = zmq.Poller()
+
+    def send(self, tab, kind, payload):
+        self.events.send_multipart(pack(tab.id, kind, payload))
+
+    # Commands from main
+
+    def open(self, tab_id, msg):
+        self.close(tab_id)
+        sock = self.ctx.socket(zmq.SUB)
+        sock.setsockopt_string(zmq.SUBSCRIBE, "")
+        sock.setsockopt(zmq.LINGER, 0)
+        tab = _WorkerTab(tab_id, sock)
+        try:
+            if "bind" in msg:
+                # A just-closed port can take a moment to free up.
+                for attempt in range(4):
+                    try:
+                        sock.bind(msg["bind"])
+                        break
+                    except zmq.ZMQError:
+                        if attempt == 3:
+                            raise
+                        time.sleep(0.15 * (attempt + 1))
+            else:
+                sock.connect(msg["connect"])
+        except zmq.ZMQError as exc:
+            sock.close(0)
+            self.send(tab, "error", {"message": str(exc)})
+            return
+        self.tabs[tab_id] = tab
+        self.poller.register(sock, zmq.POLLIN)
+
+    def close(self, tab_id):
+        tab = self.tabs.pop(tab_id, None)
+        if tab is not None:
+            if tab.polled:
+                self.poller.unregister(tab.sock)
+            tab.close()
+
+    def set_ring(self, tab_id, msg):
+        tab = self.tabs.get(tab_id)
+        if tab is None:
+            return
+        tab.set_ring(msg)
+        self.flush(tab)
+
+    # Frames from clients
+
+    def receive(self, tab):
+        """Handle one message from ``tab``'s socket."""
+        sock = tab.sock
+        received = sock.recv()
+        try:
+            category = int(received)
+        except ValueError:
+            return
+        if category == RECEIVED_PLOT_UPDATE:
+            raw = sock.recv()
+            # Samples so far belong to the old config; hold the rest
+            # until main has applied the new one and answers.
+            self.report(tab)
+            tab.waiting = True
+            self.send(tab, "config", raw)
+        elif category in (RECEIVED_DATA, RECEIVED_PACKED_DATA):
+            tab.frames += 1
+            if category == RECEIVED_DATA:
+                md = json.loads(sock.recv())
+                arr = np.frombuffer(sock.recv(), dtype=md["dtype"]).reshape(md["shape"])
+            else:
+                frames = []
+                while sock.getsockopt(zmq.RCVMORE):
+                    frames.append(sock.recv(copy=False))
+                try:
+                    if len(frames) != 2:
+                        raise protocol.ProtocolError(
+                            f"packed data frame has {len(frames) + 1} parts, expected 3"
+                        )
+                    arr, seq, send_time = protocol.unpack_data_frame(
+                        frames[0].buffer, frames[1].buffer
+                    )
+                except protocol.ProtocolError:
+                    tab.discarded += 1
+                    return
+                tab.note_seq(seq)
+                if send_time is not None:
+                    tab.network.append((time.time() - send_time) * 1000.0)
+            if tab.pending or tab.waiting:
+                if len(tab.pending) >= MAX_PENDING:
+                    tab.pending.popleft()
+                    tab.discarded += 1
+                tab.pending.append(arr)
+            elif not self.store(tab, arr):
+                tab.pending.append(arr)
+        elif category == SAVE_PLOT:
+            sock.recv()
+        elif category == RECEIVED_DISPLAY:
+            self.send(tab, "display", sock.recv())
+        elif category == RECEIVED_TEXT_INPUT:
+            self.send(tab, "text", sock.recv())
+        # Drain anything else in the message so the next starts clean.
+        while sock.getsockopt(zmq.RCVMORE):
+            sock.recv()
+
+    def store(self, tab, arr):
+        """Write ``arr`` into the ring, as ``ingest_samples`` would.
+
+        Returns False if it has to wait: for a ring from main (which
+        this asks for), or for main to read what is already there.
+        """
+        if not tab.initialized:
+            tab.discarded += 1
+            return True
+        wire = np.dtype(arr.dtype)
+        if tab.native:
+            want = wire if wire in protocol.DTYPE_CODES else np.dtype(np.float64)
+        else:
+            want = None
+        ring = tab.ring
+        if ring is None or (want is not None and ring.data.dtype != want):
+            tab.waiting = True
+            self.send(tab, "ring?", {"dtype": wire.str})
+            return False
+        # Half the ring stays behind main's tail, so the history main
+        # reads for viewers isn't overwritten under it.
+        if ring.head - ring.tail > ring.capacity // 2:
+            return False
+        if ring.data.dtype.kind == "f":
+            arr = protocol.dequantize(arr, tab.scaling)
+        ring.write(arr)
+        tab.written = True
+        return True
+
+    def flush(self, tab):
+        """Store held frames, in order, until one has to wait again."""
+        while tab.pending and not tab.waiting:
+            if not self.store(tab, tab.pending[0]):
+                break
+            tab.pending.popleft()
+
+    def report(self, tab):
+        if tab.written or tab.frames or tab.discarded:
+            self.send(tab, "data", {
+                "frames": tab.frames,
+                "gaps": tab.gaps,
+                "discarded": tab.discarded,
+                "network": tab.network,
+            })
+            tab.frames = tab.gaps = tab.discarded = 0
+            tab.written = False
+            tab.network = []
+
+    def run(self, commands, parent=None):
+        self.poller.register(commands, zmq.POLLIN)
+        while True:
+            full = [tab for tab in self.tabs.values() if tab.full]
+            ready = dict(self.poller.poll(FULL_POLL_MS if full else 1000))
+            if parent is not None and os.getppid() != parent:
+                return      # main died without sending "exit"
+            if commands in ready:
+                while commands.poll(0):
+                    tab_id, kind, body = commands.recv_multipart()
+                    tab_id = tab_id.decode("utf-8")
+                    msg = json.loads(body)
+                    kind = kind.decode("ascii")
+                    if kind == "exit":
+                        return
+                    if kind == "open":
+                        self.open(tab_id, msg)
+                    elif kind == "close":
+                        self.close(tab_id)
+                    elif kind == "ring":
+                        self.set_ring(tab_id, msg)
+            for tab in full:
+                if tab.id in self.tabs:
+                    self.flush(tab)
+            for tab in list(self.tabs.values()):
+                if tab.sock in ready:
+                    for _ in range(MAX_DRAIN):
+                        if tab.full or not tab.sock.poll(0):
+                            break
+                        self.receive(tab)
+                self.report(tab)
+                # A full tab's socket is left unread (and unpolled, or
+                # it would wake us constantly) until main catches up.
+                if tab.full == tab.polled:
+                    if tab.polled:
+                        self.poller.unregister(tab.sock)
+                    else:
+                        self.poller.register(tab.sock, zmq.POLLIN)
+                    tab.polled = not tab.polled
+
+
+def worker_main(events_endpoint, index, parent=None):
+    """Entry point of worker ``index``, run by the server as
+    ``python -m rtplot.shard EVENTS INDEX PARENT_PID``."""
+    ctx = zmq.Context()
+    events = ctx.socket(zmq.PUSH)
+    events.setsockopt(zmq.LINGER, 0)
+    events.connect(events_endpoint)
+    commands = ctx.socket(zmq.PULL)
+    commands.setsockopt(zmq.LINGER, 0)
+    port = commands.bind_to_random_port("tcp://127.0.0.1")
+    worker = _Worker(ctx, events)
+    events.send_multipart(pack("", "ready", {
+        "index": int(index), "commands": f"tcp://127.0.0.1:{port}",
+    }))
+    try:
+        worker.run(commands, None if parent is None else int(parent))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for tab_id in list(worker.tabs):
+            worker.close(tab_id)
+        events.close(0)
+        commands.close(0)
+        ctx.term()
+
+
+if __name__ == "__main__":
+    worker_main(*sys.argv[1:])
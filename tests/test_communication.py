@@ -16,10 +16,13 @@ Or with pytest:
 from __future__ import annotations
 
 import asyncio
+import base64
+import io
 import json
 import os
 import shutil
 import socket
+import struct
 import subprocess
 import sys
 import tempfile
@@ -75,9 +78,11 @@ def _kill_listeners_on(port: int):
 class ServerProcess:
     """Starts and stops the rtplot browser server as a subprocess."""
 
-    def __init__(self, *, password: str | None = None, tabs_file: str | None = None):
+    def __init__(self, *, password: str | None = None, tabs_file: str | None = None,
+                 extra_args: list | None = None):
         self.password = password
         self.tabs_file = tabs_file
+        self.extra_args = list(extra_args or [])
         self.proc: subprocess.Popen | None = None
         self.log_file = tempfile.NamedTemporaryFile(
             prefix="rtplot-test-", suffix=".log", delete=False
@@ -114,7 +119,7 @@ class ServerProcess:
 
         self.proc = subprocess.Popen(
             [sys.executable, "-m", "rtplot.server_browser", "--no-browser",
-             "--port", str(HTTP_PORT)],
+             "--port", str(HTTP_PORT), *self.extra_args],
             stdout=self.log_file,
             stderr=subprocess.STDOUT,
             cwd=REPO_ROOT,
@@ -182,6 +187,12 @@ class ZmqTestClient:
         self.pub.send_json(md, flags=zmq.SNDMORE)
         self.pub.send(arr.tobytes())
 
+    def send_packed_data(self, arr: np.ndarray, seq: int = 0):
+        """Protocol-2 data frame: category, packed header, raw payload."""
+        arr = np.ascontiguousarray(arr, dtype=np.float32)
+        header = struct.pack("<BBBxIIQ", 2, 1, 0, arr.shape[0], arr.shape[1], seq)
+        self.pub.send_multipart([b"6", header, arr.tobytes()])
+
     def send_display(self, did: str, value):
         self.pub.send_string("4", flags=zmq.SNDMORE)
         self.pub.send_json({"id": did, "value": value})
@@ -1656,5 +1667,1543 @@ print(f"EVT:DONE:{{time.monotonic() - t0:.3f}}", flush=True)
             p.terminate(); p.wait(timeout=2)
 
 
+class TestLazyClientImport(_ServerTest):
+    """Importing rtplot.client must not bind ports or sleep."""
+
+    def test_import_has_no_sockets_and_local_plot_is_fast(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+t0 = time.monotonic()
+from rtplot import client
+import_s = time.monotonic() - t0
+no_socket = client.socket is None
+t0 = time.monotonic()
+client.local_plot()
+print(f"EVT:DONE:{{no_socket}}:{{import_s:.3f}}:{{time.monotonic() - t0:.3f}}", flush=True)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:DONE:" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never finished local_plot()")
+            _, _, no_socket, import_s, connect_s = line.strip().split(":")
+            self.assertEqual(no_socket, "True")
+            self.assertLess(float(import_s), 1.0)
+            # The server is already listening, so the monitor sees the
+            # connection well before the old fixed 1 s sleep.
+            self.assertLess(float(connect_s), 0.9)
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestDefaultClientFacade(unittest.TestCase):
+    """Old module globals read and write through to the default client."""
+
+    def test_module_attribute_assignment_reaches_default_client(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot import client
+
+        default = client.get_default_client()
+        saved = default.plot_desc_dict
+        try:
+            cfg = OrderedDict([("plot0", {"names": ["a", "b"]})])
+            client.plot_desc_dict = cfg
+            self.assertIs(default.plot_desc_dict, cfg)
+            self.assertIs(client.plot_desc_dict, cfg)
+            self.assertNotIn("plot_desc_dict", vars(client))
+            # num_traces now comes from the assigned config.
+            self.assertEqual(client.Stream().num_traces, 2)
+        finally:
+            default.plot_desc_dict = saved
+
+
+def _decode_frame(buf):
+    """Split a browser binary frame into (msg_type, (traces, samples) array)."""
+    msg_type, _status, _reserved, num_traces, num_samples, _fps = struct.unpack_from(
+        "<BBBxIIf", buf
+    )
+    data = np.frombuffer(buf, dtype=np.float32, offset=16, count=num_traces * num_samples)
+    return msg_type, data.reshape(num_traces, num_samples)
+
+
+class TestPackedDataProtocol(_ServerTest):
+    """Protocol 2: one multipart message per batch with a packed header."""
+
+    def test_config_ack_advertises_packed_protocol(self):
+        zc = ZmqTestClient()
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["x"]})]))
+            ack = None
+            deadline = time.time() + 3.0
+            while time.time() < deadline and ack is None:
+                ev = zc.poll_one(timeout=0.5)
+                if ev is not None and ev.get("type") == "config_ack":
+                    ack = ev
+            self.assertIsNotNone(ack, "no config_ack")
+            self.assertGreaterEqual(ack.get("protocol", 1), 2)
+        finally:
+            zc.close()
+
+    def test_packed_frames_reach_browser_unchanged(self):
+        zc = ZmqTestClient()
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b"], "xrange": 50})]))
+            time.sleep(0.3)
+            sent = np.vstack([np.arange(50), -np.arange(50)]).astype(np.float32)
+            zc.send_packed_data(sent[:, :20], seq=0)
+            zc.send_packed_data(sent[:, 20:], seq=1)
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            msg_type, data = _decode_frame(frame)
+            self.assertEqual(msg_type, 0)
+            np.testing.assert_array_equal(data, sent)
+        finally:
+            zc.close()
+
+    def test_real_client_negotiates_packed_protocol(self):
+        code = f"""
+import sys
+sys.path.insert(0, {REPO_ROOT!r})
+from rtplot import client
+client.local_plot()
+client.initialize_plots({{"names": ["sig"], "title": "PACKED"}})
+print(f"EVT:PROTO:{{client._wire_protocol}}", flush=True)
+for i in range(20):
+    client.send_array(float(i))
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:PROTO:" in l, timeout=6.0)
+            self.assertIsNotNone(line, "real client never finished initialize_plots()")
+            self.assertEqual(int(line.strip().rsplit(":", 1)[1]), 3)
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestClientStream(_ServerTest):
+    """client.Stream batches per-tick samples into (traces, N) sends."""
+
+    def test_stream_batches_reach_browser_in_order(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+from rtplot import client
+client.local_plot()
+client.initialize_plots({{"names": ["a", "b"], "title": "STREAM", "xrange": 100}})
+with client.Stream(batch_size=16, max_latency=None) as stream:
+    for i in range(100):
+        stream.append([i, -i])
+    print(f"EVT:PENDING:{{stream.pending}}", flush=True)
+print("EVT:SENT", flush=True)
+time.sleep(5)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:PENDING:" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never finished streaming")
+            # 100 = 6 full batches of 16 + 4 pending until the with-block flushes.
+            self.assertEqual(int(line.strip().rsplit(":", 1)[1]), 4)
+            time.sleep(0.5)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            _msg_type, data = _decode_frame(frame)
+            np.testing.assert_array_equal(data[0], np.arange(100))
+            np.testing.assert_array_equal(data[1], -np.arange(100))
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestBackgroundSender(_ServerTest):
+    """enable_background_sender() moves sends onto an I/O thread."""
+
+    def test_background_sends_reach_browser_in_order(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+import numpy as np
+from rtplot import client
+client.local_plot()
+client.enable_background_sender(queue_size=8, overflow="block")
+client.initialize_plots({{"names": ["a"], "title": "BG", "xrange": 100}})
+buf = np.zeros((1, 10))
+for i in range(10):
+    buf[:] = np.arange(i * 10, i * 10 + 10)
+    client.send_array(buf)   # buffer reused immediately: must be copied
+client.disable_background_sender()
+stats = client.sender_stats()
+print(f"EVT:DONE:{{stats}}", flush=True)
+time.sleep(5)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:DONE:" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never finished sending")
+            self.assertIn("EVT:DONE:None", line)
+            time.sleep(0.5)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            _msg_type, data = _decode_frame(frame)
+            np.testing.assert_array_equal(data[0], np.arange(100))
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+    def test_drop_newest_counts_overflow(self):
+        code = f"""
+import sys
+sys.path.insert(0, {REPO_ROOT!r})
+from rtplot import client
+client.enable_background_sender(queue_size=2, overflow="drop_newest")
+# Park the I/O thread so nothing drains while we fill the queue.
+sender = client._sender
+sender.stop(1.0)
+for i in range(5):
+    client.send_array(float(i))
+print(f"EVT:STATS:{{client.sender_stats().dropped}}", flush=True)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:STATS:" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never reported stats")
+            self.assertEqual(int(line.strip().rsplit(":", 1)[1]), 3)
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestBackgroundSenderOrder(unittest.TestCase):
+    """Queued data and config messages leave the I/O thread in call order."""
+
+    DATA_PORT = 15580
+
+    def test_data_queued_before_reconfig_goes_first(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot import client
+
+        c = client.RTPlotClient()
+        c.configure_port(self.DATA_PORT)
+        sub = zmq.Context.instance().socket(zmq.SUB)
+        sub.setsockopt(zmq.SUBSCRIBE, b"")
+        sub.setsockopt(zmq.RCVTIMEO, 2000)
+        sub.connect(f"tcp://127.0.0.1:{self.DATA_PORT}")
+        try:
+            time.sleep(0.3)   # PUB/SUB slow joiner
+            c.enable_background_sender(queue_size=4, overflow="block")
+            c.initialize_plots(["a"], handshake_timeout=0)
+            for i in range(3):
+                c.send_array(np.full((1, 5), float(i)))
+            c.initialize_plots(["b"], handshake_timeout=0)
+            c.disable_background_sender()
+            # Legacy framing: each category string is its own message.
+            sub.setsockopt(zmq.RCVTIMEO, 500)
+            kinds = []
+            while True:
+                try:
+                    frames = sub.recv_multipart()
+                except zmq.Again:
+                    break
+                if frames[0] in (b"0", b"1"):
+                    kinds.append(frames[0].decode())
+        finally:
+            sub.close(0)
+            c.close()
+        plot, data = client.SENDING_PLOT_UPDATE, client.SENDING_DATA
+        self.assertEqual(kinds, [plot, data, data, data, plot])
+
+
+class TestMultipleClientInstances(_ServerTest):
+    """Two RTPlotClient instances in one process feed two tabs."""
+
+    LEG_DATA_PORT = 15570
+
+    def test_two_instances_reach_their_own_tabs(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+import numpy as np
+from rtplot import client
+arm = client.RTPlotClient("127.0.0.1:5555")
+leg = client.RTPlotClient()
+leg.configure_port({self.LEG_DATA_PORT})
+print("EVT:READY", flush=True)
+arm.initialize_plots({{"names": ["arm"], "title": "ARM", "xrange": 10}})
+leg.initialize_plots({{"names": ["leg"], "title": "LEG", "xrange": 10}}, handshake_timeout=8)
+assert arm.socket.context is leg.socket.context
+arm.send_array(np.full((1, 10), 1.0))
+leg.send_array(np.full((1, 10), 2.0))
+print("EVT:SENT", flush=True)
+time.sleep(8)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:READY" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never bound the second instance")
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({
+                            "type": "tab_create",
+                            "name": "Leg",
+                            "endpoint": f"127.0.0.1:{self.LEG_DATA_PORT}",
+                        }))
+                        listing = await _drain_until(
+                            ws,
+                            lambda d: isinstance(d, dict) and d.get("type") == "tabs"
+                                      and any(t["name"] == "Leg" for t in d["tabs"]),
+                        )
+                        leg_id = next(t["id"] for t in listing["tabs"] if t["name"] == "Leg")
+                    await asyncio.sleep(3.0)
+                    frames = {}
+                    for tab_id in ("bind_me", leg_id):
+                        # Fresh socket per tab so no frame from the other
+                        # subscription can be mistaken for this one.
+                        async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                            await ws.send_str(json.dumps({"type": "tab_subscribe", "id": tab_id}))
+                            frames[tab_id] = await _drain_until(
+                                ws, lambda d: isinstance(d, (bytes, bytearray))
+                            )
+                    return frames["bind_me"], frames[leg_id]
+            arm_frame, leg_frame = self.run_async(go(), timeout=15)
+            self.assertIsNotNone(arm_frame, "no frame on the first instance's tab")
+            self.assertIsNotNone(leg_frame, "no frame on the second instance's tab")
+            np.testing.assert_array_equal(_decode_frame(arm_frame)[1], np.full((1, 10), 1.0))
+            np.testing.assert_array_equal(_decode_frame(leg_frame)[1], np.full((1, 10), 2.0))
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestCompactWireDtypes(_ServerTest):
+    """wire_dtype int16 quantizes per trace and the server dequantizes."""
+
+    def test_int16_round_trip_in_physical_units(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+import numpy as np
+from rtplot import client
+client.local_plot()
+client.initialize_plots(
+    client.Plot(names=["a", "b"], xrange=5, scale=[0.01, 2.0], offset=[1.0, 0.0]),
+    wire_dtype="int16",
+)
+client.send_array(np.array([[1.0, 1.5, 0.25, -2.0, 1e6],
+                            [0.0, 2.0, 4.0, -6.0, 3.0]]))
+print("EVT:SENT", flush=True)
+time.sleep(5)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:SENT" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never sent")
+            time.sleep(0.5)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            _msg_type, data = _decode_frame(frame)
+            # 1e6 is clipped to the int16 maximum; 3.0 rounds to 2 * 2.0.
+            np.testing.assert_allclose(
+                data[0], [1.0, 1.5, 0.25, -2.0, 32767 * 0.01 + 1.0], rtol=1e-6
+            )
+            np.testing.assert_allclose(data[1], [0.0, 2.0, 4.0, -6.0, 4.0])
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestPayloadCompression(_ServerTest):
+    """compression="zlib" sends filtered + compressed packed frames."""
+
+    def test_ack_lists_codecs_and_compressed_frames_decode(self):
+        zc = ZmqTestClient()
+        try:
+            cfg = OrderedDict([("p0", {"names": ["x", "y"], "xrange": 200})])
+            zc.send_config(cfg)
+            ack = None
+            deadline = time.time() + 3.0
+            while time.time() < deadline and ack is None:
+                ev = zc.poll_one(timeout=0.5)
+                if ev is not None and ev.get("type") == "config_ack":
+                    ack = ev
+            self.assertIsNotNone(ack, "no config_ack")
+            self.assertIn("zlib", ack.get("codecs", []))
+
+            from rtplot import protocol
+            arr = protocol.as_wire_array(
+                np.vstack([np.arange(200, dtype=np.int32), np.zeros(200, dtype=np.int32)])
+            )
+            flags, payload = protocol.encode_payload(arr, "zlib")
+            self.assertNotEqual(flags, 0)
+            self.assertLess(len(payload), arr.nbytes)
+            zc.pub.send_multipart([
+                protocol.SENDING_PACKED_DATA.encode(),
+                protocol.pack_data_header(arr, 0, flags),
+                payload,
+            ])
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            _msg_type, data = _decode_frame(frame)
+            np.testing.assert_array_equal(data, arr)
+        finally:
+            zc.close()
+
+    def test_oversized_payload_is_refused(self):
+        from rtplot import protocol
+
+        arr = protocol.as_wire_array(np.arange(20, dtype=np.int32).reshape(2, 10))
+        # 64 MB of zeros behind a header that promises 80 bytes.
+        bomb = bytes(64 << 20)
+        for name in protocol.available_codecs():
+            codec = protocol.CODEC_NAMES[name]
+            flags, payload = protocol.encode_payload(arr, name)
+            header = protocol.pack_data_header(arr, 0, flags)
+            np.testing.assert_array_equal(protocol.unpack_data_frame(header, payload)[0], arr)
+            packed = protocol._compress(codec, bomb, None)
+            # Decompression stops just past the promised size.
+            out = protocol._decompress(codec, packed, arr.nbytes)
+            self.assertLessEqual(len(out), arr.nbytes + 1)
+            header = protocol.pack_data_header(arr, 0, codec)
+            with self.assertRaises(protocol.ProtocolError, msg=name):
+                protocol.unpack_data_frame(header, packed)
+
+    def test_real_client_negotiates_codec(self):
+        code = f"""
+import sys
+sys.path.insert(0, {REPO_ROOT!r})
+from rtplot import client
+client.local_plot()
+client.initialize_plots(["a"], compression="auto")
+print(f"EVT:CODEC:{{client.get_default_client()._codec}}", flush=True)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:CODEC:" in l, timeout=6.0)
+            self.assertIsNotNone(line, "client never finished initialize_plots()")
+            self.assertNotEqual(line.strip().rsplit(":", 1)[1], "None")
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestStreamDecimation(_ServerTest):
+    """Stream(decimate=k) sends min/max pairs and declares the rate."""
+
+    def test_decimated_stream_declares_effective_rate(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+import numpy as np
+from rtplot import client
+client.local_plot()
+# Declared before initialize_plots(), so the config goes out once.
+stream = client.Stream(num_traces=1, batch_size=100, max_latency=None,
+                       decimate=10, sample_rate=1000)
+client.initialize_plots({{"names": ["a"], "title": "DEC", "xrange": 20}})
+with stream:
+    stream.extend(np.sin(np.arange(100) * 0.3).reshape(1, -1))
+# Re-declaring the same rate afterwards doesn't re-send the config.
+client.Stream(num_traces=1, decimate=10, sample_rate=1000)
+print(f"EVT:RATE:{{stream.effective_sample_rate}}", flush=True)
+time.sleep(5)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:RATE:" in l, timeout=8.0)
+            self.assertIsNotNone(line, "client never finished streaming")
+            self.assertEqual(float(line.strip().rsplit(":", 1)[1]), 200.0)
+            time.sleep(0.5)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        cfg = await _drain_until(
+                            ws, lambda d: isinstance(d, dict) and d.get("type") == "config"
+                        )
+                        frame = await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+                        return cfg, frame
+            cfg, frame = self.run_async(go())
+            self.assertIsNotNone(cfg, "no config message")
+            self.assertEqual(cfg["plots"][0]["sample_rate"], 200.0)
+            self.assertIsNotNone(frame, "no snapshot frame")
+            _msg_type, data = _decode_frame(frame)
+            raw = np.sin(np.arange(100) * 0.3).reshape(10, 10)
+            self.assertEqual(data.shape, (1, 20))
+            np.testing.assert_allclose(np.sort(data[0].reshape(10, 2), axis=1),
+                                       np.stack([raw.min(1), raw.max(1)], axis=1),
+                                       rtol=1e-6)
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestLatencyInstrumentation(_ServerTest):
+    """Protocol 3 send times feed per-stage percentiles on /api/latency."""
+
+    def test_stage_percentiles_reported(self):
+        code = f"""
+import sys, time
+sys.path.insert(0, {REPO_ROOT!r})
+from rtplot import client
+client.local_plot()
+client.initialize_plots({{"names": ["sig"], "title": "LAT"}})
+print("EVT:READY", flush=True)
+for i in range(200):
+    client.send_array(float(i))
+    time.sleep(0.005)
+time.sleep(5)
+"""
+        p = subprocess.Popen(
+            [sys.executable, "-u", "-c", code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+        )
+        try:
+            line = _drain_client_lines(p, lambda l: "EVT:READY" in l, timeout=6.0)
+            self.assertIsNotNone(line, "real client never finished initialize_plots()")
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        await asyncio.sleep(0.5)
+                        await ws.send_str(json.dumps({
+                            "type": "latency_report", "tab": "bind_me",
+                            # json.dumps writes inf as Infinity, which the server parses.
+                            "render_ms": [1.0, 2.0, 3.0, "bad", -1, True, float("inf")],
+                        }))
+                        await asyncio.sleep(0.3)
+                    async with s.get(f"http://localhost:{HTTP_PORT}/api/latency") as r:
+                        return await r.json()
+            body = self.run_async(go())
+            self.assertEqual(body["stages"], ["network", "queue", "render"])
+            lat = body["tabs"]["bind_me"]
+            self.assertGreater(lat["network"]["count"], 0)
+            self.assertGreaterEqual(lat["network"]["p50"], 0.0)
+            self.assertLess(lat["network"]["p99"], 1000.0)
+            self.assertGreater(lat["queue"]["count"], 0)
+            self.assertLessEqual(lat["queue"]["p50"], lat["queue"]["p99"])
+            self.assertEqual(lat["render"]["count"], 3)
+            self.assertAlmostEqual(lat["render"]["p50"], 2.0)
+        finally:
+            p.terminate(); p.wait(timeout=2)
+
+
+class TestDropAccounting(_ServerTest):
+    """Per-tab received / gap / discarded counters from sequence numbers."""
+
+    def test_gaps_and_discards_are_counted(self):
+        zc = ZmqTestClient()
+        try:
+            # No config yet: received but discarded.
+            zc.send_packed_data(np.zeros((1, 5)), seq=0)
+            time.sleep(0.3)
+            zc.send_config(OrderedDict([("p0", {"names": ["x"]})]))
+            time.sleep(0.3)
+            for seq in (1, 2, 5):   # 3 and 4 never arrive
+                zc.send_packed_data(np.zeros((1, 5)), seq=seq)
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        tabs_msg = await _drain_until(
+                            ws, lambda d: isinstance(d, dict) and d.get("type") == "tabs"
+                        )
+                        res = await _drain_until(
+                            ws,
+                            lambda d: isinstance(d, dict) and d.get("type") == "resources",
+                            timeout=4.0,
+                        )
+                        return tabs_msg, res
+            tabs_msg, res = self.run_async(go(), timeout=10)
+            self.assertIsNotNone(tabs_msg, "no tabs message")
+            bind_me = next(t for t in tabs_msg["tabs"] if t["id"] == "bind_me")
+            expected = {"received": 4, "gaps": 2, "discarded": 1}
+            self.assertEqual(bind_me["frames"], expected)
+            self.assertIsNotNone(res, "no resources broadcast within 4 s")
+            self.assertEqual(res["frames"]["bind_me"], expected)
+        finally:
+            zc.close()
+
+
+class TestHistoryRingBuffer(_ServerTest):
+    """--history bounds the per-tab buffer; it wraps instead of running out."""
+
+    SERVER_KWARGS = {"extra_args": ["--history", "64"]}
+
+    def test_snapshot_correct_after_wrap(self):
+        zc = ZmqTestClient()
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b"], "xrange": 50})]))
+            time.sleep(0.3)
+            sent = np.vstack([np.arange(300), -np.arange(300)]).astype(np.float32)
+            for seq, lo in enumerate(range(0, 300, 30)):
+                zc.send_packed_data(sent[:, lo:lo + 30], seq=seq)
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            msg_type, data = _decode_frame(frame)
+            self.assertEqual(msg_type, 0)
+            np.testing.assert_array_equal(data, sent[:, -50:])
+        finally:
+            zc.close()
+
+
+class TestDataMessageLayout(_ServerTest):
+    """Snapshot/delta frames built straight from a wrapped float64 ring."""
+
+    SERVER_KWARGS = {"extra_args": ["--history", "64", "--storage-dtype", "float64"]}
+
+    def test_frames_match_ring_after_wrap(self):
+        zc = ZmqTestClient()
+        rng = np.random.default_rng(13)
+        # float64 values float32 can't hold exactly, so the copy has to convert.
+        sent = rng.standard_normal((3, 330)) / 3.0
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b", "c"], "xrange": 50})]))
+            time.sleep(0.3)
+
+            def send(seq, block):
+                header = struct.pack("<BBBxIIQ", 2, 0, 0, block.shape[0], block.shape[1], seq)
+                zc.pub.send_multipart([b"6", header, np.ascontiguousarray(block).tobytes()])
+
+            for seq, lo in enumerate(range(0, 300, 30)):
+                send(seq, sent[:, lo:lo + 30])
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        snap = await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        send(10, sent[:, 300:])
+                        delta = await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        return snap, delta
+            snap, delta = self.run_async(go())
+            self.assertIsNotNone(snap, "no snapshot frame")
+            self.assertIsNotNone(delta, "no delta frame")
+
+            for frame, msg, expected in (
+                (snap, 0, sent[:, 250:300]),     # the window, read across the wrap
+                (delta, 1, sent[:, 300:]),
+            ):
+                msg_type, status, reserved, traces, n, _fps = struct.unpack_from("<BBBxIIf", frame)
+                self.assertEqual((msg_type, status, reserved), (msg, 0, 0))
+                self.assertEqual((traces, n), expected.shape)
+                self.assertEqual(len(frame), 16 + 4 * traces * n)
+                _, data = _decode_frame(frame)
+                np.testing.assert_array_equal(data, expected.astype(np.float32))
+        finally:
+            zc.close()
+
+
+class TestNativeStorageDtype(_ServerTest):
+    """--storage-dtype native keeps int16 counts and scales them on read."""
+
+    SERVER_KWARGS = {"extra_args": ["--storage-dtype", "native"]}
+
+    def test_int16_counts_reach_browser_scaled(self):
+        zc = ZmqTestClient()
+        try:
+            zc.send_config(OrderedDict([
+                ("p0", {"names": ["a", "b"], "xrange": 40,
+                        "scale": [0.5, 0.01], "offset": [1.0, 0.0]}),
+            ]))
+            time.sleep(0.3)
+            counts = np.vstack([np.arange(40), -np.arange(40)]).astype(np.int16)
+            header = struct.pack("<BBBxIIQ", 2, 2, 0, 2, 40, 0)
+            zc.pub.send_multipart([b"6", header, counts.tobytes()])
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray))
+                        )
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no snapshot frame")
+            _msg_type, data = _decode_frame(frame)
+            expected = counts * np.array([[0.5], [0.01]]) + np.array([[1.0], [0.0]])
+            np.testing.assert_allclose(data, expected, rtol=1e-6)
+        finally:
+            zc.close()
+
+
+class TestEventDrivenPusher(_ServerTest):
+    """Data pushes are triggered by ingest, not by a 1 kHz poll."""
+
+    def test_idle_viewer_costs_almost_no_cpu(self):
+        try:
+            import psutil
+        except ImportError:
+            self.skipTest("psutil not installed")
+        proc = psutil.Process(self.server.proc.pid)
+
+        async def go():
+            async with aiohttp.ClientSession() as s:
+                async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                    await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                    await asyncio.sleep(0.5)
+                    t0 = proc.cpu_times()
+                    await asyncio.sleep(2.0)
+                    t1 = proc.cpu_times()
+                    return (t1.user + t1.system) - (t0.user + t0.system)
+        cpu = self.run_async(go())
+        # The old sleep-poll loop burned ~0.15 s of CPU per 2 s here.
+        self.assertLess(cpu, 0.1)
+
+    def test_single_frame_is_pushed_promptly(self):
+        zc = ZmqTestClient()
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["x"], "xrange": 10})]))
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        await asyncio.sleep(0.3)
+                        zc.send_packed_data(np.full((1, 3), 7.0), seq=0)
+                        sent = time.perf_counter()
+                        frame = await _drain_until(
+                            ws, lambda d: isinstance(d, (bytes, bytearray)), timeout=2.0
+                        )
+                        return frame, time.perf_counter() - sent
+            frame, elapsed = self.run_async(go())
+            self.assertIsNotNone(frame, "no delta frame")
+            msg_type, data = _decode_frame(frame)
+            self.assertEqual(msg_type, 1)
+            np.testing.assert_array_equal(data, np.full((1, 3), 7.0, dtype=np.float32))
+            self.assertLess(elapsed, 0.5)
+        finally:
+            zc.close()
+
+
+class TestSlowViewerIsolation(_ServerTest):
+    """A viewer that stops reading must not hold up the others."""
+
+    def test_stalled_viewer_does_not_block_fast_viewer(self):
+        zc = ZmqTestClient()
+        traces, n, batches = 32, 1000, 200
+        last = float(batches - 1)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": [f"t{i}" for i in range(traces)],
+                                                "xrange": n})]))
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    slow = await s.ws_connect(f"http://localhost:{HTTP_PORT}/ws")
+                    await slow.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as fast:
+                        await fast.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        await _drain_until(fast, lambda d: isinstance(d, (bytes, bytearray)))
+                        await asyncio.sleep(0.3)
+                        # ~25 MB of deltas, far more than the socket
+                        # buffers of a browser that isn't reading.
+                        for seq in range(batches):
+                            zc.send_packed_data(np.full((traces, n), float(seq)), seq=seq)
+                            await asyncio.sleep(0.002)
+                        fast_frame = await _drain_until(
+                            fast,
+                            lambda d: isinstance(d, (bytes, bytearray))
+                                      and _decode_frame(d)[1][0, -1] == last,
+                            timeout=5.0,
+                        )
+                    # Now let the stalled viewer catch up: its backlog was
+                    # collapsed, so it sees far fewer frames than were sent.
+                    frames = []
+                    async def slow_reader():
+                        async for msg in slow:
+                            if msg.type == aiohttp.WSMsgType.BINARY:
+                                frames.append(_decode_frame(msg.data))
+                                if frames[-1][1][0, -1] == last:
+                                    return
+                    await asyncio.wait_for(slow_reader(), timeout=10.0)
+                    await slow.close()
+                    return fast_frame, frames
+            fast_frame, slow_frames = self.run_async(go(), timeout=30.0)
+            self.assertIsNotNone(fast_frame, "fast viewer was held up by the stalled one")
+            self.assertLess(len(slow_frames), batches)
+            self.assertIn(0, [msg_type for msg_type, _ in slow_frames[1:]],
+                          "stalled viewer's backlog was not collapsed to a snapshot")
+            np.testing.assert_array_equal(slow_frames[-1][1][:, -1], last)
+        finally:
+            zc.close()
+
+
+class TestViewerBudget(_ServerTest):
+    """tab_subscribe max_fps makes the server coalesce deltas per viewer."""
+
+    def test_budgeted_viewer_gets_fewer_complete_frames(self):
+        zc = ZmqTestClient()
+        xrange_ = 500
+        sent = np.arange(1000, dtype=np.float32).reshape(1, -1)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["x"], "xrange": xrange_})]))
+            time.sleep(0.3)
+
+            async def collect(ws, frames, stop):
+                while not stop.is_set():
+                    try:
+                        msg = await asyncio.wait_for(ws.receive(), timeout=0.1)
+                    except asyncio.TimeoutError:
+                        continue
+                    if msg.type == aiohttp.WSMsgType.BINARY:
+                        frames.append(_decode_frame(msg.data))
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as full, \
+                               s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as slow:
+                        await full.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        await slow.send_str(json.dumps({
+                            "type": "tab_subscribe", "id": "bind_me", "max_fps": 4,
+                        }))
+                        await asyncio.sleep(0.5)
+                        stop = asyncio.Event()
+                        full_frames, slow_frames = [], []
+                        tasks = [asyncio.create_task(collect(full, full_frames, stop)),
+                                 asyncio.create_task(collect(slow, slow_frames, stop))]
+                        for seq in range(100):
+                            zc.send_packed_data(sent[:, seq * 10:(seq + 1) * 10], seq=seq)
+                            await asyncio.sleep(0.01)
+                        await asyncio.sleep(0.8)
+                        stop.set()
+                        await asyncio.gather(*tasks)
+                        return full_frames, slow_frames
+            full_frames, slow_frames = self.run_async(go())
+
+            def replay(frames):
+                window = np.zeros(xrange_, dtype=np.float32)
+                for msg_type, data in frames:
+                    if msg_type == 0:
+                        window = data[0, -xrange_:].copy()
+                    else:
+                        window = np.concatenate([window, data[0]])[-xrange_:]
+                return window
+
+            self.assertGreater(len(full_frames), 20)
+            self.assertLess(len(slow_frames), 10)
+            np.testing.assert_array_equal(replay(full_frames), sent[0, -xrange_:])
+            np.testing.assert_array_equal(replay(slow_frames), sent[0, -xrange_:])
+        finally:
+            zc.close()
+
+
+class TestEnvelopeFrames(_ServerTest):
+    """Wide windows go to pixel-reporting viewers as M4 envelopes."""
+
+    def test_envelope_matches_m4_of_window(self):
+        zc = ZmqTestClient()
+        xrange_, width = 4000, 100          # 40 samples per column
+        rng = np.random.default_rng(3)
+        sent = rng.standard_normal((2, 6000)).astype(np.float32)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b"], "xrange": xrange_})]))
+            time.sleep(0.3)
+            zc.send_packed_data(sent[:, :5000], seq=0)
+            time.sleep(0.3)
+
+            def decode(buf):
+                msg_type, _s, _r, traces, points, _fps = struct.unpack_from("<BBBxIIf", buf)
+                self.assertEqual(msg_type, 2)
+                bin_size, num_bins, first_bin, head = struct.unpack_from("<IIQQ", buf, 16)
+                data = np.frombuffer(buf, dtype=np.float32, offset=40, count=traces * points)
+                self.assertEqual(points, 4 * num_bins)
+                return bin_size, first_bin, head, data.reshape(traces, num_bins, 4)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({
+                            "type": "tab_subscribe", "id": "bind_me", "pixel_width": width,
+                        }))
+                        first = await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        zc.send_packed_data(sent[:, 5000:5010], seq=1)
+                        second = await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        return first, second
+            first, second = self.run_async(go())
+            self.assertIsNotNone(first, "no envelope snapshot")
+            self.assertIsNotNone(second, "no envelope delta")
+
+            # Buffer positions start at xrange (a window of zeros).
+            stream = np.hstack([np.zeros((2, xrange_), np.float32), sent[:, :5010]])
+
+            def m4(first_bin, head, bin_size):
+                starts = np.arange(first_bin, (head - 1) // bin_size + 1) * bin_size
+                out = []
+                for lo in starts:
+                    seg = stream[:, lo:min(lo + bin_size, head)]
+                    out.append(np.stack([seg[:, 0], seg.min(1), seg.max(1), seg[:, -1]], axis=1))
+                return np.stack(out, axis=1)
+
+            bin_size, first_bin, head, env = decode(first)
+            self.assertEqual(bin_size, 40)
+            self.assertEqual(head, xrange_ + 5000)
+            self.assertEqual(first_bin, (head - xrange_) // bin_size)
+            np.testing.assert_array_equal(env, m4(first_bin, head, bin_size))
+
+            bin_size, first_bin2, head2, env2 = decode(second)
+            self.assertEqual(head2, head + 10)
+            # Only the previously partial bin onwards is re-sent.
+            self.assertEqual(first_bin2, (head - 1) // bin_size)
+            np.testing.assert_array_equal(env2, m4(first_bin2, head2, bin_size))
+        finally:
+            zc.close()
+
+
+    def test_mixed_xranges_size_bins_for_narrowest_plot(self):
+        zc = ZmqTestClient()
+        wide, narrow, width = 8000, 2000, 50
+        rng = np.random.default_rng(4)
+        sent = rng.standard_normal((2, 10_000)).astype(np.float32)
+        try:
+            # The narrow plot comes last, so it sets the tab-wide xrange.
+            zc.send_config(OrderedDict([
+                ("p0", {"names": ["a"], "xrange": wide}),
+                ("p1", {"names": ["b"], "xrange": narrow}),
+            ]))
+            time.sleep(0.3)
+            zc.send_packed_data(sent, seq=0)
+            time.sleep(0.3)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({
+                            "type": "tab_subscribe", "id": "bind_me", "pixel_width": width,
+                        }))
+                        return await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+            frame = self.run_async(go())
+            self.assertIsNotNone(frame, "no envelope snapshot")
+            msg_type, _s, _r, traces, points, _fps = struct.unpack_from("<BBBxIIf", frame)
+            bin_size, num_bins, first_bin, head = struct.unpack_from("<IIQQ", frame, 16)
+            self.assertEqual(msg_type, 2)
+            self.assertEqual(bin_size, narrow // width)
+            self.assertEqual(head, narrow + sent.shape[1])
+            # Reaches back over the wide plot's whole window.
+            self.assertEqual(first_bin, (head - wide) // bin_size)
+            env = np.frombuffer(frame, np.float32, offset=40, count=traces * points)
+            env = env.reshape(traces, num_bins, 4)
+            lo = first_bin * bin_size - narrow
+            seg = sent[:, lo:lo + bin_size]
+            np.testing.assert_array_equal(
+                env[:, 0], np.stack([seg[:, 0], seg.min(1), seg.max(1), seg[:, -1]], axis=1)
+            )
+        finally:
+            zc.close()
+
+
+class TestInt16Frames(_ServerTest):
+    """Viewers that ask for ``wire: int16`` get quantized snapshots and deltas."""
+
+    def test_int16_snapshot_and_delta(self):
+        zc = ZmqTestClient()
+        window = 1000
+        rng = np.random.default_rng(14)
+        sent = (rng.standard_normal((3, 1050)) * [[1.0], [100.0], [0.01]]).astype(np.float32)
+        sent[0, 1020] = np.nan
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b", "c"], "xrange": window})]))
+            time.sleep(0.3)
+            zc.send_packed_data(sent[:, :1000], seq=0)
+            time.sleep(0.3)
+
+            def decode(buf):
+                msg_type, _s, _r, traces, n, _fps = struct.unpack_from("<BBBxIIf", buf)
+                scale = np.frombuffer(buf, dtype="<f4", offset=16, count=traces)
+                offset = np.frombuffer(buf, dtype="<f4", offset=16 + 4 * traces, count=traces)
+                q = np.frombuffer(buf, dtype="<i2", offset=16 + 8 * traces).reshape(traces, n)
+                values = q * scale[:, None] + offset[:, None]
+                values[q == -32768] = np.nan
+                self.assertEqual(len(buf), 16 + 8 * traces + 2 * traces * n)
+                return msg_type, values, scale
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({
+                            "type": "tab_subscribe", "id": "bind_me", "wire": "int16",
+                        }))
+                        first = await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        zc.send_packed_data(sent[:, 1000:], seq=1)
+                        second = await _drain_until(ws, lambda d: isinstance(d, (bytes, bytearray)))
+                        return first, second
+            first, second = self.run_async(go())
+            self.assertIsNotNone(first, "no snapshot")
+            self.assertIsNotNone(second, "no delta")
+
+            msg_type, values, scale = decode(first)
+            self.assertEqual(msg_type, 4)
+            expected = sent[:, :1000]
+            span = expected.max(axis=1) - expected.min(axis=1)
+            np.testing.assert_allclose(scale, span / 65534, rtol=1e-5)
+            err = np.abs(values - expected)
+            self.assertTrue(np.all(err <= scale[:, None] * 0.51 + 1e-7), err.max(axis=1))
+
+            msg_type, values, scale = decode(second)
+            self.assertEqual(msg_type, 5)
+            expected = sent[:, 1000:]
+            self.assertTrue(np.isnan(values[0, 20]))
+            finite = np.isfinite(expected)
+            err = np.abs(values - expected)[finite]
+            self.assertTrue(np.all(err <= np.broadcast_to(scale[:, None], expected.shape)[finite] * 0.51 + 1e-7))
+        finally:
+            zc.close()
+
+
+class TestHistoryPyramid(unittest.TestCase):
+    """Pyramid summaries match a brute-force min/max/mean of the samples."""
+
+    def test_query_matches_brute_force(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot.pyramid import HistoryPyramid
+
+        rng = np.random.default_rng(5)
+        origin = 200
+        data = rng.standard_normal((2, 300_000)).astype(np.float32)
+        # Small rings, so the coarse levels reach further back than the fine ones.
+        pyramid = HistoryPyramid(2, 5000, levels=4, min_bins=64)
+        pyramid.reset(head=origin)
+        i = 0
+        while i < data.shape[1]:
+            n = int(rng.integers(1, 700))
+            pyramid.write(data[:, i:i + n])
+            i += n
+        self.assertEqual(pyramid.head, origin + data.shape[1])
+
+        for lo, hi, max_points in [
+            (origin, pyramid.head, 100),        # whole session, top level
+            (250_000, pyramid.head, 37),
+            (299_000, pyramid.head, 500),       # recent, finest level
+            (1_207, 90_000, 10),                # unaligned lo, hi before head
+            (123_457, 200_001, 64),
+            (299_003, 299_900, 50),
+        ]:
+            summary = pyramid.query(lo, hi, max_points)
+            self.assertIsNotNone(summary)
+            self.assertLessEqual(summary.min.shape[1], max_points)
+            self.assertLessEqual(summary.start, lo)
+            for j in range(summary.min.shape[1]):
+                a = max(summary.start + j * summary.bin_size, origin)
+                b = min(summary.start + (j + 1) * summary.bin_size, pyramid.head)
+                seg = data[:, a - origin:b - origin]
+                np.testing.assert_array_equal(summary.min[:, j], seg.min(axis=1))
+                np.testing.assert_array_equal(summary.max[:, j], seg.max(axis=1))
+                np.testing.assert_allclose(
+                    summary.mean[:, j], seg.astype(np.float64).mean(axis=1), atol=1e-9
+                )
+
+    def test_query_without_new_writes(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot.pyramid import HistoryPyramid
+
+        # head lands on a multiple of fanout ** 2, so a second sync has nothing to read.
+        pyramid = HistoryPyramid(1, 1000)
+        pyramid.reset(200)
+        pyramid.write(np.ones((1, 312), dtype=np.float32))
+        first = pyramid.query(0, 512, 10)
+        second = pyramid.query(0, 512, 10)
+        self.assertEqual((first.start, first.bin_size), (second.start, second.bin_size))
+        np.testing.assert_array_equal(second.mean, np.ones_like(second.mean))
+
+
+class TestRangeApi(_ServerTest):
+    """GET /api/tabs/{id}/range returns raw or binned MSG_RANGE frames."""
+
+    def _get(self, query):
+        async def go():
+            async with aiohttp.ClientSession() as s:
+                async with s.get(
+                    f"http://localhost:{HTTP_PORT}/api/tabs/bind_me/range?{query}"
+                ) as r:
+                    return r.status, await r.read()
+        return self.run_async(go())
+
+    @staticmethod
+    def _decode(body):
+        msg_type, _s, _r, traces, points, _fps = struct.unpack_from("<BBBxIIf", body)
+        bin_size, num_bins, start, head = struct.unpack_from("<IIQQ", body, 16)
+        data = np.frombuffer(body, dtype=np.float32, offset=40, count=traces * points)
+        per_bin = 1 if bin_size == 1 else 3
+        return msg_type, bin_size, start, head, data.reshape(traces, num_bins, per_bin)
+
+    def test_raw_and_binned_ranges(self):
+        zc = ZmqTestClient()
+        window = 100
+        rng = np.random.default_rng(11)
+        sent = rng.standard_normal((3, 20_000)).astype(np.float32)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b", "c"], "xrange": window})]))
+            time.sleep(0.3)
+            for seq, lo in enumerate(range(0, sent.shape[1], 1000)):
+                zc.send_packed_data(sent[:, lo:lo + 1000], seq=seq)
+            time.sleep(0.5)
+            head = window + sent.shape[1]
+
+            # Default: the live window, raw.
+            status, body = self._get("")
+            self.assertEqual(status, 200)
+            msg_type, bin_size, start, got_head, data = self._decode(body)
+            self.assertEqual((msg_type, bin_size, got_head), (3, 1, head))
+            self.assertEqual(start, head - window)
+            np.testing.assert_array_equal(data[:, :, 0], sent[:, -window:])
+
+            # Negative from counts back from the newest sample; trace subset.
+            status, body = self._get("from=-500&traces=2,0")
+            _, bin_size, start, _, data = self._decode(body)
+            self.assertEqual((bin_size, start), (1, head - 500))
+            np.testing.assert_array_equal(data[:, :, 0], sent[[2, 0], -500:])
+
+            # Decimated: min/max/mean of aligned bins over the whole stream.
+            status, body = self._get(f"from={window}&to={head}&points=200")
+            self.assertEqual(status, 200)
+            _, bin_size, start, _, data = self._decode(body)
+            self.assertGreater(bin_size, 1)
+            self.assertLessEqual(data.shape[1], 200)
+            for j in range(data.shape[1]):
+                a = max(start + j * bin_size, window) - window
+                b = min(start + (j + 1) * bin_size, head) - window
+                seg = sent[:, a:b]
+                np.testing.assert_array_equal(data[:, j, 0], seg.min(axis=1))
+                np.testing.assert_array_equal(data[:, j, 1], seg.max(axis=1))
+                np.testing.assert_allclose(data[:, j, 2], seg.mean(axis=1), rtol=1e-5, atol=1e-6)
+
+            self.assertEqual(self._get("points=0")[0], 400)
+            self.assertEqual(self._get("traces=7")[0], 400)
+            self.assertEqual(self._get("from=abc")[0], 400)
+
+            async def missing():
+                async with aiohttp.ClientSession() as s:
+                    async with s.get(f"http://localhost:{HTTP_PORT}/api/tabs/nope/range") as r:
+                        return r.status
+            self.assertEqual(self.run_async(missing()), 404)
+        finally:
+            zc.close()
+
+
+class TestExportApi(_ServerTest):
+    """GET /api/tabs/{id}/export streams history as npy, npz or csv."""
+
+    def _get(self, query):
+        async def go():
+            async with aiohttp.ClientSession() as s:
+                async with s.get(
+                    f"http://localhost:{HTTP_PORT}/api/tabs/bind_me/export?{query}"
+                ) as r:
+                    return r.status, r.headers, await r.read()
+        return self.run_async(go())
+
+    def test_export_formats(self):
+        zc = ZmqTestClient()
+        window = 100
+        rng = np.random.default_rng(12)
+        # Enough samples that every format spans several chunks.
+        sent = rng.standard_normal((3, 60_000)).astype(np.float32)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b", "c"], "xrange": window})]))
+            time.sleep(0.3)
+            for seq, lo in enumerate(range(0, sent.shape[1], 2000)):
+                zc.send_packed_data(sent[:, lo:lo + 2000], seq=seq)
+            time.sleep(0.5)
+            head = window + sent.shape[1]
+
+            # Default: everything held, without the ring's initial zeros.
+            status, headers, body = self._get("")
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["X-Rtplot-Start"], str(window))
+            self.assertIn(".npy", headers["Content-Disposition"])
+            np.testing.assert_array_equal(np.load(io.BytesIO(body)), sent)
+
+            status, _, body = self._get("format=npz&from=-30000&traces=2,0")
+            self.assertEqual(status, 200)
+            npz = np.load(io.BytesIO(body))
+            self.assertEqual(int(npz["start"]), head - 30_000)
+            self.assertEqual(list(npz["labels"]), ["c", "a"])
+            np.testing.assert_array_equal(npz["data"], sent[[2, 0], -30_000:])
+
+            status, _, body = self._get(f"format=csv&from={window + 10}&to={window + 20}")
+            self.assertEqual(status, 200)
+            lines = body.decode().splitlines()
+            self.assertEqual(lines[0], "sample,a,b,c")
+            table = np.array([[float(v) for v in line.split(",")] for line in lines[1:]])
+            np.testing.assert_array_equal(table[:, 0], np.arange(window + 10, window + 20))
+            np.testing.assert_array_equal(table[:, 1:].T.astype(np.float32), sent[:, 10:20])
+
+            self.assertEqual(self._get("format=xls")[0], 400)
+            self.assertEqual(self._get("traces=7")[0], 400)
+            self.assertEqual(self._get("source=recording")[0], 404)
+        finally:
+            zc.close()
+
+
+class TestSnapshotPayload(_ServerTest):
+    """/snapshot.html embeds the window as base64 float32, optionally downsampled."""
+
+    def _snap(self, query=""):
+        async def go():
+            async with aiohttp.ClientSession() as s:
+                async with s.get(f"http://localhost:{HTTP_PORT}/snapshot.html?{query}") as r:
+                    return r.status, await r.text()
+        status, html = self.run_async(go())
+        self.assertEqual(status, 200)
+        start = html.index("const SNAP = ") + len("const SNAP = ")
+        meta = json.loads(html[start:html.index(";\n", start)])
+        data = np.frombuffer(base64.b64decode(meta["trace_data"]), dtype="<f4")
+        return meta, data.reshape(meta["num_traces"], meta["num_points"])
+
+    def test_snapshot_data_and_points(self):
+        zc = ZmqTestClient()
+        window = 5000
+        rng = np.random.default_rng(13)
+        sent = rng.standard_normal((2, window)).astype(np.float32)
+        sent[1, 1234] = 50.0
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b"], "xrange": window})]))
+            time.sleep(0.3)
+            for seq, lo in enumerate(range(0, window, 1000)):
+                zc.send_packed_data(sent[:, lo:lo + 1000], seq=seq)
+            time.sleep(0.5)
+
+            meta, data = self._snap()
+            self.assertEqual((meta["num_samples"], meta["num_points"]), (window, window))
+            self.assertNotIn("x", meta)
+            np.testing.assert_array_equal(data, sent)
+
+            meta, data = self._snap("points=200")
+            self.assertEqual(meta["num_samples"], window)
+            self.assertLessEqual(meta["num_points"], 200)
+            xs = np.frombuffer(base64.b64decode(meta["x"]), dtype="<f4")
+            self.assertEqual(len(xs), meta["num_points"])
+            self.assertTrue(np.all(np.diff(xs) >= 0))
+            # Min/max pairs keep the extremes, spike included.
+            np.testing.assert_array_equal(data.max(axis=1), sent.max(axis=1))
+            np.testing.assert_array_equal(data.min(axis=1), sent.min(axis=1))
+        finally:
+            zc.close()
+
+
+class TestRecording(_ServerTest):
+    """Toggling a tab's recording writes its samples to a readable file."""
+
+    RECORD_DIR = tempfile.mkdtemp(prefix="rtplot-rec-")
+    SERVER_KWARGS = {"extra_args": ["--record-dir", RECORD_DIR]}
+
+    def test_record_toggle_writes_samples(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot.recording import RecordingReader
+
+        zc = ZmqTestClient()
+        rng = np.random.default_rng(2)
+        sent = rng.standard_normal((2, 3000)).astype(np.float32)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b"], "xrange": 100})]))
+            time.sleep(0.3)
+            zc.send_packed_data(sent[:, :500], seq=0)   # before recording
+            time.sleep(0.2)
+
+            async def toggle(on):
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps(
+                            {"type": "tab_record", "id": "bind_me", "on": on}
+                        ))
+                        return await _drain_until(
+                            ws,
+                            lambda d: isinstance(d, dict) and d.get("type") == "tab"
+                            and bool(d["tab"].get("recording")) == on,
+                        )
+            self.assertIsNotNone(self.run_async(toggle(True)), "no recording tab update")
+            for seq, lo in enumerate(range(500, 3000, 250), start=1):
+                zc.send_packed_data(sent[:, lo:lo + 250], seq=seq)
+            time.sleep(0.5)
+            self.assertIsNotNone(self.run_async(toggle(False)), "recording never stopped")
+
+            files = [f for f in os.listdir(self.RECORD_DIR) if f.endswith(".rtrec")]
+            self.assertEqual(len(files), 1, files)
+            reader = RecordingReader(os.path.join(self.RECORD_DIR, files[0]))
+            self.assertEqual(reader.header["trace_labels"], ["a", "b"])
+            self.assertEqual(reader.header["config"]["p0"]["xrange"], 100)
+            self.assertEqual(reader.num_samples, 2500)
+            np.testing.assert_array_equal(reader.read(), sent[:, 500:])
+            np.testing.assert_array_equal(reader.read(100, 200, rows=[1]), sent[[1], 600:700])
+            chunk = reader.chunks[0]
+            data = reader.read(chunk.first, chunk.first + chunk.num_samples)
+            np.testing.assert_array_equal(chunk.min, data.min(axis=1))
+            np.testing.assert_array_equal(chunk.max, data.max(axis=1))
+
+            # The export API reads the finished recording back too.
+            async def export():
+                async with aiohttp.ClientSession() as s:
+                    async with s.get(
+                        f"http://localhost:{HTTP_PORT}/api/tabs/bind_me/export"
+                        "?source=recording&from=100"
+                    ) as r:
+                        return r.status, await r.read()
+            status, body = self.run_async(export())
+            self.assertEqual(status, 200)
+            np.testing.assert_array_equal(np.load(io.BytesIO(body)), sent[:, 600:])
+        finally:
+            zc.close()
+            shutil.rmtree(self.RECORD_DIR, ignore_errors=True)
+
+
+class TestReplayTab(_ServerTest):
+    """A replay tab plays a recording through the normal ingest path."""
+
+    RECORD_DIR = tempfile.mkdtemp(prefix="rtplot-replay-")
+    SERVER_KWARGS = {"extra_args": ["--record-dir", RECORD_DIR]}
+
+    def test_replay_at_max_speed_matches_recording(self):
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot.recording import Recorder, RecordingReader
+        from rtplot.replay import ReplaySource, parse_speed
+
+        rng = np.random.default_rng(3)
+        sent = rng.standard_normal((2, 5000)).astype(np.float32)
+        config = OrderedDict([("p0", {"names": ["a", "b"], "xrange": 200})])
+        rec = Recorder(
+            os.path.join(self.RECORD_DIR, "session.rtrec"),
+            {"config": config, "trace_labels": ["a", "b"]}, 2, chunk_samples=1000,
+        )
+        for lo in range(0, 5000, 500):
+            rec.write(sent[:, lo:lo + 500])
+        rec.close()
+
+        # Unpaced, the source hands out the whole file in order.
+        self.assertEqual(parse_speed("max"), 0.0)
+        self.assertEqual(parse_speed("10x"), 10.0)
+        src = ReplaySource(RecordingReader(rec.path), speed=0)
+        batches = []
+        while True:
+            batch, _ = src.next_batch()
+            if batch is None:
+                break
+            batches.append(batch)
+        np.testing.assert_array_equal(np.concatenate(batches, axis=1), sent)
+
+        async def play():
+            async with aiohttp.ClientSession() as s:
+                async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                    await ws.send_str(json.dumps(
+                        {"type": "tab_create", "name": "r", "replay": "session.rtrec"}
+                    ))
+                    msg = await _drain_until(
+                        ws,
+                        lambda d: isinstance(d, dict) and d.get("type") == "tabs"
+                        and any(t.get("mode") == "replay" for t in d["tabs"]),
+                    )
+                    tab_id = next(t["id"] for t in msg["tabs"] if t.get("mode") == "replay")
+                    await ws.send_str(json.dumps(
+                        {"type": "replay_control", "id": tab_id, "speed": 0}
+                    ))
+                    done = await _drain_until(
+                        ws,
+                        lambda d: isinstance(d, dict) and d.get("type") == "tab"
+                        and d["tab"]["id"] == tab_id and d["tab"].get("status") == "idle",
+                        timeout=10.0,
+                    )
+                    # Exports of the file come from the tab's own reader.
+                    url = f"http://localhost:{HTTP_PORT}/api/tabs/{tab_id}/export"
+                    async with s.get(url, params={"source": "recording"}) as resp:
+                        self.assertEqual(resp.status, 200)
+                        exported = np.load(io.BytesIO(await resp.read()))
+                    url = f"http://localhost:{HTTP_PORT}/api/tabs/{tab_id}/range"
+                    async with s.get(url, params={"from": "-5000"}) as resp:
+                        return done, exported, resp.status, await resp.read()
+
+        try:
+            done, exported, status, body = self.run_async(play())
+            np.testing.assert_array_equal(exported, sent)
+            self.assertIsNotNone(done, "replay never finished")
+            self.assertEqual(done["tab"]["replay"]["position"], 5000)
+            self.assertEqual(status, 200)
+            _, _, _, traces, n, _ = struct.unpack_from("<BBBxIIf", body)
+            bin_size, bins, start, head = struct.unpack_from("<IIQQ", body, 16)
+            # The tab's positions start after the initial xrange window.
+            self.assertEqual((bin_size, bins, start, head), (1, 5000, 200, 5200))
+            got = np.frombuffer(body, "<f4", offset=40).reshape(traces, bins)
+            np.testing.assert_array_equal(got, sent)
+        finally:
+            shutil.rmtree(self.RECORD_DIR, ignore_errors=True)
+
+    def test_replay_outside_record_dir_is_refused(self):
+        # A real recording, but reached by climbing out of --record-dir.
+        outside = tempfile.mkdtemp(prefix="rtplot-outside-")
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        from rtplot.recording import Recorder
+
+        rec = Recorder(os.path.join(outside, "secret.rtrec"), {}, 1)
+        rec.write(np.zeros((1, 10), dtype=np.float32))
+        rec.close()
+        escape = os.path.relpath(rec.path, self.RECORD_DIR)
+
+        async def go():
+            async with aiohttp.ClientSession() as s:
+                async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                    results = []
+                    for i, path in enumerate((escape, rec.path)):
+                        name = f"escape{i}"
+                        await ws.send_str(json.dumps(
+                            {"type": "tab_create", "name": name, "replay": path}
+                        ))
+                        msg = await _drain_until(
+                            ws,
+                            lambda d: isinstance(d, dict) and d.get("type") == "tabs"
+                            and any(t.get("name") == name for t in d["tabs"]),
+                        )
+                        results.append(next(t for t in msg["tabs"] if t.get("name") == name))
+                    return results
+
+        try:
+            for tab in self.run_async(go()):
+                self.assertEqual(tab["status"], "error")
+                self.assertIn("--record-dir", tab["error"])
+        finally:
+            shutil.rmtree(outside, ignore_errors=True)
+
+
+class TestShardedIngest(_ServerTest):
+    """--workers receives ZMQ data in a worker process, into shared memory."""
+
+    SERVER_KWARGS = {"extra_args": ["--workers", "1"]}
+
+    def _export(self):
+        async def go():
+            async with aiohttp.ClientSession() as s:
+                async with s.get(
+                    f"http://localhost:{HTTP_PORT}/api/tabs/bind_me/export"
+                ) as r:
+                    self.assertEqual(r.status, 200)
+                    return int(r.headers["X-Rtplot-Start"]), await r.read()
+        start, body = self.run_async(go())
+        return start, np.load(io.BytesIO(body))
+
+    def test_samples_and_reconfig_through_worker(self):
+        zc = ZmqTestClient()
+        rng = np.random.default_rng(25)
+        try:
+            zc.send_config(OrderedDict([("p0", {"names": ["a", "b", "c"], "xrange": 100})]))
+            time.sleep(0.3)
+            sent = rng.standard_normal((3, 10_000)).astype(np.float32)
+            for seq, lo in enumerate(range(0, sent.shape[1], 500)):
+                zc.send_packed_data(sent[:, lo:lo + 500], seq=seq)
+            time.sleep(0.5)
+            start, held = self._export()
+            self.assertEqual(start, 100)
+            np.testing.assert_array_equal(held, sent)
+
+            # A new config resets the shared ring; the worker holds
+            # samples until the server has applied it.
+            zc.send_config(OrderedDict([("p0", {"names": ["x", "y"], "xrange": 50})]))
+            sent = rng.standard_normal((2, 3000)).astype(np.float32)
+            for seq, lo in enumerate(range(0, sent.shape[1], 1000), start=100):
+                zc.send_packed_data(sent[:, lo:lo + 1000], seq=seq)
+            time.sleep(0.5)
+            start, held = self._export()
+            self.assertEqual(start, 50)
+            np.testing.assert_array_equal(held, sent)
+
+            async def go():
+                async with aiohttp.ClientSession() as s:
+                    async with s.ws_connect(f"http://localhost:{HTTP_PORT}/ws") as ws:
+                        await ws.send_str(json.dumps({"type": "tab_subscribe", "id": "bind_me"}))
+                        return await _drain_until(
+                            ws, lambda d: isinstance(d, dict) and d.get("type") == "resources",
+                            timeout=6.0,
+                        )
+            resources = self.run_async(go())
+            self.assertIsNotNone(resources)
+            self.assertEqual(resources["workers"], 1)
+            self.assertEqual(resources["frames"]["bind_me"]["received"], 23)
+        finally:
+            zc.close()
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)